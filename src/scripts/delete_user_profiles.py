@@ -10,21 +10,32 @@ Run as Administrator.
 import os
 import sys
 import subprocess
-import shutil
-import stat
 import time
 import ctypes
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
     import win32net
-    import win32security
 except Exception:
-    print("This script requires pywin32 (win32net, win32security). Install with: pip install pywin32")
+    print("This script requires pywin32 (win32net). Install with: pip install pywin32")
     raise
 
 import winreg
 
-__all__ = ["remove_user_and_profile"]
+from scripts.fs_delete import DEFAULT_WORKERS, delete_tree
+from scripts.principals import SID_ADMINISTRATORS, get_resolver
+
+__all__ = ["remove_user_and_profile", "remove_users_and_profiles"]
+
+PROFILE_LIST_PATH = r"SOFTWARE\Microsoft\Windows NT\CurrentVersion\ProfileList"
+
+# Profile folders removed at the same time in bulk mode, and workers per folder
+BULK_FOLDER_PARALLELISM = 3
+BULK_TREE_WORKERS = 4
+
+# Readiness polling after logoff
+LOGOFF_TIMEOUT = 30.0
+POLL_INTERVAL = 0.25
 
 
 def is_admin():
@@ -40,29 +51,65 @@ def run_cmd(cmd):
     return subprocess.run(cmd, capture_output=True, text=True)
 
 
+def parse_sessions(output):
+    """
+    Parse 'query user' output into {lower-case username: [session ids]}.
+    Disconnected sessions have no SESSIONNAME column, so the ID is the first
+    numeric column; the current session is marked with a leading '>'.
+    """
+    sessions = {}
+    for line in output.splitlines()[1:]:
+        parts = line.strip().lstrip(">").split()
+        if len(parts) < 2:
+            continue
+        for p in parts[1:]:
+            if p.isdigit():
+                sessions.setdefault(parts[0].lower(), []).append(int(p))
+                break
+    return sessions
+
+
+def query_sessions(verbose=True):
+    """All interactive sessions from one 'query user' run: {lower-case username: [ids]}."""
+    try:
+        cp = run_cmd(["query", "user"])
+    except FileNotFoundError:
+        if verbose:
+            print("'query' command not found; cannot detect user sessions.")
+        return {}
+    return parse_sessions(cp.stdout)
+
+
 def find_user_sessions(username):
     """Find session IDs for given user using 'query user'."""
+    return query_sessions().get(username.lower(), [])
+
+
+def wait_until(predicate, timeout, interval=POLL_INTERVAL):
+    """Poll `predicate` until it returns True or `timeout` seconds pass."""
+    deadline = time.monotonic() + timeout
+    while True:
+        if predicate():
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def sessions_closed(usernames):
+    names = {u.lower() for u in usernames}
+    return not names.intersection(query_sessions(verbose=False))
+
+
+def profile_unloaded(sid_str):
+    """True once the user's registry hive is no longer loaded under HKEY_USERS."""
     try:
-        cp = run_cmd(["query", "user"])
+        winreg.CloseKey(winreg.OpenKey(winreg.HKEY_USERS, sid_str))
+        return False
     except FileNotFoundError:
-        print("'query' command not found; cannot detect user sessions.")
-        return []
-    out = cp.stdout.splitlines()
-    sessions = []
-    for line in out:
-        if not line.strip():
-            continue
-        parts = line.split()
-        if parts[0].lower() == username.lower():
-            try:
-                sid = int(parts[2])
-                sessions.append(sid)
-            except Exception:
-                for p in parts:
-                    if p.isdigit():
-                        sessions.append(int(p))
-                        break
-    return sessions
+        return True
+    except OSError:
+        return False
 
 
 def logoff_session(session_id):
@@ -78,6 +125,7 @@ def delete_local_user(username):
     """Delete local user account using win32net.NetUserDel"""
     try:
         win32net.NetUserDel(None, username)
+        get_resolver().forget(username)
         print(f"User '{username}' deleted from SAM.")
         return True
     except Exception as e:
@@ -86,11 +134,9 @@ def delete_local_user(username):
 
 
 def get_sid_for_username(username):
-    """Return SID string for a local username, or None if not found."""
+    """Return SID string for a local username, or None if not found (cached per session)."""
     try:
-        sid_obj, domain, acct_type = win32security.LookupAccountName(None, username)
-        sid_str = win32security.ConvertSidToStringSid(sid_obj)
-        return sid_str
+        return get_resolver().sid_for_name(username)
     except Exception:
         return None
 
@@ -130,23 +176,24 @@ def take_ownership_and_grant_full(path):
         return False
     print(f"Taking ownership and granting Administrators full control for: {path}")
     run_cmd(["takeown", "/F", path, "/R", "/D", "Y"])
-    run_cmd(["icacls", path, "/grant", "Administrators:F", "/T", "/C"])
+    run_cmd(["icacls", path, "/grant", f"*{SID_ADMINISTRATORS}:F", "/T", "/C"])
     return True
 
 
-def on_rm_error(func, path, exc_info):
-    """Error handler for shutil.rmtree: change file attributes and retry."""
-    try:
-        os.chmod(path, stat.S_IWRITE)
-        if os.path.isdir(path):
-            os.rmdir(path)
-        else:
-            os.remove(path)
-    except Exception:
-        pass
+def delete_profile_tree(path, max_workers=DEFAULT_WORKERS):
+    """
+    Delete a profile folder with the in-process engine (scripts.fs_delete).
+    takeown/icacls run only if the first pass left something behind.
+    Returns DeleteStats.
+    """
+    stats = delete_tree(path, max_workers)
+    if not stats.complete:
+        take_ownership_and_grant_full(path)
+        stats.merge(delete_tree(path, max_workers))
+    return stats
 
 
-def remove_profile_folder(path, max_retries=3):
+def remove_profile_folder(path):
     """Force delete profile folder."""
     if not path:
         return False
@@ -154,33 +201,18 @@ def remove_profile_folder(path, max_retries=3):
     if not os.path.exists(path):
         print(f"Profile path does not exist: {path}")
         return True
-    for attempt in range(1, max_retries + 1):
-        print(f"Attempt {attempt} to remove folder: {path}")
-        try:
-            take_ownership_and_grant_full(path)
-            for root, dirs, files in os.walk(path):
-                for name in files:
-                    fp = os.path.join(root, name)
-                    try:
-                        os.chmod(fp, stat.S_IWRITE)
-                        run_cmd(["attrib", "-R", "-S", fp])
-                    except Exception:
-                        pass
-                for name in dirs:
-                    dp = os.path.join(root, name)
-                    try:
-                        os.chmod(dp, stat.S_IWRITE)
-                        run_cmd(["attrib", "-R", "-S", dp])
-                    except Exception:
-                        pass
-            shutil.rmtree(path, onerror=on_rm_error)
-            if not os.path.exists(path):
-                print(f"Successfully removed folder: {path}")
-                return True
-        except Exception as e:
-            print(f"Error removing folder (attempt {attempt}): {e}")
-        time.sleep(1 + attempt)
-    print(f"Failed to remove folder after {max_retries} attempts: {path}")
+
+    print(f"Removing folder: {path}")
+    stats = delete_profile_tree(path)
+
+    print(stats.summary())
+    if stats.complete:
+        print(f"Successfully removed folder: {path}")
+        return True
+
+    for item, error in stats.errors[:10]:
+        print(f"  {item}: {error}")
+    print(f"Failed to remove folder: {path}")
     return False
 
 
@@ -196,13 +228,16 @@ def remove_user_and_profile(username, force_logoff=True):
         if force_logoff:
             for s in sessions:
                 logoff_session(s)
-            time.sleep(2)
+            if not wait_until(lambda: sessions_closed([username]), LOGOFF_TIMEOUT):
+                print(f"Sessions of {username} are still open after {LOGOFF_TIMEOUT:.0f}s, continuing.")
         else:
             print("User is logged in. Aborting delete.")
             return
 
     sid = get_sid_for_username(username)
     profile_path = get_profile_path_from_sid(sid) if sid else None
+    if sid and sessions:
+        wait_until(lambda: profile_unloaded(sid), LOGOFF_TIMEOUT)
 
     deleted = delete_local_user(username)
 
@@ -219,9 +254,148 @@ def remove_user_and_profile(username, force_logoff=True):
     print(f"Done. user_deleted={deleted} profile_removed={removed}")
 
 
+# ---------------- Bulk deletion ----------------
+class UserDeletion:
+    """Progress of one account in remove_users_and_profiles()."""
+
+    def __init__(self, username):
+        self.username = username
+        self.sid = None
+        self.profile_path = None
+        self.sessions = []
+        self.account_deleted = False
+        self.registry_deleted = False
+        self.profile_removed = False
+        self.files_removed = 0
+        self.error = None
+
+
+def read_profile_paths(sids):
+    """ProfileImagePath of every given SID, read with one open ProfileList key."""
+    paths = {}
+    try:
+        root = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, PROFILE_LIST_PATH, 0, winreg.KEY_READ)
+    except FileNotFoundError:
+        return paths
+    with root:
+        for sid in sids:
+            try:
+                with winreg.OpenKey(root, sid) as k:
+                    paths[sid], _ = winreg.QueryValueEx(k, "ProfileImagePath")
+            except FileNotFoundError:
+                pass
+    return paths
+
+
+def delete_profile_registry_entries(sids):
+    """Delete the ProfileList keys of all given SIDs in one open parent key. Returns deleted SIDs."""
+    deleted = set()
+    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, PROFILE_LIST_PATH, 0,
+                        winreg.KEY_READ | winreg.KEY_WRITE) as root:
+        for sid in sids:
+            try:
+                winreg.DeleteKey(root, sid)
+                deleted.add(sid)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Failed to delete registry key {sid}: {e}")
+    return deleted
+
+
+def logoff_sessions(session_ids):
+    """Log off several sessions at once."""
+    if not session_ids:
+        return
+    with ThreadPoolExecutor(max_workers=min(8, len(session_ids))) as pool:
+        list(pool.map(logoff_session, session_ids))
+
+
+def remove_users_and_profiles(usernames, force_logoff=True,
+                              folder_parallelism=BULK_FOLDER_PARALLELISM):
+    """
+    Remove several accounts and their profiles:
+    sessions are queried once and all targets are logged off together,
+    SIDs and profile paths are resolved in one pass, accounts and ProfileList
+    keys are deleted next, and profile folders are removed concurrently.
+    Returns one UserDeletion per requested username.
+    """
+    if not is_admin():
+        print("This script must be run as Administrator.")
+        sys.exit(1)
+
+    requested = [UserDeletion(u) for u in dict.fromkeys(usernames)]
+    targets = list(requested)
+    if not targets:
+        return []
+
+    sessions = query_sessions()
+    for t in targets:
+        t.sessions = sessions.get(t.username.lower(), [])
+
+    logged_in = [t for t in targets if t.sessions]
+    if logged_in and not force_logoff:
+        for t in logged_in:
+            t.error = "logged in"
+            print(f"User {t.username} is logged in sessions: {t.sessions}. Skipping.")
+        targets = [t for t in targets if not t.sessions]
+    elif logged_in:
+        print(f"Logging off {len(logged_in)} user(s) ...")
+        logoff_sessions([s for t in logged_in for s in t.sessions])
+        if not wait_until(lambda: sessions_closed(t.username for t in logged_in), LOGOFF_TIMEOUT):
+            print(f"Some sessions are still open after {LOGOFF_TIMEOUT:.0f}s, continuing.")
+
+    sids = get_resolver().sids_for_names(t.username for t in targets)
+    for t in targets:
+        t.sid = sids.get(t.username)
+    paths = read_profile_paths([t.sid for t in targets if t.sid])
+    for t in targets:
+        t.profile_path = paths.get(t.sid) if t.sid else None
+        if not t.profile_path:
+            t.profile_path = os.path.join(os.environ.get("SystemDrive", "C:"), "Users", t.username)
+
+    # Folders can only go once the hives of logged-off users are unloaded
+    loaded = [t.sid for t in logged_in if t.sid]
+    if loaded:
+        wait_until(lambda: all(profile_unloaded(sid) for sid in loaded), LOGOFF_TIMEOUT)
+
+    for t in targets:
+        t.account_deleted = delete_local_user(t.username)
+    deleted_keys = delete_profile_registry_entries([t.sid for t in targets if t.sid])
+    for t in targets:
+        t.registry_deleted = t.sid in deleted_keys
+
+    def _remove(t):
+        path = os.path.expandvars(t.profile_path)
+        if not os.path.exists(path):
+            return t, None
+        return t, delete_profile_tree(path, BULK_TREE_WORKERS)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, folder_parallelism)) as pool:
+        for future in as_completed([pool.submit(_remove, t) for t in targets]):
+            t, stats = future.result()
+            if stats is None:
+                t.profile_removed = True
+                continue
+            t.profile_removed = stats.complete
+            t.files_removed = stats.files
+            state = "removed" if stats.complete else "NOT removed"
+            print(f"Profile {t.profile_path} {state}: {stats.summary()}")
+
+    elapsed = time.perf_counter() - started
+    total_files = sum(t.files_removed for t in targets)
+    rate = total_files / elapsed if elapsed > 0 else 0.0
+    print(f"Profile folders: {total_files} files in {elapsed:.1f}s ({rate:.0f} files/s)")
+
+    return requested
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python remove_user_force.py <username>")
+        print("Usage: python remove_user_force.py <username> [<username> ...]")
         sys.exit(2)
-    target_user = sys.argv[1]
-    remove_user_and_profile(target_user)
+    if len(sys.argv) == 2:
+        remove_user_and_profile(sys.argv[1])
+    else:
+        remove_users_and_profiles(sys.argv[1:])
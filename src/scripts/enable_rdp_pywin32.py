@@ -10,13 +10,14 @@ Enable/check RDP (Remote Desktop) to match Windows UI toggle.
 - Best run as Administrator
 """
 import subprocess
-import time
 import winreg as reg
 
 import win32con
 import win32service
 import win32security
-import pywintypes
+
+from scripts import principals
+from scripts.service_control import start_services
 
 # Registry paths
 RDP_REG_PATH = r"SYSTEM\CurrentControlSet\Control\Terminal Server"
@@ -86,24 +87,16 @@ def ensure_termservice_autostart_and_running(timeout=15):
         status = win32service.QueryServiceStatus(svc)
         if status[1] == win32service.SERVICE_RUNNING:
             return True
-
-        # Try to start
-        try:
-            win32service.StartService(svc, None)
-        except pywintypes.error as e:
-            print(f"[INFO] StartService result: {e}")
-
-        deadline = time.time() + timeout
-        while time.time() < deadline:
-            status = win32service.QueryServiceStatus(svc)
-            if status[1] == win32service.SERVICE_RUNNING:
-                return True
-            time.sleep(1)
-        return False
     finally:
         win32service.CloseServiceHandle(svc)
         win32service.CloseServiceHandle(sc)
 
+    # Start it together with whatever it depends on that isn't running yet
+    result = start_services([TERMSRV], timeout=timeout)
+    for name, error in result.failed.items():
+        print(f"[INFO] Could not start {name}: {error}")
+    return result.ok
+
 
 # ---------------- Firewall helpers ----------------
 def run_cmd(cmd):
@@ -133,14 +126,17 @@ def enable_firewall_for_rdp():
 
 
 # ---------------- Policy helpers ----------------
-def ensure_group_in_rdp_policy(group_name="Remote Desktop Users"):
+def _ensure_account_right(group_sid, right, right_title, policy=None):
     """
-    Ensure that the specified group has the right:
-    'Allow log on through Remote Desktop Services' (SeRemoteInteractiveLogonRight).
+    Grant `right` to the group with the given SID string if it doesn't have it yet.
+    Pass an open LSA policy handle to reuse it across calls.
     """
+    group_name = principals.group_name(group_sid)
+    own_policy = policy is None
     try:
-        sid, domain, _ = win32security.LookupAccountName(None, group_name)
-        policy = win32security.LsaOpenPolicy(None, win32security.POLICY_ALL_ACCESS)
+        if own_policy:
+            policy = win32security.LsaOpenPolicy(None, win32security.POLICY_ALL_ACCESS)
+        sid = principals.sid_object(group_sid)
 
         rights = []
         try:
@@ -148,44 +144,37 @@ def ensure_group_in_rdp_policy(group_name="Remote Desktop Users"):
         except Exception:
             rights = []
 
-        if "SeRemoteInteractiveLogonRight" in rights:
-            print(f"[INFO] Group '{group_name}' already has SeRemoteInteractiveLogonRight")
+        if right in rights:
+            print(f"[INFO] Group '{group_name}' already has {right}")
         else:
-            win32security.LsaAddAccountRights(policy, sid, ["SeRemoteInteractiveLogonRight"])
-            print(f"[OK] Added '{group_name}' to 'Allow log on through Remote Desktop Services'")
-
-        win32security.LsaClose(policy)
+            win32security.LsaAddAccountRights(policy, sid, [right])
+            print(f"[OK] Added '{group_name}' to '{right_title}'")
         return True
     except Exception as e:
-        print(f"[ERROR] Failed to update RDP logon policy for {group_name}: {e}")
+        print(f"[ERROR] Failed to update '{right_title}' policy for {group_name}: {e}")
         return False
+    finally:
+        if own_policy and policy is not None:
+            win32security.LsaClose(policy)
 
 
-def ensure_group_in_network_access(group_name="Users"):
+def ensure_group_in_rdp_policy(group_sid=principals.SID_REMOTE_DESKTOP_USERS, policy=None):
     """
-    Ensure that the specified group has 'Access this computer from the network' right (SeNetworkLogonRight).
+    Ensure that the specified group has the right:
+    'Allow log on through Remote Desktop Services' (SeRemoteInteractiveLogonRight).
     """
-    try:
-        sid, domain, _ = win32security.LookupAccountName(None, group_name)
-        policy = win32security.LsaOpenPolicy(None, win32security.POLICY_ALL_ACCESS)
+    return _ensure_account_right(
+        group_sid, "SeRemoteInteractiveLogonRight", "Allow log on through Remote Desktop Services", policy
+    )
 
-        rights = []
-        try:
-            rights = win32security.LsaEnumerateAccountRights(policy, sid)
-        except Exception:
-            rights = []
-
-        if "SeNetworkLogonRight" in rights:
-            print(f"[INFO] Group '{group_name}' already has SeNetworkLogonRight")
-        else:
-            win32security.LsaAddAccountRights(policy, sid, ["SeNetworkLogonRight"])
-            print(f"[OK] Added '{group_name}' to 'Access this computer from the network'")
 
-        win32security.LsaClose(policy)
-        return True
-    except Exception as e:
-        print(f"[ERROR] Failed to update network access policy for {group_name}: {e}")
-        return False
+def ensure_group_in_network_access(group_sid=principals.SID_USERS, policy=None):
+    """
+    Ensure that the specified group has 'Access this computer from the network' right (SeNetworkLogonRight).
+    """
+    return _ensure_account_right(
+        group_sid, "SeNetworkLogonRight", "Access this computer from the network", policy
+    )
 
 
 # ---------------- Status check ----------------
@@ -226,13 +215,17 @@ def ensure_rdp_working(enable_nla=True):
     ensure_termservice_autostart_and_running()
     enable_firewall_for_rdp()
 
-    # Rights for RDP logon
-    ensure_group_in_rdp_policy("Administrators")
-    ensure_group_in_rdp_policy("Remote Desktop Users")
+    policy = win32security.LsaOpenPolicy(None, win32security.POLICY_ALL_ACCESS)
+    try:
+        # Rights for RDP logon
+        ensure_group_in_rdp_policy(principals.SID_ADMINISTRATORS, policy)
+        ensure_group_in_rdp_policy(principals.SID_REMOTE_DESKTOP_USERS, policy)
 
-    # Rights for network access
-    ensure_group_in_network_access("Administrators")
-    ensure_group_in_network_access("Users")
+        # Rights for network access
+        ensure_group_in_network_access(principals.SID_ADMINISTRATORS, policy)
+        ensure_group_in_network_access(principals.SID_USERS, policy)
+    finally:
+        win32security.LsaClose(policy)
 
 
 if __name__ == "__main__":
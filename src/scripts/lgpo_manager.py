@@ -3,10 +3,14 @@ LGPO (Local Group Policy) manager.
 
 This module provides functions to:
 - locate LGPO.exe
-- export local GPO to a named profile directory under 'Policies'
+- export local GPO to a named profile in the 'Policies' store
 - apply a profile from 'Policies' back to the local machine
 - list available profiles
 
+Profiles are kept deduplicated in scripts.policy_store; a backup directory is
+only materialized when LGPO.exe has to read one. Profiles saved earlier as
+plain directories under 'Policies' are still listed and applied as they are.
+
 Usage:
     from scripts.lgpo_manager import (
         export_profile, apply_profile, list_profiles, get_policies_storage
@@ -17,11 +21,16 @@ import os
 import shutil
 import subprocess
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple
 import subprocess
 import sys
 
 from core.utils import get_folder_path
+from scripts.policy_store import IngestStats, get_store, staging_dir
+from scripts.registry_pol import find_pol_files
+
+# Files of a backup that aren't registry policy (security template, advanced audit policy)
+OTHER_POLICY_FILES = ("gpttmpl.inf", "audit.csv")
 
 
 class LgpoError(RuntimeError):
@@ -65,48 +74,59 @@ def _run_lgpo(args: List[str], timeout: int = 120) -> subprocess.CompletedProces
     return proc
 
 
-def list_profiles() -> List[str]:
-    """
-    List profile names (directories) under 'Policies'.
-    Returns directory names only (not full paths).
-    """
+def _profile_dirs() -> List[Path]:
     storage = get_policies_storage()
     if not storage.exists():
         return []
-    profiles = []
-    for item in storage.iterdir():
-        if item.is_dir():
-            profiles.append(item.name)
+    return [item for item in storage.iterdir() if item.is_dir() and not item.name.startswith(".")]
+
+
+def list_profiles() -> List[str]:
+    """
+    List profile names: stored profiles and plain directories under 'Policies'.
+    """
+    profiles = set(get_store().names())
+    profiles.update(item.name for item in _profile_dirs())
     return sorted(profiles, key=str.lower)
 
 
-def export_profile(profile_name: str, overwrite: bool = False) -> Path:
+def export_profile(profile_name: str, overwrite: bool = False) -> IngestStats:
     """
-    Export current local GPO to 'Policies/<profile_name>' using LGPO /b.
+    Export current local GPO into the 'Policies' store using LGPO /b.
 
-    - profile_name: target directory name under Policies
-    - overwrite: if False and directory exists and not empty -> error
+    - profile_name: profile name
+    - overwrite: if False and the profile exists -> error
 
-    Returns: Path to created profile directory.
+    Returns: what was stored (files, new objects, deduplicated files).
     """
     profile_name = profile_name.strip()
     if not profile_name:
         raise LgpoError("Empty profile name.")
 
-    storage = get_policies_storage()
-    target_dir = storage / profile_name
+    if profile_exists(profile_name) and not overwrite:
+        raise LgpoError(f"Profile '{profile_name}' already exists. Use a different name or enable overwrite.")
 
-    if target_dir.exists():
-        # If exists and contains files, guard unless overwrite is True
-        if any(target_dir.iterdir()) and not overwrite:
-            raise LgpoError(f"Profile '{profile_name}' already exists. Use a different name or enable overwrite.")
-    else:
-        target_dir.mkdir(parents=True, exist_ok=True)
+    # LGPO backup into a staging directory, then into the store
+    staging = staging_dir(profile_name)
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+    _run_lgpo(["/b", str(staging)])
+
+    return replace_profile(profile_name, staging)
 
-    # LGPO backup (creates content inside target_dir)
-    _run_lgpo(["/b", str(target_dir)])
 
-    return target_dir
+def replace_profile(profile_name: str, staging: Path) -> IngestStats:
+    """
+    Store the backup in `staging` as `profile_name`. The manifest is swapped in
+    atomically, so an existing profile of that name stays intact until the new
+    one is complete; only then are its old directory and objects removed.
+    """
+    store = get_store()
+    _, stats = store.ingest(profile_name, staging)
+    _delete_profile_directory(profile_name)
+    store.gc()
+    return stats
 
 
 def apply_profile(profile_name_or_path: str) -> None:
@@ -115,25 +135,80 @@ def apply_profile(profile_name_or_path: str) -> None:
 
     - profile_name_or_path: either a name under 'Policies' or absolute/relative path to a backup dir
     """
+    p = resolve_profile_dir(profile_name_or_path)
+
+    # LGPO apply
+    _run_lgpo(["/g", str(p)])
+
+
+def apply_policy_parts(profile_dir: Path) -> List[Path]:
+    """
+    Apply the non-registry parts of a backup with LGPO:
+    security templates (GptTmpl.inf, /s) and advanced audit policy (audit.csv, /a).
+    Returns the files applied.
+    """
+    applied = []
+    for root, _, files in os.walk(profile_dir):
+        for name in files:
+            path = Path(root) / name
+            if name.lower() == "gpttmpl.inf":
+                _run_lgpo(["/s", str(path)])
+            elif name.lower() == "audit.csv":
+                _run_lgpo(["/a", str(path)])
+            else:
+                continue
+            applied.append(path)
+    return applied
+
+
+def resolve_profile_dir(profile_name_or_path: str) -> Path:
+    """
+    Backup directory of a profile, for LGPO: a path, a plain directory under
+    'Policies', or a stored profile materialized on demand.
+    """
     p = Path(profile_name_or_path)
     if not p.exists():
-        # treat as profile name under storage
         p = get_policies_storage() / profile_name_or_path
-
+    if not p.exists() and get_store().has(profile_name_or_path):
+        p = get_store().materialize(profile_name_or_path)
     if not p.exists() or not p.is_dir():
         raise LgpoError(f"Profile directory not found: {p}")
+    return p
 
-    # LGPO apply
-    _run_lgpo(["/g", str(p)])
+
+def profile_policy_files(profile_name: str) -> Tuple[Dict[str, Path], bool]:
+    """
+    ({"Machine"/"User": registry.pol path}, whether the profile also has a
+    security template or audit policy) – read in place, nothing materialized.
+    """
+    directory = get_policies_storage() / profile_name
+    if directory.is_dir():
+        has_other = any(f.lower() in OTHER_POLICY_FILES for _, _, files in os.walk(directory) for f in files)
+        return find_pol_files(directory), has_other
+
+    store = get_store()
+    manifest = store.manifest(profile_name)
+    if manifest is None:
+        raise LgpoError(f"Profile not found: {profile_name}")
+    has_other = any(store.find_files(manifest, name) for name in OTHER_POLICY_FILES)
+    return store.pol_files(manifest), has_other
 
 
 def delete_profile(profile_name: str) -> None:
     """
-    Delete profile directory from 'Policies' storage.
+    Delete a profile: its manifest (and unreferenced objects) and/or its directory under 'Policies'.
     """
-    storage = get_policies_storage()
-    target = storage / profile_name
-    if not target.exists():
+    store = get_store()
+    if store.has(profile_name):
+        store.delete(profile_name)
+        store.gc()
+    _delete_profile_directory(profile_name)
+
+
+def _delete_profile_directory(profile_name: str) -> None:
+    """Remove a profile saved as a plain directory under 'Policies' (older layout)."""
+    target = get_policies_storage() / profile_name
+    if profile_name.startswith(".") or not target.exists():
         return
     if target.is_dir():
         shutil.rmtree(target)
@@ -142,5 +217,5 @@ def delete_profile(profile_name: str) -> None:
 
 
 def profile_exists(profile_name: str) -> bool:
-    """Check if a profile directory exists under 'Policies'."""
-    return (get_policies_storage() / profile_name).exists()
+    """Check if a profile exists in the store or as a directory under 'Policies'."""
+    return get_store().has(profile_name) or (get_policies_storage() / profile_name).exists()
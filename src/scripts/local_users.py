@@ -0,0 +1,160 @@
+"""
+Local user accounts as plain records.
+
+NetUserBackend reads every account with NetUserEnum level 3, one call per
+page of entries, and a single account with NetUserGetInfo level 3. Each
+entry already carries everything the Users views show (flags, full name,
+RID, ...), so no per-property COM round-trips as with Win32_UserAccount. The
+SID is the machine SID plus the account RID. FakeUserBackend serves fixed
+records and is meant for tests.
+
+Usage:
+    for user in get_user_backend().list_users():
+        print(user.name, user.sid, user.disabled)
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+# USER_INFO flags (same values as win32netcon.UF_*)
+UF_ACCOUNTDISABLE = 0x0002
+UF_LOCKOUT = 0x0010
+UF_PASSWD_NOTREQD = 0x0020
+UF_PASSWD_CANT_CHANGE = 0x0040
+UF_DONT_EXPIRE_PASSWD = 0x10000
+UF_ACCOUNT_TYPE_MASK = 0x3B00       # UF_NORMAL_ACCOUNT (512) and the trust account types
+
+SID_TYPE_USER = 1
+
+# Entries requested per NetUserEnum page
+PREF_MAX_LEN = 64 * 1024
+
+
+class LocalUser:
+    """One local account; field names follow the Win32_UserAccount properties."""
+
+    __slots__ = (
+        "name", "full_name", "comment", "domain", "sid", "flags", "account_type",
+        "disabled", "lockout", "password_changeable", "password_expires",
+        "password_required", "last_logon", "local_account", "sid_type",
+    )
+
+    def __init__(self, name: str, domain: str, sid: str, flags: int, full_name: str = "",
+                 comment: str = "", last_logon: int = 0):
+        self.name = name
+        self.full_name = full_name
+        self.comment = comment
+        self.domain = domain
+        self.sid = sid
+        self.flags = flags
+        self.account_type = flags & UF_ACCOUNT_TYPE_MASK
+        self.disabled = bool(flags & UF_ACCOUNTDISABLE)
+        self.lockout = bool(flags & UF_LOCKOUT)
+        self.password_changeable = not flags & UF_PASSWD_CANT_CHANGE
+        self.password_expires = not flags & UF_DONT_EXPIRE_PASSWD
+        self.password_required = not flags & UF_PASSWD_NOTREQD
+        self.last_logon = last_logon            # seconds since 1970, 0 if never
+        self.local_account = True
+        self.sid_type = SID_TYPE_USER
+
+    @property
+    def status(self) -> str:
+        # Win32_UserAccount reports disabled or locked accounts as "Degraded"
+        return "Degraded" if self.disabled or self.lockout else "OK"
+
+    @property
+    def rid(self) -> int:
+        return int(self.sid.rsplit("-", 1)[1])
+
+    def __repr__(self) -> str:
+        return f"LocalUser(name={self.name}, sid={self.sid}, disabled={self.disabled})"
+
+
+class UserBackend(ABC):
+    @abstractmethod
+    def list_users(self) -> List[LocalUser]:
+        """All local accounts, sorted by name."""
+
+    @abstractmethod
+    def get_user(self, name: str) -> Optional[LocalUser]:
+        """Fresh record of one account, None if it doesn't exist."""
+
+
+class NetUserBackend(UserBackend):
+    def __init__(self):
+        self._domain: Optional[str] = None
+        self._machine_sid: Optional[str] = None
+
+    def _context(self):
+        if self._machine_sid is None:
+            import win32api
+            from scripts.principals import get_resolver
+
+            self._domain = win32api.GetComputerName()
+            self._machine_sid = get_resolver().machine_sid()
+        return self._domain, self._machine_sid
+
+    def _record(self, entry: dict) -> LocalUser:
+        domain, machine_sid = self._context()
+        return LocalUser(
+            name=entry["name"],
+            domain=domain,
+            sid=f"{machine_sid}-{entry['user_id']}",
+            flags=entry["flags"],
+            full_name=entry.get("full_name") or "",
+            comment=entry.get("comment") or "",
+            last_logon=entry.get("last_logon") or 0,
+        )
+
+    def list_users(self) -> List[LocalUser]:
+        import win32net
+        import win32netcon
+
+        users: List[LocalUser] = []
+        resume = 0
+        while True:
+            entries, _, resume = win32net.NetUserEnum(
+                None, 3, win32netcon.FILTER_NORMAL_ACCOUNT, resume, PREF_MAX_LEN
+            )
+            users.extend(self._record(entry) for entry in entries)
+            if not resume:
+                break
+        return sorted(users, key=lambda u: u.name.lower())
+
+    def get_user(self, name: str) -> Optional[LocalUser]:
+        import win32net
+
+        try:
+            return self._record(win32net.NetUserGetInfo(None, name, 3))
+        except win32net.error:
+            return None
+
+
+class FakeUserBackend(UserBackend):
+    def __init__(self, users: Iterable[LocalUser] = ()):
+        self._users: Dict[str, LocalUser] = {u.name.lower(): u for u in users}
+
+    def add(self, user: LocalUser) -> None:
+        self._users[user.name.lower()] = user
+
+    def remove(self, name: str) -> None:
+        self._users.pop(name.lower(), None)
+
+    def list_users(self) -> List[LocalUser]:
+        return sorted(self._users.values(), key=lambda u: u.name.lower())
+
+    def get_user(self, name: str) -> Optional[LocalUser]:
+        return self._users.get(name.lower())
+
+
+_backend: UserBackend = NetUserBackend()
+
+
+def get_user_backend() -> UserBackend:
+    return _backend
+
+
+def set_user_backend(backend: UserBackend) -> None:
+    global _backend
+    _backend = backend
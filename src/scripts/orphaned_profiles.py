@@ -0,0 +1,168 @@
+"""
+Find and remove user profiles whose local account no longer exists.
+
+Two kinds of leftovers are reported:
+  - ProfileList entries of local accounts (SID under this machine's SID)
+    that are not in the SAM anymore, including stale "<SID>.bak" entries;
+  - folders in the profiles directory (C:\\Users) that no ProfileList entry
+    points to.
+
+ProfileList is read in one pass, the SAM with one NetUserEnum pass (see
+scripts.principals), and all candidate folders are sized together on one
+parallel scandir pool (scripts.fs_size). Removal goes through the deletion
+engine of scripts.delete_user_profiles. Domain profiles are never reported.
+"""
+import os
+import time
+import winreg
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from scripts.delete_user_profiles import (
+    BULK_FOLDER_PARALLELISM, BULK_TREE_WORKERS, PROFILE_LIST_PATH,
+    delete_profile_registry_entries, delete_profile_tree, profile_unloaded,
+)
+from scripts.fs_size import tree_sizes
+from scripts.principals import get_resolver
+
+REASON_NO_ACCOUNT = "account deleted"
+REASON_BACKUP = "stale .bak entry"
+REASON_NO_ENTRY = "folder without ProfileList entry"
+
+# Folders of the profiles directory that never belong to an account
+SYSTEM_PROFILE_FOLDERS = {"public", "default", "default user", "all users", "defaultapppool"}
+
+
+class OrphanedProfile:
+    """One leftover profile: a ProfileList entry, a folder, or both."""
+
+    def __init__(self, sid: Optional[str], path: Optional[str], reason: str):
+        self.sid = sid                  # ProfileList subkey name, None for folder-only leftovers
+        self.path = path                # expanded profile folder, None if unknown
+        self.reason = reason
+        self.size: Optional[int] = None
+        self.files: Optional[int] = None
+
+    @property
+    def folder_exists(self) -> bool:
+        return bool(self.path) and os.path.isdir(self.path)
+
+
+class OrphanScan:
+    def __init__(self):
+        self.profiles_dir: str = ""
+        self.orphans: List[OrphanedProfile] = []
+        self.profile_count = 0
+        self.account_count = 0
+        self.elapsed = 0.0
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.normpath(path))
+
+
+def read_profile_list() -> Tuple[str, Dict[str, str]]:
+    """Returns (profiles directory, {ProfileList subkey: expanded ProfileImagePath})."""
+    entries: Dict[str, str] = {}
+    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, PROFILE_LIST_PATH, 0, winreg.KEY_READ) as root:
+        try:
+            profiles_dir = os.path.expandvars(winreg.QueryValueEx(root, "ProfilesDirectory")[0])
+        except FileNotFoundError:
+            profiles_dir = os.path.join(os.environ.get("SystemDrive", "C:"), os.sep, "Users")
+
+        subkey_count, _, _ = winreg.QueryInfoKey(root)
+        for name in [winreg.EnumKey(root, i) for i in range(subkey_count)]:
+            try:
+                with winreg.OpenKey(root, name) as k:
+                    entries[name] = os.path.expandvars(winreg.QueryValueEx(k, "ProfileImagePath")[0])
+            except FileNotFoundError:
+                entries[name] = ""
+    return profiles_dir, entries
+
+
+def find_orphaned_profiles(measure: bool = True) -> OrphanScan:
+    """Scan ProfileList, the SAM and the profiles directory; nothing is changed."""
+    started = time.perf_counter()
+    scan = OrphanScan()
+
+    resolver = get_resolver()
+    machine_prefix = resolver.machine_sid() + "-"
+    local_sids = set(resolver.load_local_users().values())
+    scan.account_count = len(local_sids)
+
+    scan.profiles_dir, entries = read_profile_list()
+    scan.profile_count = len(entries)
+
+    for key, path in entries.items():
+        sid = key[:-4] if key.lower().endswith(".bak") else key
+        if not sid.startswith(machine_prefix):
+            continue   # system, service or domain profile
+        if sid not in local_sids:
+            scan.orphans.append(OrphanedProfile(key, path or None, REASON_NO_ACCOUNT))
+        elif key != sid:
+            scan.orphans.append(OrphanedProfile(key, path or None, REASON_BACKUP))
+
+    # A .bak entry usually points to the folder of the live profile: keep such folders
+    orphan_keys = {o.sid for o in scan.orphans}
+    live_paths = {_norm(p) for key, p in entries.items() if p and key not in orphan_keys}
+    for o in scan.orphans:
+        if o.path and _norm(o.path) in live_paths:
+            o.path = None
+            o.reason += " (folder in use, kept)"
+
+    referenced = {_norm(p) for p in entries.values() if p}
+    try:
+        with os.scandir(scan.profiles_dir) as it:
+            for entry in it:
+                if not entry.is_dir(follow_symlinks=False) or entry.is_symlink():
+                    continue
+                if entry.name.lower() in SYSTEM_PROFILE_FOLDERS:
+                    continue
+                if _norm(entry.path) not in referenced:
+                    scan.orphans.append(OrphanedProfile(None, entry.path, REASON_NO_ENTRY))
+    except OSError:
+        pass
+
+    if measure:
+        sizes = tree_sizes(o.path for o in scan.orphans if o.folder_exists)
+        for o in scan.orphans:
+            if o.path in sizes:
+                o.size = sizes[o.path].bytes
+                o.files = sizes[o.path].files
+
+    scan.elapsed = time.perf_counter() - started
+    return scan
+
+
+def remove_orphaned_profiles(orphans: List[OrphanedProfile],
+                             folder_parallelism: int = BULK_FOLDER_PARALLELISM) -> Dict[OrphanedProfile, bool]:
+    """
+    Delete the ProfileList entries in one pass, then the folders concurrently.
+    Entries whose hive is still loaded (someone is using the SID) are skipped.
+    Returns orphan -> fully removed.
+    """
+    result: Dict[OrphanedProfile, bool] = {}
+    removable = []
+    for o in orphans:
+        sid = o.sid[:-4] if o.sid and o.sid.lower().endswith(".bak") else o.sid
+        if sid and not profile_unloaded(sid):
+            print(f"[!] Profile of {sid} is loaded, skipped")
+            result[o] = False
+        else:
+            removable.append(o)
+
+    deleted_keys = delete_profile_registry_entries([o.sid for o in removable if o.sid])
+
+    def _remove(o: OrphanedProfile):
+        if not o.folder_exists:
+            return o, True
+        stats = delete_profile_tree(o.path, BULK_TREE_WORKERS)
+        print(f"[{'+' if stats.complete else '!'}] {o.path}: {stats.summary()}")
+        return o, stats.complete
+
+    with ThreadPoolExecutor(max_workers=max(1, folder_parallelism)) as pool:
+        for future in as_completed([pool.submit(_remove, o) for o in removable]):
+            o, removed = future.result()
+            result[o] = removed and (o.sid is None or o.sid in deleted_keys)
+
+    return result
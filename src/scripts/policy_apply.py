@@ -0,0 +1,442 @@
+"""
+Apply the registry policies of an LGPO backup directly, as a delta.
+
+LGPO /g rewrites every setting of a backup and gpupdate /force then re-runs
+every client-side extension. apply_policy_profile() instead:
+
+  1. reads the backup's Machine/User registry.pol with scripts.registry_pol;
+  2. folds the entries in file order into the wanted end state, so **del.,
+     **delvals., **DeleteValues, **DeleteKeys and **soft. behave as they do
+     in the policy engine;
+  3. compares the Machine part with HKLM and writes only what differs,
+     through one RegistrySession that opens each key once;
+  4. merges the entries of both scopes into the local GPO's registry.pol,
+     bumps the version in gpt.ini and lists the Registry client-side
+     extension there, so the next policy refresh keeps the settings;
+  5. calls RefreshPolicyEx for Machine when it changed.
+
+The User part is not written directly: HKCU here is the elevated admin's own
+hive. It only goes into the local GPO and reaches every user at their next
+logon or user policy refresh.
+
+apply_policy_files() takes the registry.pol paths directly, so a profile kept
+in scripts.policy_store is applied from its objects without materializing it.
+Security templates (GptTmpl.inf) and audit.csv are not registry policy and are
+left to lgpo_manager.apply_policy_parts().
+"""
+import configparser
+import os
+import re
+import time
+import winreg
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from scripts.registry_pol import (
+    DEL_PREFIX, DELETE_KEYS, DELETE_VALUES, DELVALS, SCOPES, SOFT_PREFIX,
+    REG_DWORD, REG_EXPAND_SZ, REG_MULTI_SZ, REG_QWORD, REG_SZ,
+    PolEntry, decode_data, directive_targets, find_pol_files, fold_list_directive, read_pol, write_pol,
+)
+
+# Scopes written to the registry directly; the others only through the local GPO
+SCOPE_HIVES = {
+    "Machine": winreg.HKEY_LOCAL_MACHINE,
+}
+
+LOCAL_GPO_DIR = Path(os.environ.get("SystemRoot", r"C:\Windows")) / "System32" / "GroupPolicy"
+
+# [Registry CSE{Administrative Templates tool}]: without it in gPC<Scope>ExtensionNames
+# the policy engine skips the local GPO's Registry.pol
+REGISTRY_EXTENSION = ("{35378EAC-683F-11D2-A89A-00C04FBBCFA2}", "{D02B1F72-3407-48AE-BA88-E8213C6761F1}")
+EXTENSION_KEYS = {"Machine": "gPCMachineExtensionNames", "User": "gPCUserExtensionNames"}
+
+# winreg takes these types as Python values, everything else as bytes
+NATIVE_TYPES = (REG_SZ, REG_EXPAND_SZ, REG_MULTI_SZ, REG_DWORD, REG_QWORD)
+
+WOW64 = getattr(winreg, "KEY_WOW64_64KEY", 0)
+
+SET = "set"
+DELETE = "delete"
+DELETE_KEY = "delete key"
+
+
+class PolicyChange:
+    def __init__(self, scope: str, action: str, key: str, value: str = "", entry: Optional[PolEntry] = None):
+        self.scope = scope
+        self.action = action
+        self.key = key
+        self.value = value
+        self.entry = entry
+        self.error: Optional[str] = None
+
+    def __str__(self) -> str:
+        target = self.key if self.action == DELETE_KEY else f"{self.key}\\{self.value}"
+        if self.action == SET:
+            return f"{self.scope}: {target} = {decode_data(self.entry.type, self.entry.data)!r}"
+        return f"{self.scope}: {self.action} {target}"
+
+
+class ApplyResult:
+    def __init__(self):
+        self.changed: List[PolicyChange] = []
+        self.failed: List[PolicyChange] = []
+        self.unchanged = 0
+        self.refreshed: List[str] = []
+        self.gpo_only: Dict[str, int] = {}      # scope -> settings merged into the local GPO only
+        self.elapsed = 0.0
+
+    def print(self):
+        for change in self.changed:
+            print(f"[+] {change}")
+        for change in self.failed:
+            print(f"[!] {change}: {change.error}")
+        for scope, count in self.gpo_only.items():
+            print(f"[~] {scope}: {count} setting(s) in the local GPO only; users get them at their next "
+                  f"logon or policy refresh")
+        print(f"[=] {len(self.changed)} changed, {self.unchanged} already in place, "
+              f"{len(self.failed)} failed in {self.elapsed:.2f}s")
+
+
+class RegistrySession:
+    """Keeps every key it opens until close(), so each key is opened once per apply."""
+
+    def __init__(self, hive):
+        self.hive = hive
+        self._read: Dict[str, Optional[object]] = {}
+        self._write: Dict[str, object] = {}
+
+    def _open_read(self, key: str):
+        lower = key.lower()
+        if lower in self._write:
+            return self._write[lower]
+        if lower not in self._read:
+            try:
+                self._read[lower] = winreg.OpenKey(self.hive, key, 0, winreg.KEY_READ | WOW64)
+            except OSError:
+                self._read[lower] = None
+        return self._read[lower]
+
+    def _open_write(self, key: str):
+        lower = key.lower()
+        if lower not in self._write:
+            self._write[lower] = winreg.CreateKeyEx(self.hive, key, 0, winreg.KEY_READ | winreg.KEY_WRITE | WOW64)
+        return self._write[lower]
+
+    def read(self, key: str, value: str) -> Optional[Tuple[object, int]]:
+        handle = self._open_read(key)
+        if handle is None:
+            return None
+        try:
+            return winreg.QueryValueEx(handle, value)
+        except OSError:
+            return None
+
+    def value_names(self, key: str) -> List[str]:
+        handle = self._open_read(key)
+        if handle is None:
+            return []
+        names = []
+        i = 0
+        while True:
+            try:
+                names.append(winreg.EnumValue(handle, i)[0])
+            except OSError:
+                return names
+            i += 1
+
+    def key_exists(self, key: str) -> bool:
+        return self._open_read(key) is not None
+
+    def set(self, entry: PolEntry) -> None:
+        data = decode_data(entry.type, entry.data) if entry.type in NATIVE_TYPES else bytes(entry.data)
+        winreg.SetValueEx(self._open_write(entry.key), entry.value, 0, entry.type, data)
+
+    def delete_value(self, key: str, value: str) -> None:
+        winreg.DeleteValue(self._open_write(key), value)
+
+    def delete_key(self, key: str) -> None:
+        self._forget(key)
+        _delete_tree(self.hive, key)
+
+    def _forget(self, key: str) -> None:
+        prefix = key.lower()
+        for cache in (self._read, self._write):
+            for lower in [k for k in cache if k == prefix or k.startswith(prefix + "\\")]:
+                handle = cache.pop(lower)
+                if handle is not None:
+                    winreg.CloseKey(handle)
+
+    def close(self) -> None:
+        for cache in (self._read, self._write):
+            for handle in cache.values():
+                if handle is not None:
+                    winreg.CloseKey(handle)
+            cache.clear()
+
+
+def _delete_tree(hive, key: str) -> None:
+    with winreg.OpenKey(hive, key, 0, winreg.KEY_READ | WOW64) as handle:
+        subkeys = []
+        i = 0
+        while True:
+            try:
+                subkeys.append(winreg.EnumKey(handle, i))
+            except OSError:
+                break
+            i += 1
+    for sub in subkeys:
+        _delete_tree(hive, f"{key}\\{sub}")
+    winreg.DeleteKeyEx(hive, key, WOW64)
+
+
+def _under(key: str, deleted_keys: Dict[str, str]) -> bool:
+    lower = key.lower()
+    return any(lower == d or lower.startswith(d + "\\") for d in deleted_keys)
+
+
+def wanted_state(entries: List[PolEntry], session: RegistrySession):
+    """
+    Fold the entries into the state the policy engine would leave behind:
+    ({(key, value) lower-cased: (key, value, entry or None to delete)}, {deleted key lower-cased: key}).
+    """
+    values: Dict[tuple, Tuple[str, str, Optional[PolEntry]]] = {}
+    deleted_keys: Dict[str, str] = {}
+
+    def want(key: str, value: str, entry: Optional[PolEntry]) -> None:
+        values[(key.lower(), value.lower())] = (key, value, entry)
+
+    def exists(key: str, value: str) -> bool:
+        planned = values.get((key.lower(), value.lower()))
+        if planned is not None:
+            return planned[2] is not None
+        return not _under(key, deleted_keys) and session.read(key, value) is not None
+
+    for entry in entries:
+        name = entry.value.lower()
+        if name.startswith(DEL_PREFIX):
+            want(entry.key, entry.value[len(DEL_PREFIX):], None)
+        elif name == DELVALS:
+            current = [] if _under(entry.key, deleted_keys) else session.value_names(entry.key)
+            planned = [v for k, v, e in values.values() if k.lower() == entry.key.lower() and e is not None]
+            for value in current + planned:
+                want(entry.key, value, None)
+        elif name in (DELETE_VALUES, DELETE_KEYS):
+            for target in directive_targets(entry):
+                if name == DELETE_VALUES:
+                    want(entry.key, target, None)
+                    continue
+                path = f"{entry.key}\\{target}"
+                deleted_keys[path.lower()] = path
+                for ident in [i for i in values if _under(i[0], {path.lower(): path})]:
+                    del values[ident]
+        elif name.startswith(SOFT_PREFIX):
+            real = entry.value[len(SOFT_PREFIX):]
+            if not exists(entry.key, real):
+                want(entry.key, real, entry._replace(value=real))
+        elif name.startswith("**"):
+            # **SecureKey and friends change ACLs, not values
+            continue
+        else:
+            want(entry.key, entry.value, entry)
+    return values, deleted_keys
+
+
+def _same(current: Optional[Tuple[object, int]], entry: PolEntry) -> bool:
+    if current is None:
+        return False
+    data, reg_type = current
+    if reg_type != entry.type:
+        return False
+    try:
+        wanted = decode_data(entry.type, entry.data) if entry.type in NATIVE_TYPES else bytes(entry.data)
+    except ValueError:
+        # Malformed data: plan the write, which then fails and is reported on its own
+        return False
+    return data == wanted or (data is None and wanted == b"")
+
+
+def plan_scope(scope: str, entries: List[PolEntry], session: RegistrySession) -> Tuple[List[PolicyChange], int]:
+    """The changes that bring the registry to what `entries` describe, and how many already match."""
+    values, deleted_keys = wanted_state(entries, session)
+    changes: List[PolicyChange] = []
+    unchanged = 0
+
+    for path in deleted_keys.values():
+        if session.key_exists(path):
+            changes.append(PolicyChange(scope, DELETE_KEY, path))
+        else:
+            unchanged += 1
+
+    for key, value, entry in values.values():
+        current = None if _under(key, deleted_keys) else session.read(key, value)
+        if entry is None:
+            if current is None:
+                unchanged += 1
+            else:
+                changes.append(PolicyChange(scope, DELETE, key, value))
+        elif _same(current, entry):
+            unchanged += 1
+        else:
+            changes.append(PolicyChange(scope, SET, key, value, entry))
+    return changes, unchanged
+
+
+def _apply_change(session: RegistrySession, change: PolicyChange) -> None:
+    try:
+        if change.action == DELETE_KEY:
+            session.delete_key(change.key)
+        elif change.action == DELETE:
+            session.delete_value(change.key, change.value)
+        else:
+            session.set(change.entry)
+    except (OSError, TypeError, ValueError) as e:
+        # A malformed entry (short REG_DWORD, odd-length string data) fails on its own
+        change.error = str(e)
+
+
+def _merge_ident(entry: PolEntry) -> tuple:
+    # **del.X and **soft.X take the place of X; other directives only replace themselves
+    name = entry.value.lower()
+    for prefix in (DEL_PREFIX, SOFT_PREFIX):
+        if name.startswith(prefix):
+            return entry.key.lower(), name[len(prefix):]
+    return entry.ident()
+
+
+def merge_pol_entries(current: List[PolEntry], incoming: List[PolEntry]) -> List[PolEntry]:
+    """
+    Local GPO entries with `incoming` laid over them, last writer wins per value.
+    A **DeleteValues / **DeleteKeys on a key that already has one keeps the
+    earlier targets too, so those deletions stay enforced.
+    """
+    merged: Dict[tuple, PolEntry] = {_merge_ident(e): e for e in current}
+    for entry in incoming:
+        ident = _merge_ident(entry)
+        old = merged.get(ident)
+        if old is not None and entry.value.lower() in (DELETE_VALUES, DELETE_KEYS):
+            idents = list(merged)
+            between = [merged[i] for i in idents[idents.index(ident) + 1:]]
+            entry = fold_list_directive(old, between, entry)
+        merged.pop(ident, None)
+        merged[ident] = entry
+    return list(merged.values())
+
+
+def _with_extension(names: str, extension: Tuple[str, str]) -> str:
+    """gPC*ExtensionNames with the [CSE{tool}] pair added; groups stay sorted by CSE GUID."""
+    groups = [re.findall(r"\{[^}]*\}", group) for group in re.findall(r"\[([^\]]*)\]", names or "")]
+    cse, tool = extension
+    for group in groups:
+        if group and group[0].upper() == cse.upper():
+            if tool.upper() not in (g.upper() for g in group[1:]):
+                group[1:] = sorted(group[1:] + [tool], key=str.upper)
+            break
+    else:
+        groups.append([cse, tool])
+    groups.sort(key=lambda g: g[0].upper() if g else "")
+    return "".join("[" + "".join(group) + "]" for group in groups)
+
+
+def update_gpt_ini(scope: str, gpo_dir: Path = LOCAL_GPO_DIR, bump: bool = True) -> bool:
+    """
+    Make sure gpt.ini lists the Registry extension for `scope`, and increase the
+    GPO version of `scope` (user version in the high word, machine in the low
+    one) when asked to or when the extension had to be added. Returns whether
+    the file changed.
+    """
+    path = gpo_dir / "gpt.ini"
+    ini = configparser.ConfigParser()
+    ini.optionxform = str
+    if path.exists():
+        ini.read(path, encoding="utf-8")
+    if not ini.has_section("General"):
+        ini.add_section("General")
+
+    key = EXTENSION_KEYS[scope]
+    names = ini.get("General", key, fallback="")
+    wanted = _with_extension(names, REGISTRY_EXTENSION)
+    if wanted != names:
+        ini.set("General", key, wanted)
+        bump = True
+    if not bump:
+        return False
+
+    version = int(ini.get("General", "Version", fallback="0"))
+    user, machine = version >> 16, version & 0xFFFF
+    if scope == "Machine":
+        machine = (machine + 1) & 0xFFFF
+    else:
+        user = (user + 1) & 0xFFFF
+    ini.set("General", "Version", str((user << 16) | machine))
+    gpo_dir.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        ini.write(f, space_around_delimiters=False)
+    return True
+
+
+def update_local_gpo(scope: str, entries: List[PolEntry], gpo_dir: Path = LOCAL_GPO_DIR,
+                     dry_run: bool = False) -> bool:
+    """Merge `entries` into the local GPO of `scope`; returns whether its Registry.pol changes."""
+    path = gpo_dir / scope / "Registry.pol"
+    current = read_pol(path) if path.exists() else []
+    merged = merge_pol_entries(current, entries)
+    changed = merged != current
+    if dry_run:
+        return changed
+    if changed:
+        write_pol(path, merged)
+    update_gpt_ini(scope, gpo_dir, bump=changed)
+    return changed
+
+
+def refresh_policy(scope: str) -> bool:
+    import ctypes
+    from ctypes import wintypes
+
+    userenv = ctypes.WinDLL("userenv.dll", use_last_error=True)
+    refresh = userenv.RefreshPolicyEx
+    refresh.argtypes = [wintypes.BOOL, wintypes.DWORD]
+    refresh.restype = wintypes.BOOL
+    # No RP_FORCE: the registry is already written, only let the engine catch up
+    return bool(refresh(scope == "Machine", 0))
+
+
+def apply_policy_files(pol_files: Dict[str, Path], dry_run: bool = False) -> ApplyResult:
+    """Apply {"Machine"/"User": registry.pol path}; with dry_run only report the changes."""
+    start = time.perf_counter()
+    result = ApplyResult()
+
+    for scope in SCOPES:
+        if scope not in pol_files:
+            continue
+        entries = read_pol(pol_files[scope])
+        if scope not in SCOPE_HIVES:
+            if update_local_gpo(scope, entries, dry_run=dry_run):
+                result.gpo_only[scope] = sum(1 for e in entries if not e.is_directive)
+            continue
+
+        session = RegistrySession(SCOPE_HIVES[scope])
+        try:
+            changes, unchanged = plan_scope(scope, entries, session)
+            result.unchanged += unchanged
+            if dry_run:
+                result.changed += changes
+                continue
+            for change in changes:
+                _apply_change(session, change)
+        finally:
+            session.close()
+
+        result.changed += [c for c in changes if not c.error]
+        result.failed += [c for c in changes if c.error]
+        update_local_gpo(scope, entries)
+        if changes and refresh_policy(scope):
+            result.refreshed.append(scope)
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def apply_policy_profile(profile_dir: Path, dry_run: bool = False) -> ApplyResult:
+    """apply_policy_files() for the registry.pol files of a backup directory."""
+    return apply_policy_files(find_pol_files(profile_dir), dry_run)
@@ -0,0 +1,226 @@
+"""
+Catalog of the policy profiles (LGPO backups) under Policies.
+
+For every profile the catalog keeps the number of registry settings per scope,
+the top-level keys they touch, whether a security template / audit policy is
+included, the creation time and a hash of the policy content. Two backups with
+the same hash configure exactly the same settings, whatever their names or
+backup GUIDs.
+
+Entries are keyed on a stamp: for a profile in scripts.policy_store the
+manifest's mtime and size, for a plain backup directory the newest mtime
+and the number of entries in its tree. Refreshing the catalog only stats, and
+parses a profile only when its stamp changed. Stored profiles are read from
+their objects; nothing is materialized.
+The catalog is stored as JSON in Cache/policy_catalog.json.
+
+Usage:
+    entries, parsed = refresh_catalog()
+    for entry in entries:
+        print(entry.name, entry.machine_settings, entry.user_settings)
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.utils import get_folder_path
+from scripts.policy_store import STORE_DIR_NAME, PolicyStore
+from scripts.registry_pol import SCOPES, SECURE_KEY, PolicyFile, PolError, find_pol_files
+
+CACHE_FILE_NAME = "policy_catalog.json"
+CATALOG_VERSION = 1
+
+# Besides registry.pol, the files whose content makes up the policy of a backup
+# (Backup.xml and bkupInfo.xml only hold the backup's own GUID and time)
+CONTENT_FILES = ("gpttmpl.inf", "audit.csv")
+
+# "Software\Policies\Microsoft\Windows" – deep enough to tell areas apart
+TOP_KEY_DEPTH = 4
+
+
+class CatalogEntry:
+    def __init__(self, name: str, stamp: list, created: float, content_hash: str,
+                 machine_settings: int, user_settings: int, top_keys: List[str],
+                 has_security: bool = False, has_audit: bool = False, error: Optional[str] = None):
+        self.name = name
+        self.stamp = stamp                      # [mtime_ns, entry count or manifest size]
+        self.created = created
+        self.content_hash = content_hash
+        self.machine_settings = machine_settings
+        self.user_settings = user_settings
+        self.top_keys = top_keys
+        self.has_security = has_security
+        self.has_audit = has_audit
+        self.error = error
+
+    def to_json(self) -> dict:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "CatalogEntry":
+        return cls(**data)
+
+
+def profile_stamp(path: Path) -> list:
+    """[newest mtime_ns, number of entries] over the whole profile tree."""
+    newest = os.stat(path).st_mtime_ns
+    count = 0
+    stack = [str(path)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                count += 1
+                st = entry.stat(follow_symlinks=False)
+                newest = max(newest, st.st_mtime_ns)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    return [newest, count]
+
+
+def _top_key(key: str) -> str:
+    return "\\".join(key.split("\\")[:TOP_KEY_DEPTH])
+
+
+def _index(name: str, stamp: list, created: float, pol_files: Dict[str, Path],
+           parts: Dict[str, Path]) -> CatalogEntry:
+    digest = hashlib.blake2b(digest_size=16)
+    counts = {scope: 0 for scope in SCOPES}
+    top_keys = set()
+    error = None
+
+    for scope in SCOPES:
+        if scope not in pol_files:
+            continue
+        digest.update(scope.encode())
+        try:
+            with PolicyFile(pol_files[scope]) as pol:
+                for entry in pol:
+                    digest.update(f"{entry.key}\0{entry.value}\0{entry.type}\0".lower().encode("utf-8"))
+                    digest.update(entry.data)
+                    if entry.value.lower() != SECURE_KEY:
+                        counts[scope] += 1
+                        top_keys.add(_top_key(entry.key))
+        except (OSError, PolError) as e:
+            error = str(e)
+
+    for part in sorted(parts):
+        digest.update(part.encode())
+        try:
+            with open(parts[part], "rb") as f:
+                digest.update(f.read())
+        except OSError as e:
+            error = str(e)
+
+    return CatalogEntry(
+        name=name,
+        stamp=stamp,
+        created=created,
+        content_hash=digest.hexdigest(),
+        machine_settings=counts["Machine"],
+        user_settings=counts["User"],
+        top_keys=sorted(top_keys, key=str.lower),
+        has_security="gpttmpl.inf" in parts,
+        has_audit="audit.csv" in parts,
+        error=error,
+    )
+
+
+def index_profile(path: Path, stamp: Optional[list] = None) -> CatalogEntry:
+    """Parse one backup directory into a catalog entry."""
+    parts = {}
+    for root, _, files in os.walk(path):
+        for f in files:
+            if f.lower() in CONTENT_FILES:
+                parts[f.lower()] = Path(root) / f
+    return _index(path.name, stamp or profile_stamp(path), os.stat(path).st_ctime, find_pol_files(path), parts)
+
+
+def manifest_stamp(store: PolicyStore, name: str) -> list:
+    st = os.stat(store.manifest_path(name))
+    return [st.st_mtime_ns, st.st_size]
+
+
+def index_stored_profile(store: PolicyStore, name: str, stamp: Optional[list] = None) -> Optional[CatalogEntry]:
+    """Parse one stored profile into a catalog entry, reading the objects in place."""
+    manifest = store.manifest(name)
+    if manifest is None:
+        return None
+    parts = {}
+    for part in CONTENT_FILES:
+        found = store.find_files(manifest, part)
+        if found:
+            parts[part] = found[sorted(found)[0]]
+    return _index(name, stamp or manifest_stamp(store, name), manifest.created, store.pol_files(manifest), parts)
+
+
+def load_catalog(path: Path) -> Dict[str, CatalogEntry]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CATALOG_VERSION:
+            return {}
+        return {name: CatalogEntry.from_json(e) for name, e in data["profiles"].items()}
+    except (FileNotFoundError, OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def save_catalog(path: Path, catalog: Dict[str, CatalogEntry]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": CATALOG_VERSION, "profiles": {n: e.to_json() for n, e in catalog.items()}},
+                  f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def refresh_catalog(storage: Optional[Path] = None, cache_path: Optional[Path] = None
+                    ) -> Tuple[List[CatalogEntry], int]:
+    """
+    Catalog entries of every profile under `storage`, newest first, and the
+    number of profiles that had to be (re)parsed.
+    """
+    storage = storage or get_folder_path("Policies")
+    cache_path = cache_path or get_folder_path("Cache") / CACHE_FILE_NAME
+    catalog = load_catalog(cache_path)
+
+    current: Dict[str, CatalogEntry] = {}
+    parsed = 0
+    if storage.exists():
+        for item in storage.iterdir():
+            if not item.is_dir() or item.name.startswith("."):
+                continue
+            try:
+                stamp = profile_stamp(item)
+            except OSError:
+                continue
+            cached = catalog.get(item.name)
+            if cached is not None and cached.stamp == stamp:
+                current[item.name] = cached
+                continue
+            current[item.name] = index_profile(item, stamp)
+            parsed += 1
+
+    store = PolicyStore(storage / STORE_DIR_NAME)
+    for name in store.names():
+        if name in current:
+            # A plain directory of the same name wins, as in lgpo_manager
+            continue
+        try:
+            stamp = manifest_stamp(store, name)
+        except OSError:
+            continue
+        cached = catalog.get(name)
+        if cached is not None and cached.stamp == stamp:
+            current[name] = cached
+            continue
+        entry = index_stored_profile(store, name, stamp)
+        if entry is not None:
+            current[name] = entry
+            parsed += 1
+
+    if parsed or current.keys() != catalog.keys():
+        save_catalog(cache_path, current)
+
+    return sorted(current.values(), key=lambda e: e.created, reverse=True), parsed
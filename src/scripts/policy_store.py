@@ -0,0 +1,296 @@
+"""
+Content-addressed storage for policy profiles (LGPO backups).
+
+Most files of a backup (GptTmpl.inf, audit.csv, an unchanged registry.pol)
+are byte-identical between profiles. The store keeps every distinct file once:
+
+    Policies/.store/objects/<2 hex>/<sha256>     file contents
+    Policies/.store/manifests/<profile>.json     relative path -> hash, size
+
+A profile is then a manifest. The catalog and the direct apply read
+registry.pol straight from the objects, and a backup directory is only built
+when LGPO.exe needs one: materialize() lays it out with hard links to the
+objects (copies when the target volume can't link), so it costs no extra
+space. Objects are marked read-only when stored, so a write into a
+materialized directory fails instead of changing every profile sharing that
+object (hard links share the read-only attribute too); removing a checkout
+clears the attribute only to unlink and marks the objects read-only again.
+
+Profiles saved as plain directories keep working; migrate_directories() moves
+them into the store.
+
+Usage:
+    store = get_store()
+    store.ingest("baseline", Path("staging/baseline"))
+    backup_dir = store.materialize("baseline")
+
+    python -m scripts.policy_store [--migrate] [--gc]
+"""
+import hashlib
+import json
+import os
+import shutil
+import stat
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.utils import get_folder_path
+from scripts.registry_pol import SCOPES
+
+STORE_DIR_NAME = ".store"
+HASH_NAME = "sha256"
+CHUNK_SIZE = 1024 * 1024
+
+READ_ONLY = stat.S_IREAD
+WRITABLE = stat.S_IREAD | stat.S_IWRITE
+
+
+class Manifest:
+    def __init__(self, name: str, created: float, files: Dict[str, Tuple[str, int]], dirs: List[str]):
+        self.name = name
+        self.created = created
+        self.files = files          # relative path -> (hash, size)
+        self.dirs = dirs            # relative paths of directories, empty ones included
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size in self.files.values())
+
+    def to_json(self) -> dict:
+        return {"name": self.name, "created": self.created, "dirs": self.dirs,
+                "files": {rel: list(v) for rel, v in self.files.items()}}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Manifest":
+        return cls(data["name"], data["created"], {rel: tuple(v) for rel, v in data["files"].items()},
+                   data.get("dirs", []))
+
+
+class IngestStats:
+    def __init__(self):
+        self.files = 0
+        self.new_objects = 0
+        self.bytes = 0
+        self.new_bytes = 0
+
+    def summary(self) -> str:
+        return (f"{self.files} files ({self.bytes} bytes), {self.new_objects} new object(s) "
+                f"({self.new_bytes} bytes), {self.files - self.new_objects} deduplicated")
+
+
+def _force_remove(func, path, _exc_info) -> None:
+    # rmtree error handler: Windows refuses to delete read-only files
+    os.chmod(path, WRITABLE)
+    func(path)
+
+
+def remove_tree(path: Path) -> None:
+    """shutil.rmtree() that also removes read-only files (checkouts of stored objects)."""
+    if path.exists():
+        shutil.rmtree(path, onerror=_force_remove)
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.new(HASH_NAME)
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PolicyStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.manifests_dir = self.root / "manifests"
+        self.checkout_dir = self.root / "checkout"
+
+    # -- objects -------------------------------------------------------------
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def put_file(self, path: str) -> Tuple[str, bool]:
+        """Store a file's contents; returns (hash, whether a new object was written)."""
+        digest = file_hash(path)
+        target = self.object_path(digest)
+        if target.exists():
+            return digest, False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{digest}.{uuid.uuid4().hex}.tmp")
+        shutil.copyfile(path, tmp)
+        os.chmod(tmp, READ_ONLY)
+        os.replace(tmp, target)
+        return digest, True
+
+    def _seal_objects(self) -> None:
+        """Mark every object read-only again (unlinking a checkout has to clear the attribute)."""
+        if self.objects_dir.exists():
+            for path in self.objects_dir.glob("*/*"):
+                os.chmod(path, READ_ONLY)
+
+    def _remove_checkout(self, target: Path) -> None:
+        if target.exists():
+            remove_tree(target)
+            self._seal_objects()
+
+    # -- manifests -----------------------------------------------------------
+
+    def manifest_path(self, name: str) -> Path:
+        return self.manifests_dir / f"{name}.json"
+
+    def names(self) -> List[str]:
+        if not self.manifests_dir.exists():
+            return []
+        return sorted((p.stem for p in self.manifests_dir.glob("*.json")), key=str.lower)
+
+    def has(self, name: str) -> bool:
+        return self.manifest_path(name).exists()
+
+    def manifest(self, name: str) -> Optional[Manifest]:
+        try:
+            with open(self.manifest_path(name), encoding="utf-8") as f:
+                return Manifest.from_json(json.load(f))
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _write_manifest(self, manifest: Manifest) -> None:
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        path = self.manifest_path(manifest.name)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest.to_json(), f, indent=1)
+        os.replace(tmp, path)
+
+    def ingest(self, name: str, src_dir: Path, remove_source: bool = True) -> Tuple[Manifest, IngestStats]:
+        """Store every file of `src_dir` and record them as profile `name`."""
+        stats = IngestStats()
+        files: Dict[str, Tuple[str, int]] = {}
+        dirs: List[str] = []
+        for root, dirnames, filenames in os.walk(src_dir):
+            rel_root = os.path.relpath(root, src_dir)
+            dirs += [os.path.normpath(os.path.join(rel_root, d)) for d in dirnames]
+            for fname in filenames:
+                path = os.path.join(root, fname)
+                size = os.path.getsize(path)
+                digest, new = self.put_file(path)
+                files[os.path.normpath(os.path.join(rel_root, fname))] = (digest, size)
+                stats.files += 1
+                stats.bytes += size
+                if new:
+                    stats.new_objects += 1
+                    stats.new_bytes += size
+
+        manifest = Manifest(name, os.stat(src_dir).st_ctime, files, sorted(dirs))
+        self._write_manifest(manifest)
+        if remove_source:
+            shutil.rmtree(src_dir)
+        return manifest, stats
+
+    def delete(self, name: str) -> None:
+        self.manifest_path(name).unlink(missing_ok=True)
+        self._remove_checkout(self.checkout_dir / name)
+
+    def gc(self) -> int:
+        """Remove objects no manifest refers to; returns how many were removed."""
+        used = set()
+        for name in self.names():
+            manifest = self.manifest(name)
+            if manifest is not None:
+                used.update(digest for digest, _ in manifest.files.values())
+        removed = 0
+        if self.objects_dir.exists():
+            for path in self.objects_dir.glob("*/*"):
+                if path.name not in used:
+                    os.chmod(path, WRITABLE)
+                    path.unlink()
+                    removed += 1
+        return removed
+
+    # -- reading -------------------------------------------------------------
+
+    def find_files(self, manifest: Manifest, file_name: str) -> Dict[str, Path]:
+        """{relative path: object path} of the files called `file_name` (case-insensitive)."""
+        file_name = file_name.lower()
+        return {rel: self.object_path(digest) for rel, (digest, _) in manifest.files.items()
+                if os.path.basename(rel).lower() == file_name}
+
+    def pol_files(self, manifest: Manifest) -> Dict[str, Path]:
+        """Same as registry_pol.find_pol_files() for a stored profile."""
+        found: Dict[str, Path] = {}
+        for rel, path in sorted(self.find_files(manifest, "registry.pol").items()):
+            parent = os.path.basename(os.path.dirname(rel)).lower()
+            for scope in SCOPES:
+                if parent == scope.lower():
+                    found.setdefault(scope, path)
+        return found
+
+    def materialize(self, name: str, target: Optional[Path] = None) -> Path:
+        """Lay profile `name` out as a backup directory; hard links where the volume allows."""
+        manifest = self.manifest(name)
+        if manifest is None:
+            raise FileNotFoundError(f"profile '{name}' is not in the store")
+
+        target = Path(target or self.checkout_dir / name)
+        self._remove_checkout(target)
+        target.mkdir(parents=True)
+        for rel in manifest.dirs:
+            (target / rel).mkdir(parents=True, exist_ok=True)
+
+        can_link = True
+        for rel, (digest, _) in manifest.files.items():
+            dst = target / rel
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            src = self.object_path(digest)
+            if can_link:
+                try:
+                    os.link(src, dst)
+                    continue
+                except OSError:
+                    can_link = False
+            shutil.copyfile(src, dst)
+        return target
+
+
+def get_store() -> PolicyStore:
+    return PolicyStore(get_folder_path("Policies") / STORE_DIR_NAME)
+
+
+def staging_dir(name: str) -> Path:
+    """Where LGPO /b writes a backup before it goes into the store."""
+    return get_store().root / "staging" / name
+
+
+def migrate_directories(storage: Optional[Path] = None) -> Dict[str, IngestStats]:
+    """Move profiles saved as plain directories under Policies into the store."""
+    storage = storage or get_folder_path("Policies")
+    store = PolicyStore(storage / STORE_DIR_NAME)
+    migrated = {}
+    for item in sorted(storage.iterdir()):
+        if item.is_dir() and not item.name.startswith(".") and not store.has(item.name):
+            _, migrated[item.name] = store.ingest(item.name, item)
+    return migrated
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Policy profile store maintenance.")
+    parser.add_argument("--migrate", action="store_true", help="move plain profile directories into the store")
+    parser.add_argument("--gc", action="store_true", help="remove unreferenced objects")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.migrate:
+        for name, stats in migrate_directories().items():
+            print(f"[+] {name}: {stats.summary()}")
+    if args.gc:
+        print(f"[~] Removed {get_store().gc()} unreferenced object(s)")
+
+    store = get_store()
+    total = sum(m.size for m in map(store.manifest, store.names()) if m)
+    stored = sum(p.stat().st_size for p in store.objects_dir.glob("*/*")) if store.objects_dir.exists() else 0
+    print(f"[=] {len(store.names())} profile(s), {total} bytes of backups in {stored} bytes of objects "
+          f"({time.perf_counter() - start:.2f}s)")
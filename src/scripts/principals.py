@@ -0,0 +1,145 @@
+"""
+Session-wide resolution of local principals (users and groups) between names
+and SIDs.
+
+Built-in groups are addressed by their well-known SIDs, which are the same on
+every Windows installation; the localized name ("Administrators",
+"Адміністратори", ...) is looked up once with LookupAccountSid and cached, so
+no code has to guess a language and retry after a failed call.
+
+Name -> SID lookups are cached as well. sids_for_names() resolves many local
+accounts at once: a single NetUserEnum level 3 pass returns the RID of every
+account, which together with the machine SID gives their SIDs without one LSA
+round-trip per user.
+"""
+import threading
+from typing import Dict, Iterable, Optional
+
+import win32api
+import win32net
+import win32netcon
+import win32security
+
+# Well-known SIDs of the built-in local groups
+SID_ADMINISTRATORS = "S-1-5-32-544"
+SID_USERS = "S-1-5-32-545"
+SID_REMOTE_DESKTOP_USERS = "S-1-5-32-555"
+
+# English names, used only if a lookup fails (e.g. the group was removed)
+WELL_KNOWN_NAMES = {
+    SID_ADMINISTRATORS: "Administrators",
+    SID_USERS: "Users",
+    SID_REMOTE_DESKTOP_USERS: "Remote Desktop Users",
+}
+
+# Entries requested per NetUserEnum page
+PREF_MAX_LEN = 64 * 1024
+
+
+class PrincipalResolver:
+    """Caches name <-> SID lookups for the lifetime of the process."""
+
+    def __init__(self):
+        self._names: Dict[str, str] = {}     # SID string -> account name
+        self._sids: Dict[str, str] = {}      # lower-case account name -> SID string
+        self._machine_sid: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _remember(self, name: str, sid: str) -> None:
+        with self._lock:
+            self._names[sid] = name
+            self._sids[name.lower()] = sid
+
+    def name_for_sid(self, sid: str) -> str:
+        """Localized account name of a SID string (raises win32security.error if unknown)."""
+        name = self._names.get(sid)
+        if name is None:
+            name, _, _ = win32security.LookupAccountSid(None, win32security.ConvertStringSidToSid(sid))
+            self._remember(name, sid)
+        return name
+
+    def group_name(self, sid: str) -> str:
+        """Local name of a built-in group; falls back to the English name."""
+        try:
+            return self.name_for_sid(sid)
+        except win32security.error:
+            return WELL_KNOWN_NAMES.get(sid, sid)
+
+    def sid_for_name(self, name: str) -> Optional[str]:
+        """SID string of a local account name, or None if there is no such account."""
+        sid = self._sids.get(name.lower())
+        if sid is not None:
+            return sid
+        try:
+            sid_obj, _, _ = win32security.LookupAccountName(None, name)
+        except win32security.error:
+            return None
+        sid = win32security.ConvertSidToStringSid(sid_obj)
+        self._remember(name, sid)
+        return sid
+
+    def machine_sid(self) -> str:
+        """Account domain SID of this computer (prefix of all local account SIDs)."""
+        if self._machine_sid is None:
+            sid_obj, _, _ = win32security.LookupAccountName(None, win32api.GetComputerName())
+            self._machine_sid = win32security.ConvertSidToStringSid(sid_obj)
+        return self._machine_sid
+
+    def load_local_users(self) -> Dict[str, str]:
+        """Cache the SIDs of all local user accounts with one enumeration; returns name -> SID."""
+        prefix = self.machine_sid()
+        users: Dict[str, str] = {}
+        resume = 0
+        while True:
+            entries, _, resume = win32net.NetUserEnum(
+                None, 3, win32netcon.FILTER_NORMAL_ACCOUNT, resume, PREF_MAX_LEN
+            )
+            for entry in entries:
+                users[entry["name"]] = f"{prefix}-{entry['user_id']}"
+                self._remember(entry["name"], users[entry["name"]])
+            if not resume:
+                return users
+
+    def sids_for_names(self, names: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Batch variant of sid_for_name(); unknown names map to None."""
+        names = list(dict.fromkeys(names))
+        if any(name.lower() not in self._sids for name in names):
+            self.load_local_users()
+        return {name: self._sids.get(name.lower()) or self.sid_for_name(name) for name in names}
+
+    def names_for_sids(self, sids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Batch variant of name_for_sid(); unresolvable SIDs map to None."""
+        result: Dict[str, Optional[str]] = {}
+        for sid in dict.fromkeys(sids):
+            try:
+                result[sid] = self.name_for_sid(sid)
+            except win32security.error:
+                result[sid] = None
+        return result
+
+    def forget(self, name: str) -> None:
+        """Drop a deleted or renamed account from the cache."""
+        with self._lock:
+            sid = self._sids.pop(name.lower(), None)
+            if sid is not None:
+                self._names.pop(sid, None)
+
+
+_resolver = PrincipalResolver()
+
+
+def get_resolver() -> PrincipalResolver:
+    return _resolver
+
+
+def group_name(sid: str) -> str:
+    return _resolver.group_name(sid)
+
+
+def sid_for_name(name: str) -> Optional[str]:
+    return _resolver.sid_for_name(name)
+
+
+def sid_object(sid: str):
+    """PySID for a SID string (no LSA call)."""
+    return win32security.ConvertStringSidToSid(sid)
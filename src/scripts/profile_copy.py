@@ -0,0 +1,374 @@
+"""
+Resumable, multi-threaded copy of a directory tree (used to move profiles).
+
+copy_tree() walks the source once with os.scandir, creates the directories
+on the target as it goes and hands the files to a worker pool in batches.
+Each file is streamed in fixed-size chunks through a per-thread buffer and
+gets its times, mode and (on Windows) hidden/system/read-only attributes
+copied. Symlinks and junctions are recreated as links, pointing into the
+target tree when they pointed inside the source tree.
+
+Every finished file is appended to a manifest (size, mtime and relative path
+of the source). A later run with the same manifest skips those files, so an
+interrupted copy resumes without copying anything twice; files changed in
+the meantime are copied again.
+
+verify_tree() compares both trees afterwards (size and mtime, optionally a
+BLAKE2 hash of the contents). Pure Python, runs on any OS.
+"""
+import hashlib
+import os
+import shutil
+import stat
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from scripts.fs_delete import file_attributes
+
+DEFAULT_WORKERS = 8
+CHUNK_SIZE = 1024 * 1024
+
+# Files per task; large files get a task of their own
+BATCH_SIZE = 64
+BATCH_BYTES = 16 * 1024 * 1024
+
+# Reparse tag of junctions (stat.IO_REPARSE_TAG_MOUNT_POINT exists only on Windows)
+IO_REPARSE_TAG_MOUNT_POINT = 0xA0000003
+
+FILE_ATTRIBUTE_READONLY = 0x1
+FILE_ATTRIBUTE_HIDDEN = 0x2
+FILE_ATTRIBUTE_SYSTEM = 0x4
+FILE_ATTRIBUTE_ARCHIVE = 0x20
+FILE_ATTRIBUTE_NOT_CONTENT_INDEXED = 0x2000
+_COPIED_ATTRIBUTES = (FILE_ATTRIBUTE_READONLY | FILE_ATTRIBUTE_HIDDEN | FILE_ATTRIBUTE_SYSTEM
+                      | FILE_ATTRIBUTE_ARCHIVE | FILE_ATTRIBUTE_NOT_CONTENT_INDEXED)
+
+if os.name == "nt":
+    import ctypes
+
+    _SetFileAttributesW = ctypes.windll.kernel32.SetFileAttributesW
+
+    def _set_attributes(path: str, attributes: int) -> None:
+        if attributes & _COPIED_ATTRIBUTES:
+            _SetFileAttributesW(path, attributes & _COPIED_ATTRIBUTES)
+else:
+    def _set_attributes(path: str, attributes: int) -> None:
+        pass
+
+_buffers = threading.local()
+
+
+class CopyManifest:
+    """Append-only record of finished files: '<size>\\t<mtime_ns>\\t<relative path>' per line."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._done: Dict[str, Tuple[int, int]] = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self) -> "CopyManifest":
+        self._done.clear()
+        try:
+            f = self.path.open(encoding="utf-8")
+        except FileNotFoundError:
+            return self
+        with f:
+            for line in f:
+                if not line.endswith("\n"):
+                    continue   # torn write of an interrupted run
+                parts = line[:-1].split("\t", 2)
+                if len(parts) == 3 and parts[0].isdigit() and parts[1].isdigit():
+                    self._done[parts[2]] = (int(parts[0]), int(parts[1]))
+        return self
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def is_done(self, rel: str, size: int, mtime_ns: int) -> bool:
+        return self._done.get(rel) == (size, mtime_ns)
+
+    def record(self, rel: str, size: int, mtime_ns: int) -> None:
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self.path.open("a", encoding="utf-8")
+            self._file.write(f"{size}\t{mtime_ns}\t{rel}\n")
+            self._file.flush()
+            self._done[rel] = (size, mtime_ns)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self) -> None:
+        self.close()
+        self._done.clear()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class CopyStats:
+    def __init__(self):
+        self.files_copied = 0
+        self.files_skipped = 0
+        self.bytes_copied = 0
+        self.dirs = 0
+        self.links = 0
+        self.errors: List[Tuple[str, str]] = []
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.bytes_copied / self.elapsed if self.elapsed > 0 else 0.0
+
+    def _add(self, files: int, size: int, errors: List[Tuple[str, str]]) -> None:
+        with self._lock:
+            self.files_copied += files
+            self.bytes_copied += size
+            self.errors.extend(errors)
+
+    def summary(self) -> str:
+        return (f"{self.files_copied} files copied ({self.bytes_copied / 2 ** 20:.0f} MB, "
+                f"{self.bytes_per_sec / 2 ** 20:.1f} MB/s), {self.files_skipped} already done, "
+                f"{self.links} links, {len(self.errors)} error(s) in {self.elapsed:.1f}s")
+
+
+def _buffer(chunk_size: int) -> bytearray:
+    buf = getattr(_buffers, "buf", None)
+    if buf is None or len(buf) != chunk_size:
+        buf = _buffers.buf = bytearray(chunk_size)
+    return buf
+
+
+def copy_file(src: str, dst: str, attributes: int = 0, chunk_size: int = CHUNK_SIZE) -> int:
+    """Copy contents, times, mode and attributes of one file; returns bytes copied."""
+    buf = _buffer(chunk_size)
+    view = memoryview(buf)
+    copied = 0
+    try:
+        fo = open(dst, "wb")
+    except PermissionError:
+        # Read-only leftover of an interrupted run
+        os.chmod(dst, stat.S_IWRITE | stat.S_IREAD)
+        fo = open(dst, "wb")
+    with open(src, "rb") as fi, fo:
+        while True:
+            n = fi.readinto(buf)
+            if not n:
+                break
+            fo.write(view[:n])
+            copied += n
+    shutil.copystat(src, dst, follow_symlinks=False)
+    _set_attributes(dst, attributes)
+    return copied
+
+
+def _copy_batch(batch: List[Tuple[str, str, str, int, int, int]], manifest: Optional[CopyManifest],
+                stats: CopyStats, chunk_size: int) -> None:
+    copied = size = 0
+    errors: List[Tuple[str, str]] = []
+    for rel, src, dst, file_size, mtime_ns, attributes in batch:
+        try:
+            size += copy_file(src, dst, attributes, chunk_size)
+            copied += 1
+            if manifest is not None:
+                manifest.record(rel, file_size, mtime_ns)
+        except OSError as e:
+            errors.append((src, str(e)))
+    stats._add(copied, size, errors)
+
+
+def _link_target(link: str, src_root: str, dst_root: str) -> str:
+    target = os.readlink(link)
+    if target.startswith("\\\\?\\"):
+        target = target[4:]
+    absolute = os.path.normpath(os.path.join(os.path.dirname(link), target))
+    try:
+        inside = os.path.commonpath([os.path.normcase(absolute), os.path.normcase(src_root)]) \
+            == os.path.normcase(src_root)
+    except ValueError:
+        inside = False
+    if inside:
+        return os.path.join(dst_root, os.path.relpath(absolute, src_root))
+    return target
+
+
+def is_link(entry: os.DirEntry) -> bool:
+    """
+    Symlinks and junctions only. Other reparse points (OneDrive / cloud file
+    placeholders, deduplicated files) are ordinary files and folders to copy.
+    """
+    if entry.is_symlink():
+        return True
+    try:
+        tag = getattr(entry.stat(follow_symlinks=False), "st_reparse_tag", 0)
+    except OSError:
+        return False
+    return tag == IO_REPARSE_TAG_MOUNT_POINT
+
+
+def _recreate_link(entry: os.DirEntry, dst: str, src_root: str, dst_root: str) -> None:
+    target = _link_target(entry.path, src_root, dst_root)
+    if os.path.lexists(dst):
+        return
+    if entry.is_symlink():
+        os.symlink(target, dst, target_is_directory=entry.is_dir())
+    else:
+        # Junction (mount point reparse tag)
+        subprocess.run(["cmd", "/c", "mklink", "/J", dst, target], capture_output=True, check=True)
+    # Profile junctions are hidden system entries
+    _set_attributes(dst, file_attributes(entry))
+
+
+def copy_tree(src_root: str, dst_root: str, manifest: Optional[CopyManifest] = None,
+              max_workers: int = DEFAULT_WORKERS, chunk_size: int = CHUNK_SIZE) -> CopyStats:
+    """
+    Copy `src_root` into `dst_root` (created if missing). Files recorded in
+    `manifest` with unchanged size and mtime are skipped.
+    """
+    stats = CopyStats()
+    started = time.perf_counter()
+    src_root = os.path.normpath(src_root)
+    dst_root = os.path.normpath(dst_root)
+    os.makedirs(dst_root, exist_ok=True)
+
+    directories: List[Tuple[str, str, int]] = [(src_root, dst_root, 0)]
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        batch: List[Tuple[str, str, str, int, int, int]] = []
+        batch_bytes = 0
+
+        index = 0
+        while index < len(directories):
+            src_dir, dst_dir, _ = directories[index]
+            index += 1
+            try:
+                with os.scandir(src_dir) as it:
+                    entries = list(it)
+            except OSError as e:
+                stats.errors.append((src_dir, str(e)))
+                continue
+
+            for entry in entries:
+                dst = os.path.join(dst_dir, entry.name)
+                try:
+                    if is_link(entry):
+                        _recreate_link(entry, dst, src_root, dst_root)
+                        stats.links += 1
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    if entry.is_dir(follow_symlinks=False):
+                        os.makedirs(dst, exist_ok=True)
+                        directories.append((entry.path, dst, getattr(st, "st_file_attributes", 0)))
+                        stats.dirs += 1
+                        continue
+
+                    rel = os.path.relpath(entry.path, src_root)
+                    if manifest is not None and manifest.is_done(rel, st.st_size, st.st_mtime_ns) \
+                            and os.path.exists(dst):
+                        stats.files_skipped += 1
+                        continue
+
+                    batch.append((rel, entry.path, dst, st.st_size, st.st_mtime_ns,
+                                  getattr(st, "st_file_attributes", 0)))
+                    batch_bytes += st.st_size
+                    if len(batch) >= BATCH_SIZE or batch_bytes >= BATCH_BYTES:
+                        futures.append(pool.submit(_copy_batch, batch, manifest, stats, chunk_size))
+                        batch, batch_bytes = [], 0
+                except (OSError, subprocess.CalledProcessError) as e:
+                    stats.errors.append((entry.path, str(e)))
+
+        if batch:
+            futures.append(pool.submit(_copy_batch, batch, manifest, stats, chunk_size))
+        for future in as_completed(futures):
+            future.result()
+
+    # Directory times and attributes last: creating files inside changes them
+    for src_dir, dst_dir, attributes in reversed(directories):
+        try:
+            shutil.copystat(src_dir, dst_dir, follow_symlinks=False)
+            _set_attributes(dst_dir, attributes)
+        except OSError as e:
+            stats.errors.append((dst_dir, str(e)))
+
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def _file_hash(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    buf = _buffer(chunk_size)
+    view = memoryview(buf)
+    with open(path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def verify_tree(src_root: str, dst_root: str, deep: bool = False,
+                max_workers: int = DEFAULT_WORKERS) -> List[str]:
+    """
+    Check that every file of the source exists on the target with the same
+    size and mtime (and the same contents if deep). Returns mismatching
+    relative paths; an empty list means the copy is complete.
+    """
+    mismatches: List[str] = []
+    pairs: List[Tuple[str, str, str]] = []
+
+    stack = [src_root]
+    while stack:
+        src_dir = stack.pop()
+        try:
+            with os.scandir(src_dir) as it:
+                entries = list(it)
+        except OSError:
+            mismatches.append(os.path.relpath(src_dir, src_root))
+            continue
+        for entry in entries:
+            rel = os.path.relpath(entry.path, src_root)
+            dst = os.path.join(dst_root, rel)
+            if is_link(entry):
+                if not os.path.lexists(dst):
+                    mismatches.append(rel)
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+                continue
+            try:
+                s = entry.stat(follow_symlinks=False)
+                d = os.stat(dst, follow_symlinks=False)
+            except OSError:
+                mismatches.append(rel)
+                continue
+            # Compare mtimes at 2 s resolution, the coarsest of the file systems we copy to
+            if s.st_size != d.st_size or abs(s.st_mtime_ns - d.st_mtime_ns) >= 2_000_000_000:
+                mismatches.append(rel)
+            elif deep:
+                pairs.append((rel, entry.path, dst))
+
+    if pairs:
+        def _compare(pair: Tuple[str, str, str]) -> Optional[str]:
+            rel, src, dst = pair
+            try:
+                return None if _file_hash(src) == _file_hash(dst) else rel
+            except OSError:
+                return rel
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            mismatches.extend(rel for rel in pool.map(_compare, pairs) if rel is not None)
+
+    return mismatches
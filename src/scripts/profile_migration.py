@@ -0,0 +1,138 @@
+"""
+Move existing user profiles to another drive.
+
+set_profiles_directory() only affects profiles created later. migrate_profile()
+moves an existing one:
+
+  1. refuse if the user's hive is loaded (the user is logged on);
+  2. copy the root folder's owner and DACL, so everything copied below it
+     inherits the user's access;
+  3. copy the tree with scripts.profile_copy, checkpointed in
+     Cache/migration/<SID>.manifest – an interrupted run resumes there;
+  4. verify the copy and only then point ProfileImagePath to the new folder.
+
+The old folder is left in place; delete it once the user has logged on
+successfully from the new location.
+"""
+import os
+import winreg
+from pathlib import Path
+from typing import List, Optional
+
+import win32security
+
+from core.utils import get_folder_path
+from scripts.delete_user_profiles import PROFILE_LIST_PATH, profile_unloaded
+from scripts.orphaned_profiles import read_profile_list
+from scripts.principals import get_resolver
+from scripts.profile_copy import CopyManifest, CopyStats, copy_tree, verify_tree
+
+SECURITY_INFO = (win32security.OWNER_SECURITY_INFORMATION | win32security.GROUP_SECURITY_INFORMATION
+                 | win32security.DACL_SECURITY_INFORMATION)
+
+# Needed to set another account as owner of the new folder
+MIGRATION_PRIVILEGES = ("SeRestorePrivilege", "SeBackupPrivilege", "SeTakeOwnershipPrivilege")
+
+
+class MovableProfile:
+    def __init__(self, sid: str, path: str, owner: Optional[str]):
+        self.sid = sid
+        self.path = path
+        self.owner = owner
+
+
+class MigrationResult:
+    def __init__(self, profile: MovableProfile, target: str):
+        self.profile = profile
+        self.target = target
+        self.stats: Optional[CopyStats] = None
+        self.mismatches: List[str] = []
+        self.registry_updated = False
+        self.error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.registry_updated and self.error is None
+
+
+def list_movable_profiles() -> List[MovableProfile]:
+    """Profiles of local and domain users (S-1-5-21-*) that exist on disk."""
+    _, entries = read_profile_list()
+    sids = [key for key, path in entries.items() if key.startswith("S-1-5-21-") and path and os.path.isdir(path)]
+    names = get_resolver().names_for_sids(sids)
+    return [MovableProfile(sid, entries[sid], names.get(sid)) for sid in sids]
+
+
+def enable_privileges(names=MIGRATION_PRIVILEGES) -> None:
+    token = win32security.OpenProcessToken(
+        win32security.GetCurrentProcess(),
+        win32security.TOKEN_ADJUST_PRIVILEGES | win32security.TOKEN_QUERY,
+    )
+    privileges = [(win32security.LookupPrivilegeValue(None, name), win32security.SE_PRIVILEGE_ENABLED)
+                  for name in names]
+    win32security.AdjustTokenPrivileges(token, False, privileges)
+
+
+def copy_root_security(src: str, dst: str) -> None:
+    sd = win32security.GetFileSecurity(src, SECURITY_INFO)
+    win32security.SetFileSecurity(dst, SECURITY_INFO, sd)
+
+
+def target_path(profile: MovableProfile, drive: str) -> str:
+    """<drive>\\Users\\<same folder name>, as set_profiles_directory() lays it out."""
+    return os.path.join(drive.rstrip("\\") + "\\", "Users", os.path.basename(os.path.normpath(profile.path)))
+
+
+def manifest_path(sid: str) -> Path:
+    return get_folder_path("Cache") / "migration" / f"{sid}.manifest"
+
+
+def set_profile_image_path(sid: str, path: str) -> None:
+    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, rf"{PROFILE_LIST_PATH}\{sid}", 0,
+                        winreg.KEY_SET_VALUE) as key:
+        winreg.SetValueEx(key, "ProfileImagePath", 0, winreg.REG_EXPAND_SZ, path)
+
+
+def migrate_profile(profile: MovableProfile, drive: str, deep_verify: bool = False) -> MigrationResult:
+    target = target_path(profile, drive)
+    result = MigrationResult(profile, target)
+
+    if os.path.normcase(os.path.normpath(target)) == os.path.normcase(os.path.normpath(profile.path)):
+        result.error = "profile is already on this drive"
+        return result
+    if not profile_unloaded(profile.sid):
+        result.error = "profile is in use (user logged on)"
+        return result
+
+    manifest = CopyManifest(manifest_path(profile.sid)).load()
+    try:
+        enable_privileges()
+        os.makedirs(target, exist_ok=True)
+        copy_root_security(profile.path, target)
+        result.stats = copy_tree(profile.path, target, manifest)
+    except Exception as e:
+        result.error = str(e)
+        return result
+    finally:
+        manifest.close()
+
+    if result.stats.errors:
+        result.error = f"{len(result.stats.errors)} item(s) could not be copied; run again to resume"
+        return result
+
+    result.mismatches = verify_tree(profile.path, target, deep=deep_verify)
+    if result.mismatches:
+        # Drop the bad copies: files missing on the target are copied again on resume
+        for rel in result.mismatches:
+            try:
+                os.chmod(os.path.join(target, rel), 0o666)
+                os.remove(os.path.join(target, rel))
+            except OSError:
+                pass
+        result.error = f"verification failed for {len(result.mismatches)} file(s); run again to resume"
+        return result
+
+    set_profile_image_path(profile.sid, target)
+    result.registry_updated = True
+    manifest.remove()
+    return result
@@ -0,0 +1,189 @@
+"""
+Disk usage of every user profile under the ProfilesDirectory.
+
+Each profile folder is scanned by its own worker. For every directory the
+cache keeps the direct totals (bytes and count of the files in it) and the
+names of its subdirectories, keyed on the directory mtime. A rescan stats each
+directory once and lists only those whose mtime changed, so repeated runs only
+pay for what was added, removed or renamed since the last one. Files that grow
+in place don't touch the directory mtime; use refresh=True for an exact scan.
+
+The cache is stored gzip-compressed as JSON in Cache/profile_sizes.json.gz.
+"""
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from scripts.fs_delete import is_link
+
+CACHE_FILE_NAME = "profile_sizes.json.gz"
+
+# Subfolders listed per profile, and how deep they are looked for
+DEFAULT_TOP_N = 5
+TOP_DEPTH = 2
+
+MAX_PROFILE_WORKERS = 16
+
+# Directory path -> [mtime_ns, own bytes, own file count, [subdirectory names]]
+CacheEntry = List
+DirCache = Dict[str, CacheEntry]
+
+
+class ProfileUsage:
+    """Totals of one profile folder."""
+
+    def __init__(self, path: str, owner: Optional[str] = None):
+        self.path = path
+        self.owner = owner                                  # account name, if known
+        self.bytes = 0
+        self.files = 0
+        self.dirs = 0
+        self.top: List[Tuple[str, int]] = []                # (relative path, bytes), largest first
+        self.scanned = 0                                    # directories listed
+        self.reused = 0                                     # directories taken from cache
+        self.errors = 0
+        self.elapsed = 0.0
+
+
+def load_cache(path: Path) -> DirCache:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_cache(path: Path, cache: DirCache) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=5) as f:
+        json.dump(cache, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _list_dir(path: str, mtime_ns: int) -> Tuple[CacheEntry, int]:
+    """Scan one directory level; returns (cache entry, errors)."""
+    size = files = errors = 0
+    subdirs: List[str] = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if is_link(entry):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    else:
+                        size += entry.stat(follow_symlinks=False).st_size
+                        files += 1
+                except OSError:
+                    errors += 1
+    except OSError:
+        errors += 1
+    return [mtime_ns, size, files, subdirs], errors
+
+
+def scan_profile(root: str, cache: DirCache, refresh: bool = False,
+                 top_n: int = DEFAULT_TOP_N) -> Tuple[ProfileUsage, DirCache]:
+    """
+    Size one profile. `cache` is only read; the entries of every directory
+    visited are returned as a new dict to be merged by the caller.
+    """
+    started = time.perf_counter()
+    usage = ProfileUsage(root)
+    visited: DirCache = {}
+
+    order: List[Tuple[str, Optional[str], int]] = []      # (path, parent, depth) in pre-order
+    own: Dict[str, int] = {}
+    stack: List[Tuple[str, Optional[str], int]] = [(root, None, 0)]
+
+    while stack:
+        path, parent, depth = stack.pop()
+        try:
+            mtime_ns = os.stat(path, follow_symlinks=False).st_mtime_ns
+        except OSError:
+            usage.errors += 1
+            continue
+
+        entry = cache.get(path)
+        if refresh or entry is None or entry[0] != mtime_ns:
+            entry, errors = _list_dir(path, mtime_ns)
+            usage.errors += errors
+            usage.scanned += 1
+        else:
+            usage.reused += 1
+
+        visited[path] = entry
+        order.append((path, parent, depth))
+        own[path] = entry[1]
+        usage.files += entry[2]
+        for name in entry[3]:
+            stack.append((os.path.join(path, name), path, depth + 1))
+
+    # Bottom-up totals: children always come after their parent in pre-order
+    totals = dict(own)
+    for path, parent, _ in reversed(order):
+        if parent is not None:
+            totals[parent] += totals[path]
+
+    usage.bytes = totals.get(root, 0)
+    usage.dirs = max(0, len(order) - 1)
+    candidates = [(os.path.relpath(p, root), totals[p]) for p, _, d in order if 0 < d <= TOP_DEPTH]
+    usage.top = sorted(candidates, key=lambda item: item[1], reverse=True)[:top_n]
+    usage.elapsed = time.perf_counter() - started
+    return usage, visited
+
+
+def scan_profiles(roots: List[str], cache: DirCache, refresh: bool = False,
+                  top_n: int = DEFAULT_TOP_N) -> Tuple[List[ProfileUsage], DirCache]:
+    """Scan several profiles concurrently, one worker per profile; returns (usages, new cache)."""
+    if not roots:
+        return [], {}
+
+    new_cache: DirCache = {}
+    usages: List[ProfileUsage] = []
+    with ThreadPoolExecutor(max_workers=min(MAX_PROFILE_WORKERS, len(roots))) as pool:
+        for usage, visited in pool.map(lambda r: scan_profile(r, cache, refresh, top_n), roots):
+            usages.append(usage)
+            new_cache.update(visited)
+    return usages, new_cache
+
+
+def analyze_profiles(cache_path: Path, refresh: bool = False,
+                     top_n: int = DEFAULT_TOP_N) -> Tuple[str, List[ProfileUsage]]:
+    """
+    Size every folder of the ProfilesDirectory, largest first, with owners
+    taken from ProfileList. Returns (profiles directory, usages).
+    """
+    from scripts.orphaned_profiles import read_profile_list
+    from scripts.principals import get_resolver
+
+    profiles_dir, entries = read_profile_list()
+    owners_by_path = {}
+    names = get_resolver().names_for_sids(key for key in entries if not key.lower().endswith(".bak"))
+    for key, path in entries.items():
+        if path and names.get(key):
+            owners_by_path[os.path.normcase(os.path.normpath(path))] = names[key]
+
+    roots = []
+    try:
+        with os.scandir(profiles_dir) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False) and not is_link(entry):
+                    roots.append(entry.path)
+    except OSError:
+        pass
+
+    cache = {} if refresh else load_cache(cache_path)
+    usages, new_cache = scan_profiles(roots, cache, refresh, top_n)
+    save_cache(cache_path, new_cache)
+
+    for usage in usages:
+        usage.owner = owners_by_path.get(os.path.normcase(os.path.normpath(usage.path)))
+    usages.sort(key=lambda u: u.bytes, reverse=True)
+    return profiles_dir, usages
@@ -0,0 +1,354 @@
+"""
+Read and write Registry.pol (PReg) files without LGPO.exe.
+
+Format: the signature b"PReg", a DWORD version (1), then entries
+
+    [key;value;type;size;data]
+
+where the brackets and semicolons are UTF-16LE characters, key and value are
+null-terminated UTF-16LE strings, type and size are little-endian DWORDs and
+data is `size` raw bytes. Keys are relative to HKLM (Machine) or HKCU (User).
+
+PolicyFile maps the file and yields PolEntry tuples whose data is a memoryview
+into the mapping, so nothing but the key and value names is copied. The views
+are only valid inside the `with` block; read_pol() copies everything out when
+the entries have to outlive the file.
+
+LGPO /b puts the files at <backup>\\{GUID}\\DomainSysvol\\GPO\\Machine\\registry.pol
+and ...\\User\\registry.pol; find_pol_files() locates them.
+
+Usage:
+    with PolicyFile(path) as pol:
+        for key, value, reg_type, data in pol:
+            print(key, value, decode_data(reg_type, data))
+
+    python -m scripts.registry_pol <backup dir or .pol file>
+    python -m scripts.registry_pol --check      # parse the fixtures in scripts/fixtures
+"""
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+SIGNATURE = b"PReg"
+VERSION = 1
+HEADER = struct.pack("<4sI", SIGNATURE, VERSION)
+
+OPEN = "[".encode("utf-16-le")
+CLOSE = "]".encode("utf-16-le")
+SEP = ";".encode("utf-16-le")
+NUL = b"\x00\x00"
+DWORD = struct.Struct("<I")
+
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_DWORD_BIG_ENDIAN = 5
+REG_MULTI_SZ = 7
+REG_QWORD = 11
+
+TYPE_NAMES = {
+    REG_NONE: "REG_NONE", REG_SZ: "REG_SZ", REG_EXPAND_SZ: "REG_EXPAND_SZ", REG_BINARY: "REG_BINARY",
+    REG_DWORD: "REG_DWORD", REG_DWORD_BIG_ENDIAN: "REG_DWORD_BIG_ENDIAN", REG_MULTI_SZ: "REG_MULTI_SZ",
+    REG_QWORD: "REG_QWORD",
+}
+
+# Special value names the policy engine interprets instead of writing them
+DEL_PREFIX = "**del."               # delete the value named after the prefix
+DELVALS = "**delvals."              # delete every value of the key
+DELETE_VALUES = "**deletevalues"    # data: ";"-separated value names to delete
+DELETE_KEYS = "**deletekeys"        # data: ";"-separated subkeys to delete
+SECURE_KEY = "**securekey"
+SOFT_PREFIX = "**soft."             # write the value only if it doesn't exist
+
+SCOPES = ("Machine", "User")
+
+
+class PolError(ValueError):
+    pass
+
+
+class PolEntry(NamedTuple):
+    key: str
+    value: str
+    type: int
+    data: Union[bytes, memoryview]
+
+    @property
+    def is_directive(self) -> bool:
+        return self.value.startswith("**")
+
+    def ident(self) -> tuple:
+        """Case-insensitive identity of the (key, value) pair, as the registry compares them."""
+        return self.key.lower(), self.value.lower()
+
+
+def _string_end(buf, start: int) -> int:
+    """Offset of the UTF-16 null that ends the string at `start`."""
+    pos = start
+    while True:
+        pos = buf.find(NUL, pos)
+        if pos < 0:
+            raise PolError(f"unterminated string at offset {start}")
+        if (pos - start) % 2 == 0:
+            return pos
+        pos += 1
+
+
+def _expect(buf, pos: int, token: bytes) -> int:
+    if buf[pos:pos + 2] != token:
+        raise PolError(f"expected {token.decode('utf-16-le')!r} at offset {pos}")
+    return pos + 2
+
+
+def _dword(view, pos: int) -> int:
+    if pos + 4 > len(view):
+        raise PolError(f"truncated entry at offset {pos}")
+    return DWORD.unpack_from(view, pos)[0]
+
+
+def iter_entries(buf) -> Iterator[PolEntry]:
+    """
+    Entries of a PReg image in `buf` (bytes or mmap). data is a memoryview
+    slice of `buf`.
+    """
+    view = memoryview(buf)
+    if len(view) < 8 or bytes(view[:4]) != SIGNATURE:
+        raise PolError("not a Registry.pol file (bad signature)")
+    if _dword(view, 4) != VERSION:
+        raise PolError("unsupported Registry.pol version")
+
+    size = len(view)
+    pos = 8
+    while pos < size:
+        pos = _expect(buf, pos, OPEN)
+
+        end = _string_end(buf, pos)
+        key = bytes(view[pos:end]).decode("utf-16-le")
+        pos = _expect(buf, end + 2, SEP)
+
+        end = _string_end(buf, pos)
+        value = bytes(view[pos:end]).decode("utf-16-le")
+        pos = _expect(buf, end + 2, SEP)
+
+        reg_type = _dword(view, pos)
+        pos = _expect(buf, pos + 4, SEP)
+        length = _dword(view, pos)
+        pos = _expect(buf, pos + 4, SEP)
+
+        if pos + length > size:
+            raise PolError(f"data of {key}\\{value} runs past the end of the file")
+        data = view[pos:pos + length]
+        pos = _expect(buf, pos + length, CLOSE)
+
+        yield PolEntry(key, value, reg_type, data)
+
+
+class PolicyFile:
+    """A Registry.pol mapped into memory; iterate it inside a `with` block."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+
+    def __enter__(self) -> "PolicyFile":
+        self._file = open(self.path, "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[PolEntry]:
+        if self._map is None:
+            # Windows leaves an empty (0 byte) file when a scope has no settings
+            return iter(())
+        return iter_entries(self._map)
+
+    def close(self) -> None:
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # A caller still holds a data view; the mapping goes away with it
+                pass
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_pol(path: Union[str, Path]) -> List[PolEntry]:
+    """All entries of a Registry.pol, with data copied to bytes."""
+    with PolicyFile(path) as pol:
+        return [PolEntry(e.key, e.value, e.type, bytes(e.data)) for e in pol]
+
+
+def encode_entries(entries: Iterable[PolEntry]) -> bytes:
+    parts = [HEADER]
+    for key, value, reg_type, data in entries:
+        parts += [
+            OPEN, key.encode("utf-16-le"), NUL, SEP,
+            value.encode("utf-16-le"), NUL, SEP,
+            DWORD.pack(reg_type), SEP,
+            DWORD.pack(len(data)), SEP,
+            bytes(data), CLOSE,
+        ]
+    return b"".join(parts)
+
+
+def write_pol(path: Union[str, Path], entries: Iterable[PolEntry]) -> None:
+    """Write entries as a Registry.pol, replacing the file atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(encode_entries(entries))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def decode_data(reg_type: int, data) -> Union[int, str, List[str], bytes]:
+    """Registry data as the Python value winreg uses for the same type."""
+    data = bytes(data)
+    if reg_type in (REG_SZ, REG_EXPAND_SZ):
+        return data.decode("utf-16-le").split("\x00", 1)[0]
+    if reg_type == REG_MULTI_SZ:
+        text = data.decode("utf-16-le").rstrip("\x00")
+        return text.split("\x00") if text else []
+    if reg_type == REG_DWORD and len(data) >= 4:
+        return struct.unpack_from("<I", data)[0]
+    if reg_type == REG_DWORD_BIG_ENDIAN and len(data) >= 4:
+        return struct.unpack_from(">I", data)[0]
+    if reg_type == REG_QWORD and len(data) >= 8:
+        return struct.unpack_from("<Q", data)[0]
+    return data
+
+
+def encode_data(reg_type: int, value) -> bytes:
+    """Inverse of decode_data()."""
+    if reg_type in (REG_SZ, REG_EXPAND_SZ):
+        return (str(value) + "\x00").encode("utf-16-le")
+    if reg_type == REG_MULTI_SZ:
+        return ("".join(s + "\x00" for s in value) + "\x00").encode("utf-16-le")
+    if reg_type == REG_DWORD:
+        return struct.pack("<I", value)
+    if reg_type == REG_DWORD_BIG_ENDIAN:
+        return struct.pack(">I", value)
+    if reg_type == REG_QWORD:
+        return struct.pack("<Q", value)
+    return bytes(value)
+
+
+def directive_targets(entry: PolEntry) -> List[str]:
+    """The ";"-separated value names or subkeys of a **DeleteValues / **DeleteKeys entry."""
+    return [t.strip() for t in str(decode_data(REG_SZ, entry.data)).split(";") if t.strip()]
+
+
+def _resets(directive: str, key: str, target: str, entry: PolEntry) -> bool:
+    """Whether `entry` creates again what `target` of a directive on `key` deletes."""
+    if entry.is_directive and not entry.value.lower().startswith(SOFT_PREFIX):
+        return False
+    if directive == DELETE_VALUES:
+        value = entry.value.lower()
+        value = value[len(SOFT_PREFIX):] if value.startswith(SOFT_PREFIX) else value
+        return entry.key.lower() == key.lower() and value == target.lower()
+    path = f"{key}\\{target}".lower()
+    return entry.key.lower() == path or entry.key.lower().startswith(path + "\\")
+
+
+def fold_list_directive(old: PolEntry, between: Iterable[PolEntry], new: PolEntry) -> PolEntry:
+    """
+    One **DeleteValues / **DeleteKeys entry at the place of `new` that also does
+    the deletions of the earlier `old` on the same key. Targets of `old` that an
+    entry in `between` sets again are left out, as that entry would have won.
+    """
+    directive = new.value.lower()
+    between = list(between)
+    targets = directive_targets(new)
+    seen = {t.lower() for t in targets}
+    for target in directive_targets(old):
+        if target.lower() in seen or any(_resets(directive, old.key, target, e) for e in between):
+            continue
+        seen.add(target.lower())
+        targets.append(target)
+    return new._replace(type=REG_SZ, data=encode_data(REG_SZ, ";".join(targets)))
+
+
+def find_pol_files(backup_dir: Union[str, Path]) -> Dict[str, Path]:
+    """{"Machine": path, "User": path} for the registry.pol files found in an LGPO backup."""
+    found: Dict[str, Path] = {}
+    for root, _, files in os.walk(backup_dir):
+        scope = os.path.basename(root)
+        for name in files:
+            if name.lower() == "registry.pol":
+                for known in SCOPES:
+                    if scope.lower() == known.lower():
+                        found.setdefault(known, Path(root) / name)
+    return found
+
+
+def _self_check() -> None:
+    """Parse and round-trip the fixture files (scripts/fixtures)."""
+    fixtures = Path(__file__).resolve().parent / "fixtures"
+    raw = (fixtures / "registry.pol").read_bytes()
+    with PolicyFile(fixtures / "registry.pol") as pol:
+        entries = [PolEntry(e.key, e.value, e.type, bytes(e.data)) for e in pol]
+
+    # The odd-length REG_BINARY puts every later entry at an odd offset
+    assert [(e.value, decode_data(e.type, e.data)) for e in entries] == [
+        ("DenyUnspecified", 1),
+        ("Blob", b"\x01\x02\x03"),
+        ("", "default"),
+        ("1", "USBSTOR\\DiskSanDisk_Cruzer____1.00"),
+        ("**delvals.", " "),
+        ("**del.DenyRemovableDevices", " "),
+        ("**DeleteValues", "AllowDenyLayered;DenyAll"),
+        ("**DeleteKeys", "DenyDeviceClasses"),
+        ("**soft.Note", ["één", "two"]),
+        ("**SecureKey", 1),
+        ("Big", 2 ** 40),
+    ], entries
+    assert entries[-1].key == "Software\\Policies\\Tést"
+    assert [e.is_directive for e in entries].count(True) == 6
+    assert encode_entries(entries) == raw
+    assert list(iter_entries(encode_entries(iter_entries(raw)))) == list(iter_entries(raw))
+
+    with PolicyFile(fixtures / "empty.pol") as pol:
+        assert list(pol) == []
+    assert read_pol(fixtures / "empty.pol") == []
+
+    for broken, message in ((raw[:-1], "expected"), (raw[:-7], "past the end"), (b"PReg", "signature"),
+                            (b"XReg" + raw[4:], "signature")):
+        try:
+            list(iter_entries(broken))
+        except PolError as e:
+            assert message in str(e), e
+        else:
+            raise AssertionError(f"no PolError for {message}")
+    print("[+] registry_pol: fixtures parsed and round-tripped OK")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["--check"]:
+        _self_check()
+        sys.exit(0)
+
+    target = Path(sys.argv[1] if len(sys.argv) > 1 else ".")
+    files = {"": target} if target.is_file() else find_pol_files(target)
+    if not files:
+        print(f"[!] No registry.pol found under {target}")
+    for scope, path in files.items():
+        print(f"[*] {scope or 'File'}: {path}")
+        with PolicyFile(path) as pol:
+            for entry in pol:
+                shown = decode_data(entry.type, entry.data)
+                print(f"    {entry.key}\\{entry.value} = {TYPE_NAMES.get(entry.type, entry.type)} {shown!r}")
@@ -0,0 +1,231 @@
+"""
+Start or stop a set of services in dependency order.
+
+The dependency graph comes from a services snapshot (DependOnService). Starting
+a service first starts the dependencies that aren't running. Stopping one first
+stops the running services that depend on it. The graph is cut into
+topological waves: every service in a wave only depends on earlier waves, so
+all of a wave is started (or stopped) in parallel, one thread per service.
+
+Waiting for a state change polls QueryServiceStatus with a growing delay,
+starting at 50 ms. Most services settle in well under a second, so this
+reacts sooner than a fixed 1 s sleep. Load-order group dependencies ("+Group")
+are left to the SCM.
+
+Usage:
+    result = start_services(["TermService"])
+    result.print()
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+
+import win32service
+
+from scripts.services_snapshot import GROUP_PREFIX, ServiceSnapshot, snapshot_services
+
+POLL_MIN_DELAY = 0.05
+POLL_MAX_DELAY = 1.0
+CONTROL_TIMEOUT = 30
+
+SERVICE_ACCESS = win32service.SERVICE_START | win32service.SERVICE_STOP | win32service.SERVICE_QUERY_STATUS
+
+
+class ControlResult:
+    def __init__(self, action: str):
+        self.action = action
+        self.waves: List[List[str]] = []
+        self.done: List[str] = []
+        self.skipped: List[str] = []            # already in the wanted state
+        self.failed: Dict[str, str] = {}
+        self.elapsed = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def print(self):
+        for i, wave in enumerate(self.waves, 1):
+            print(f"[*] Wave {i}: {', '.join(wave)}")
+        for name, error in self.failed.items():
+            print(f"[!] {name}: {error}")
+        print(f"[=] {self.action}: {len(self.done)} done, {len(self.skipped)} already there, "
+              f"{len(self.failed)} failed in {self.elapsed:.2f}s")
+
+
+def wait_for_state(service, wanted: int, timeout: float = CONTROL_TIMEOUT) -> int:
+    """Poll with an exponentially growing delay; returns the last state seen."""
+    deadline = time.monotonic() + timeout
+    delay = POLL_MIN_DELAY
+    while True:
+        state = win32service.QueryServiceStatus(service)[1]
+        if state == wanted or time.monotonic() >= deadline:
+            return state
+        if wanted == win32service.SERVICE_RUNNING and state == win32service.SERVICE_STOPPED:
+            # Gave up starting (or was never started); waiting longer won't help
+            return state
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 2, POLL_MAX_DELAY)
+
+
+def _service_dependencies(snapshot: ServiceSnapshot, name: str) -> List[str]:
+    record = snapshot.get(name)
+    if record is None:
+        return []
+    return [d for d in record.dependencies if not d.startswith(GROUP_PREFIX) and d in snapshot]
+
+
+def _dependents(snapshot: ServiceSnapshot) -> Dict[str, List[str]]:
+    reverse: Dict[str, List[str]] = {}
+    for record in snapshot:
+        for dependency in _service_dependencies(snapshot, record.name):
+            reverse.setdefault(dependency.lower(), []).append(record.name)
+    return reverse
+
+
+def _closure(names: Iterable[str], edges) -> Set[str]:
+    seen: Set[str] = set()
+    stack = [n.lower() for n in names]
+    while stack:
+        name = stack.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        stack.extend(e.lower() for e in edges(name))
+    return seen
+
+
+def plan_waves(nodes: Set[str], edges) -> List[List[str]]:
+    """
+    Layer `nodes` so each node comes after everything edges(node) returns that
+    is also in `nodes`. Members of a dependency cycle end up in one last wave.
+    """
+    pending = {n: {e.lower() for e in edges(n)} & nodes - {n} for n in nodes}
+    waves: List[List[str]] = []
+    while pending:
+        ready = sorted(n for n, before in pending.items() if not before)
+        if not ready:
+            waves.append(sorted(pending))
+            break
+        waves.append(ready)
+        for n in ready:
+            del pending[n]
+        for before in pending.values():
+            before.difference_update(ready)
+    return waves
+
+
+def _run_waves(result: ControlResult, waves: List[List[str]], snapshot: ServiceSnapshot,
+               operation, timeout: float) -> None:
+    scm = win32service.OpenSCManager(None, None, win32service.SC_MANAGER_CONNECT)
+    try:
+        for wave in waves:
+            names = [snapshot.get(n).name for n in wave]
+            result.waves.append(names)
+            with ThreadPoolExecutor(max_workers=len(names)) as pool:
+                errors = list(pool.map(lambda n: operation(scm, n, timeout), names))
+            for name, error in zip(names, errors):
+                if error:
+                    result.failed[name] = error
+                else:
+                    result.done.append(name)
+            if result.failed:
+                # Later waves depend on this one
+                break
+    finally:
+        win32service.CloseServiceHandle(scm)
+
+
+def _start_one(scm, name: str, timeout: float) -> Optional[str]:
+    try:
+        service = win32service.OpenService(scm, name, SERVICE_ACCESS)
+    except win32service.error as e:
+        return str(e)
+    try:
+        try:
+            win32service.StartService(service, None)
+        except win32service.error as e:
+            if e.winerror != 1056:  # ERROR_SERVICE_ALREADY_RUNNING
+                return str(e)
+        state = wait_for_state(service, win32service.SERVICE_RUNNING, timeout)
+        return None if state == win32service.SERVICE_RUNNING else f"not running after start (state {state})"
+    finally:
+        win32service.CloseServiceHandle(service)
+
+
+def _stop_one(scm, name: str, timeout: float) -> Optional[str]:
+    try:
+        service = win32service.OpenService(scm, name, SERVICE_ACCESS)
+    except win32service.error as e:
+        return str(e)
+    try:
+        try:
+            win32service.ControlService(service, win32service.SERVICE_CONTROL_STOP)
+        except win32service.error as e:
+            if e.winerror != 1062:  # ERROR_SERVICE_NOT_ACTIVE
+                return str(e)
+        state = wait_for_state(service, win32service.SERVICE_STOPPED, timeout)
+        return None if state == win32service.SERVICE_STOPPED else f"did not stop (state {state})"
+    finally:
+        win32service.CloseServiceHandle(service)
+
+
+def start_services(names: Iterable[str], timeout: float = CONTROL_TIMEOUT,
+                   snapshot: Optional[ServiceSnapshot] = None) -> ControlResult:
+    """Start `names` and the dependencies they need, dependencies first."""
+    start = time.perf_counter()
+    snapshot = snapshot or snapshot_services()
+    result = ControlResult("start")
+
+    names = list(names)
+    for name in names:
+        if name not in snapshot:
+            result.failed[name] = "service not found"
+    wanted = _closure([n for n in names if n in snapshot], lambda n: _service_dependencies(snapshot, n))
+
+    nodes = set()
+    for name in wanted:
+        record = snapshot.get(name)
+        if record.running:
+            result.skipped.append(record.name)
+        elif record.start_type == win32service.SERVICE_DISABLED:
+            result.failed[record.name] = "service is disabled"
+        else:
+            nodes.add(name)
+
+    if not result.failed:
+        waves = plan_waves(nodes, lambda n: _service_dependencies(snapshot, n))
+        _run_waves(result, waves, snapshot, _start_one, timeout)
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def stop_services(names: Iterable[str], timeout: float = CONTROL_TIMEOUT,
+                  snapshot: Optional[ServiceSnapshot] = None) -> ControlResult:
+    """Stop `names` and every running service that depends on them, dependents first."""
+    start = time.perf_counter()
+    snapshot = snapshot or snapshot_services()
+    result = ControlResult("stop")
+    dependents = _dependents(snapshot)
+
+    names = list(names)
+    for name in names:
+        if name not in snapshot:
+            result.failed[name] = "service not found"
+    wanted = _closure([n for n in names if n in snapshot], lambda n: dependents.get(n, []))
+
+    nodes = set()
+    for name in wanted:
+        record = snapshot.get(name)
+        if record.state == win32service.SERVICE_STOPPED:
+            result.skipped.append(record.name)
+        else:
+            nodes.add(name)
+
+    if not result.failed:
+        waves = plan_waves(nodes, lambda n: dependents.get(n, []))
+        _run_waves(result, waves, snapshot, _stop_one, timeout)
+
+    result.elapsed = time.perf_counter() - start
+    return result
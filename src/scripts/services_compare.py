@@ -0,0 +1,84 @@
+"""
+Compare two service start-type profiles.
+
+Either side is a list of rows as load_services_from_csv() returns them
+(ServiceName, DisplayName, StartMode); live_rows() turns a snapshot into the
+same shape. Both sides are indexed by lower-case ServiceName once and joined
+on that key, so comparing a few hundred services is a couple of dict lookups
+each.
+"""
+from typing import Dict, List, Optional
+
+DRIFTED = "drifted"
+MISSING = "missing"     # in the left profile only
+EXTRA = "extra"         # in the right profile only
+
+KINDS = (DRIFTED, MISSING, EXTRA)
+
+
+class ServiceDiff:
+    __slots__ = ("kind", "name", "display_name", "left", "right")
+
+    def __init__(self, kind: str, name: str, display_name: str, left: Optional[str], right: Optional[str]):
+        self.kind = kind
+        self.name = name
+        self.display_name = display_name
+        self.left = left
+        self.right = right
+
+
+class ServiceComparison:
+    def __init__(self, left_title: str, right_title: str):
+        self.left_title = left_title
+        self.right_title = right_title
+        self.diffs: List[ServiceDiff] = []
+        self.same = 0
+
+    def count(self, kind: str) -> int:
+        return sum(1 for d in self.diffs if d.kind == kind)
+
+    def filter(self, kinds=KINDS, text: str = "", start_mode: Optional[str] = None) -> List[ServiceDiff]:
+        """Diffs of the given kinds whose name or display name contains `text` and either side has start_mode."""
+        text = text.lower()
+        return [
+            d for d in self.diffs
+            if d.kind in kinds
+            and (not text or text in d.name.lower() or text in d.display_name.lower())
+            and (start_mode is None or start_mode in (d.left, d.right))
+        ]
+
+
+def live_rows(snapshot) -> List[Dict[str, str]]:
+    return [{"ServiceName": name, "DisplayName": display, "StartMode": mode}
+            for name, display, mode in snapshot.startup_rows()]
+
+
+def _index(rows: List[Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    return {row["ServiceName"].lower(): row for row in rows}
+
+
+def compare_profiles(left: List[Dict[str, str]], right: List[Dict[str, str]],
+                     left_title: str = "saved", right_title: str = "live") -> ServiceComparison:
+    comparison = ServiceComparison(left_title, right_title)
+    right_index = _index(right)
+
+    seen = set()
+    for key, row in _index(left).items():
+        seen.add(key)
+        other = right_index.get(key)
+        if other is None:
+            comparison.diffs.append(ServiceDiff(MISSING, row["ServiceName"], row.get("DisplayName", ""),
+                                                row["StartMode"], None))
+        elif other["StartMode"] != row["StartMode"]:
+            comparison.diffs.append(ServiceDiff(DRIFTED, other["ServiceName"], other.get("DisplayName", ""),
+                                                row["StartMode"], other["StartMode"]))
+        else:
+            comparison.same += 1
+
+    for key, row in right_index.items():
+        if key not in seen:
+            comparison.diffs.append(ServiceDiff(EXTRA, row["ServiceName"], row.get("DisplayName", ""),
+                                                None, row["StartMode"]))
+
+    comparison.diffs.sort(key=lambda d: (KINDS.index(d.kind), d.name.lower()))
+    return comparison
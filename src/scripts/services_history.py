@@ -0,0 +1,190 @@
+"""
+Versioned service profiles stored as one base snapshot plus deltas.
+
+A history is a single Services/<name>.history.gz file. Every save appends one
+gzip member holding one JSON line; gzip readers treat concatenated members as
+one stream, so appending never rewrites earlier versions. Version 1 carries
+the full list of services, and every later version only the services whose
+display name or start mode changed ("set") and the ones that disappeared
+("del"). A daily save of an unchanged machine adds nothing, and a typical
+drift costs a few dozen bytes.
+
+Rebuilding version N replays the deltas up to N in memory, from the one file.
+A save that was cut short leaves a torn last member; it is ignored on load
+and cut off by the next save.
+
+Usage:
+    history = ServiceHistory(history_path("baseline"))
+    history.append(snapshot_services().startup_rows())
+    rows = history.rows(history.latest)
+"""
+import gzip
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.utils import get_folder_path
+
+HISTORY_SUFFIX = ".history.gz"
+
+# name -> (display name, start mode)
+State = Dict[str, Tuple[str, str]]
+
+
+class VersionInfo:
+    def __init__(self, number: int, saved_at: float, changed: int, removed: int):
+        self.number = number
+        self.saved_at = saved_at
+        self.changed = changed
+        self.removed = removed
+
+    @property
+    def label(self) -> str:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.saved_at))
+        if self.number == 1:
+            return f"v{self.number}  {when}  base, {self.changed} services"
+        return f"v{self.number}  {when}  {self.changed} changed, {self.removed} removed"
+
+
+def history_path(name: str) -> Path:
+    return get_folder_path('Services') / f"{name}{HISTORY_SUFFIX}"
+
+
+def list_histories() -> List[str]:
+    storage = get_folder_path('Services')
+    if not os.path.isdir(storage):
+        return []
+    return sorted(f[:-len(HISTORY_SUFFIX)] for f in os.listdir(storage) if f.endswith(HISTORY_SUFFIX))
+
+
+def _state(rows) -> State:
+    state: State = {}
+    for row in rows:
+        if isinstance(row, dict):
+            name, display, mode = row["ServiceName"], row.get("DisplayName", ""), row["StartMode"]
+        else:
+            name, display, mode = row
+        state[name] = (display, mode)
+    return state
+
+
+class ServiceHistory:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._entries: List[dict] = []
+        self._latest_state: State = {}
+        self._valid_size = 0
+        self.load()
+
+    @property
+    def name(self) -> str:
+        return self.path.name[:-len(HISTORY_SUFFIX)]
+
+    @property
+    def latest(self) -> int:
+        return len(self._entries)
+
+    def load(self) -> "ServiceHistory":
+        self._entries = []
+        self._valid_size = 0
+        data = self.path.read_bytes() if self.path.exists() else b""
+        while self._valid_size < len(data):
+            # One member at a time, so a torn last one can be cut off before the next append
+            member = zlib.decompressobj(wbits=31)
+            try:
+                line = member.decompress(data[self._valid_size:])
+                entry = json.loads(line)
+            except (zlib.error, ValueError):
+                break
+            if not member.eof:
+                break
+            self._entries.append(entry)
+            self._valid_size = len(data) - len(member.unused_data)
+        self._latest_state = self._replay(self.latest)
+        return self
+
+    def versions(self) -> List[VersionInfo]:
+        return [
+            VersionInfo(i, e["time"], len(e.get("set", {})), len(e.get("del", [])))
+            for i, e in enumerate(self._entries, 1)
+        ]
+
+    def _replay(self, version: int) -> State:
+        state: State = {}
+        for entry in self._entries[:version]:
+            for name, value in entry.get("set", {}).items():
+                state[name] = tuple(value)
+            for name in entry.get("del", []):
+                state.pop(name, None)
+        return state
+
+    def rows(self, version: int) -> List[Dict[str, str]]:
+        """The profile as saved in `version`, in the shape of load_services_from_csv()."""
+        if not 1 <= version <= self.latest:
+            raise ValueError(f"{self.name} has no version {version}")
+        state = self._latest_state if version == self.latest else self._replay(version)
+        return [{"ServiceName": name, "DisplayName": display, "StartMode": mode}
+                for name, (display, mode) in sorted(state.items(), key=lambda item: item[0].lower())]
+
+    def append(self, rows) -> Optional[int]:
+        """
+        Store `rows` ((name, display, mode) tuples or CSV dicts) as a new version.
+        Returns its number, or None when nothing changed since the latest one.
+        """
+        state = _state(rows)
+        changed = {name: list(value) for name, value in state.items() if self._latest_state.get(name) != value}
+        removed = sorted(name for name in self._latest_state if name not in state)
+        if self._entries and not changed and not removed:
+            return None
+
+        entry = {"time": time.time(), "set": changed}
+        if removed:
+            entry["del"] = removed
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with open(self.path, "ab") as f:
+            f.truncate(self._valid_size)
+            f.write(gzip.compress(line.encode("utf-8")))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._entries.append(entry)
+        self._valid_size = self.path.stat().st_size
+        self._latest_state = state
+        return self.latest
+
+
+class ProfileSource:
+    """A saved services profile the Load views can restore or compare."""
+
+    def __init__(self, title: str, path: str, version: Optional[int] = None):
+        self.title = title
+        self.path = path
+        self.version = version
+
+    @classmethod
+    def csv(cls, path: str) -> "ProfileSource":
+        return cls(os.path.splitext(os.path.basename(path))[0], path)
+
+    @classmethod
+    def history(cls, history: ServiceHistory, version: int) -> "ProfileSource":
+        return cls(f"{history.name} v{version}", str(history.path), version)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def rows(self) -> List[Dict[str, str]]:
+        if self.version is None:
+            from scripts.services_restore import load_services_from_csv
+            return load_services_from_csv(Path(self.path))
+        return ServiceHistory(Path(self.path)).rows(self.version)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ProfileSource) and (self.path, self.version) == (other.path, other.version)
+
+    def __hash__(self) -> int:
+        return hash((self.path, self.version))
@@ -1,6 +1,23 @@
+"""
+Restore service start types from a CSV saved by Services -> Save.
+
+restore_profile() takes one snapshot of the live configuration, diffs it
+against the saved rows and only calls ChangeServiceConfig for services whose
+start type differs. All changes go through one SCM handle (SCM handles can be
+shared between threads) on a small worker pool. apply_service_config() is the
+old one-service path.
+"""
+import time
 import win32service
 import csv
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional
+
+from scripts.service_control import ControlResult, start_services
+from scripts.services_snapshot import ServiceSnapshot, snapshot_services
+
+RESTORE_WORKERS = 8
 
 # Map human-readable values to WinAPI constants
 START_MODE_MAP = {
@@ -46,15 +63,104 @@ def apply_service_config(service_name: str, start_mode: str):
     finally:
         win32service.CloseServiceHandle(scm)
 
+class ServiceChange:
+    def __init__(self, name: str, current: str, wanted: str):
+        self.name = name
+        self.current = current
+        self.wanted = wanted
+        self.error: Optional[str] = None
+
+
+class RestoreSummary:
+    def __init__(self):
+        self.changed: List[ServiceChange] = []
+        self.unchanged: List[str] = []
+        self.missing: List[str] = []
+        self.failed: List[ServiceChange] = []
+        self.elapsed = 0.0
+
+    def print(self):
+        for change in self.changed:
+            print(f"[+] {change.name}: {change.current} -> {change.wanted}")
+        for change in self.failed:
+            print(f"[!] {change.name}: {change.current} -> {change.wanted} failed: {change.error}")
+        if self.missing:
+            print(f"[~] Not installed here: {', '.join(self.missing)}")
+        print(f"[=] {len(self.changed)} changed, {len(self.unchanged)} unchanged, "
+              f"{len(self.missing)} missing, {len(self.failed)} failed in {self.elapsed:.2f}s")
+
+
+def diff_profile(rows: List[Dict[str, str]], snapshot: ServiceSnapshot) -> RestoreSummary:
+    """Sort the saved rows into changes, unchanged and missing; nothing is applied."""
+    summary = RestoreSummary()
+    for row in rows:
+        name, wanted = row["ServiceName"], row["StartMode"]
+        record = snapshot.get(name)
+        if record is None:
+            summary.missing.append(name)
+            continue
+        change = ServiceChange(record.name, record.start_mode, wanted)
+        if wanted not in START_MODE_MAP:
+            change.error = f"unknown StartMode '{wanted}'"
+            summary.failed.append(change)
+        elif record.start_mode == wanted:
+            summary.unchanged.append(record.name)
+        else:
+            summary.changed.append(change)
+    return summary
+
+
+def _change_start_type(scm, change: ServiceChange) -> None:
+    try:
+        service = win32service.OpenService(scm, change.name, win32service.SERVICE_CHANGE_CONFIG)
+        try:
+            win32service.ChangeServiceConfig(
+                service,
+                win32service.SERVICE_NO_CHANGE,       # service type
+                START_MODE_MAP[change.wanted],        # start type
+                win32service.SERVICE_NO_CHANGE,       # error control
+                None, None, 0, None, None, None, None
+            )
+        finally:
+            win32service.CloseServiceHandle(service)
+    except Exception as e:
+        change.error = str(e)
+
+
+def restore_profile(rows: List[Dict[str, str]], max_workers: int = RESTORE_WORKERS,
+                    snapshot: Optional[ServiceSnapshot] = None) -> RestoreSummary:
+    """Apply only the start types that differ from the live configuration."""
+    start = time.perf_counter()
+    summary = diff_profile(rows, snapshot or snapshot_services())
+
+    if summary.changed:
+        scm = win32service.OpenSCManager(None, None, win32service.SC_MANAGER_CONNECT)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(summary.changed)))) as pool:
+                list(pool.map(lambda change: _change_start_type(scm, change), summary.changed))
+        finally:
+            win32service.CloseServiceHandle(scm)
+
+        summary.failed.extend(c for c in summary.changed if c.error)
+        summary.changed = [c for c in summary.changed if not c.error]
+
+    summary.elapsed = time.perf_counter() - start
+    return summary
+
+
+def start_restored(summary: RestoreSummary) -> ControlResult:
+    """Start the services the restore switched to Auto, in dependency waves."""
+    names = [c.name for c in summary.changed if c.wanted == "Auto"]
+    return start_services(names)
+
+
 def restore_services(filepath: Path):
     """
     Restores all services from the given CSV file.
     """
-    services = load_services_from_csv(filepath)
-    for service in services:
-        service_name = service["ServiceName"]
-        start_mode = service["StartMode"]
-        apply_service_config(service_name, start_mode)
+    summary = restore_profile(load_services_from_csv(filepath))
+    summary.print()
+    return summary
 
 if __name__ == "__main__":
     input_file = Path("services_startup.csv")
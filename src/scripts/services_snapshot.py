@@ -0,0 +1,237 @@
+"""
+Bulk snapshot of the service configuration.
+
+get_services_startup() opens every service and calls QueryServiceConfig on it,
+which is two SCM round-trips per service. snapshot_services() instead does:
+
+  1. one EnumServicesStatusEx call for the list of services the SCM knows,
+     with display names, current state and PID;
+  2. one walk over HKLM\\SYSTEM\\CurrentControlSet\\Services for the
+     configuration (Start, DelayedAutostart, Type, ImagePath, dependencies).
+
+The registry holds the same data QueryServiceConfig returns. Only a service
+that has no registry key (a race with an install/uninstall) falls back to
+QueryServiceConfig. Errors are collected in the snapshot, not printed.
+
+Usage:
+    snapshot = snapshot_services()
+    for record in snapshot:
+        print(record.name, record.start_mode, record.dependencies)
+
+    python -m scripts.services_snapshot [--drivers]     # benchmark
+"""
+import time
+import winreg
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import win32service
+
+SERVICES_KEY = r"SYSTEM\CurrentControlSet\Services"
+
+# Prefix the SCM puts in front of load-order group dependencies
+GROUP_PREFIX = "+"
+
+SERVICE_USERSERVICE_INSTANCE = 0x80
+
+START_MODE_NAMES = {
+    win32service.SERVICE_BOOT_START: "Boot",
+    win32service.SERVICE_SYSTEM_START: "System",
+    win32service.SERVICE_AUTO_START: "Auto",
+    win32service.SERVICE_DEMAND_START: "Manual",
+    win32service.SERVICE_DISABLED: "Disabled",
+}
+
+
+class ServiceRecord:
+    """Configuration and state of one service, as plain ints and strings."""
+
+    __slots__ = ("name", "display_name", "service_type", "start_type", "delayed_auto",
+                 "image_path", "dependencies", "state", "pid")
+
+    def __init__(self, name: str, display_name: str, service_type: int, start_type: int,
+                 delayed_auto: bool = False, image_path: str = "", dependencies: Tuple[str, ...] = (),
+                 state: int = 0, pid: int = 0):
+        self.name = name
+        self.display_name = display_name
+        self.service_type = service_type
+        self.start_type = start_type
+        self.delayed_auto = delayed_auto
+        self.image_path = image_path
+        self.dependencies = dependencies        # services, and groups prefixed with "+"
+        self.state = state                      # SERVICE_RUNNING, SERVICE_STOPPED, ...
+        self.pid = pid
+
+    @property
+    def start_mode(self) -> str:
+        """Start type as written to the services CSV (Auto, Manual, Disabled, ...)."""
+        return START_MODE_NAMES.get(self.start_type, "Unknown")
+
+    @property
+    def is_driver(self) -> bool:
+        return bool(self.service_type & win32service.SERVICE_DRIVER)
+
+    @property
+    def running(self) -> bool:
+        return self.state == win32service.SERVICE_RUNNING
+
+    def __repr__(self) -> str:
+        return f"ServiceRecord(name={self.name}, start={self.start_mode}, state={self.state})"
+
+
+class ServiceSnapshot:
+    def __init__(self):
+        self.records: Dict[str, ServiceRecord] = {}
+        self.errors: Dict[str, str] = {}
+        self.elapsed = 0.0
+        self.taken_at = time.time()
+
+    def add(self, record: ServiceRecord) -> None:
+        # Service names are case-insensitive
+        self.records[record.name.lower()] = record
+
+    def get(self, name: str) -> Optional[ServiceRecord]:
+        return self.records.get(name.lower())
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self.records
+
+    def __iter__(self) -> Iterator[ServiceRecord]:
+        return iter(sorted(self.records.values(), key=lambda r: r.name.lower()))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def startup_rows(self) -> List[Tuple[str, str, str]]:
+        """(ServiceName, DisplayName, StartMode) rows, as get_services_startup() returns them."""
+        return [(r.name, r.display_name, r.start_mode) for r in self]
+
+
+def _value(key, name: str, default=None):
+    try:
+        return winreg.QueryValueEx(key, name)[0]
+    except OSError:
+        return default
+
+
+def _dependencies(services, groups) -> Tuple[str, ...]:
+    return tuple(services or ()) + tuple(GROUP_PREFIX + g for g in groups or ())
+
+
+def read_registry_configs(service_mask: int) -> Dict[str, dict]:
+    """
+    Configuration of every service key under SERVICES_KEY whose Type matches
+    service_mask, keyed by lower-case service name. Keys without a Type value
+    (parameters-only leftovers) are skipped.
+    """
+    configs: Dict[str, dict] = {}
+    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, SERVICES_KEY, 0, winreg.KEY_READ) as root:
+        count = winreg.QueryInfoKey(root)[0]
+        for i in range(count):
+            try:
+                name = winreg.EnumKey(root, i)
+            except OSError:
+                break
+            try:
+                with winreg.OpenKey(root, name, 0, winreg.KEY_QUERY_VALUE) as key:
+                    service_type = _value(key, "Type")
+                    if service_type is None or not service_type & service_mask:
+                        continue
+                    configs[name.lower()] = {
+                        "service_type": service_type,
+                        "start_type": _value(key, "Start", win32service.SERVICE_DEMAND_START),
+                        "delayed_auto": bool(_value(key, "DelayedAutostart", 0)),
+                        "image_path": _value(key, "ImagePath", "") or "",
+                        "dependencies": _dependencies(_value(key, "DependOnService"),
+                                                      _value(key, "DependOnGroup")),
+                    }
+            except OSError:
+                continue
+    return configs
+
+
+def _query_config(scm, name: str) -> dict:
+    handle = win32service.OpenService(scm, name, win32service.SERVICE_QUERY_CONFIG)
+    try:
+        config = win32service.QueryServiceConfig(handle)
+        try:
+            delayed = bool(win32service.QueryServiceConfig2(
+                handle, win32service.SERVICE_CONFIG_DELAYED_AUTO_START_INFO))
+        except win32service.error:
+            delayed = False
+    finally:
+        win32service.CloseServiceHandle(handle)
+    return {
+        "service_type": config[0],
+        "start_type": config[1],
+        "delayed_auto": delayed,
+        "image_path": config[3] or "",
+        "dependencies": tuple(config[6] or ()),
+    }
+
+
+def snapshot_services(include_drivers: bool = False) -> ServiceSnapshot:
+    """Win32 services (and drivers if include_drivers) with their configuration and state."""
+    start = time.perf_counter()
+    service_mask = win32service.SERVICE_WIN32
+    if include_drivers:
+        service_mask |= win32service.SERVICE_DRIVER
+
+    snapshot = ServiceSnapshot()
+    configs = read_registry_configs(service_mask)
+
+    scm = win32service.OpenSCManager(None, None, win32service.SC_MANAGER_ENUMERATE_SERVICE)
+    try:
+        statuses = win32service.EnumServicesStatusEx(scm, service_mask, win32service.SERVICE_STATE_ALL)
+        for status in statuses:
+            name = status["ServiceName"]
+            config = configs.get(name.lower())
+            if config is None:
+                try:
+                    config = _query_config(scm, name)
+                except win32service.error as e:
+                    snapshot.errors[name] = str(e)
+                    continue
+            if config["service_type"] & SERVICE_USERSERVICE_INSTANCE:
+                # Per-session instances (CDPUserSvc_1a2b3) get a new name every logon;
+                # the template (CDPUserSvc) carries the start type that matters
+                continue
+            snapshot.add(ServiceRecord(
+                name=name,
+                display_name=status["DisplayName"],
+                state=status["CurrentState"],
+                pid=status["ProcessId"],
+                **config,
+            ))
+    finally:
+        win32service.CloseServiceHandle(scm)
+
+    snapshot.elapsed = time.perf_counter() - start
+    return snapshot
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from scripts.services_export import get_services_startup
+
+    parser = argparse.ArgumentParser(description="Compare the bulk snapshot with the per-service path.")
+    parser.add_argument("--drivers", action="store_true", help="include kernel and file system drivers")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    for i in range(args.rounds):
+        t = time.perf_counter()
+        rows = get_services_startup()
+        per_service = time.perf_counter() - t
+
+        snapshot = snapshot_services(include_drivers=args.drivers)
+        print(f"[*] round {i + 1}: QueryServiceConfig {len(rows)} services in {per_service * 1000:.0f} ms; "
+              f"snapshot {len(snapshot)} in {snapshot.elapsed * 1000:.0f} ms "
+              f"({per_service / max(snapshot.elapsed, 1e-9):.1f}x)")
+
+    legacy = {name.lower(): mode for name, _, mode in rows}
+    differing = [r.name for r in snapshot if not r.is_driver and legacy.get(r.name.lower(), r.start_mode) != r.start_mode]
+    if differing:
+        print(f"[!] start type differs for: {', '.join(differing)}")
+    if snapshot.errors:
+        print(f"[!] {len(snapshot.errors)} service(s) could not be read: {', '.join(snapshot.errors)}")
@@ -0,0 +1,198 @@
+"""
+USB device-change subscriptions.
+
+A DeviceEventSource delivers DeviceEvent objects to a callback from a background
+thread. WmiDeviceEventSource listens to WMI instance events for USBSTOR PnP
+entities and to Win32_VolumeChangeEvent; FakeDeviceEventSource is driven
+manually and is meant for tests.
+
+Usage:
+    source = WmiDeviceEventSource()
+    source.start(lambda event: print(event))
+    ...
+    source.stop()
+"""
+from __future__ import annotations
+
+import threading
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Callable, Optional
+
+# WMI polls intrinsic instance events; 1s keeps the view responsive and cheap
+PNP_EVENT_WQL = (
+    "SELECT * FROM __InstanceOperationEvent WITHIN 1 "
+    "WHERE TargetInstance ISA 'Win32_PnPEntity' "
+    "AND TargetInstance.PNPDeviceID LIKE 'USBSTOR%'"
+)
+VOLUME_EVENT_CLASS = "Win32_VolumeChangeEvent"
+
+# Win32_VolumeChangeEvent.EventType values
+VOLUME_ARRIVAL = 2
+VOLUME_REMOVAL = 3
+
+# How long a single watcher call waits before the loop checks for stop()
+POLL_TIMEOUT_MS = 500
+
+
+class DeviceEventKind(Enum):
+    ARRIVAL = "arrival"
+    REMOVAL = "removal"
+    CHANGE = "change"
+
+
+class DeviceEvent:
+    """
+    A single device change. Either `pnp_id` (raw PnP device ID) or
+    `drive_letter` (volume events, e.g. "E:") is set.
+    """
+
+    def __init__(self, kind: DeviceEventKind, pnp_id: Optional[str] = None,
+                 drive_letter: Optional[str] = None):
+        self.kind: DeviceEventKind = kind
+        self.pnp_id: Optional[str] = pnp_id
+        self.drive_letter: Optional[str] = drive_letter
+
+    def __repr__(self) -> str:
+        return f"DeviceEvent(kind={self.kind.value}, pnp_id={self.pnp_id}, drive={self.drive_letter})"
+
+
+EventCallback = Callable[[DeviceEvent], None]
+
+
+class DeviceEventSource(ABC):
+    """Delivers device change events to a callback until stopped."""
+
+    @abstractmethod
+    def start(self, callback: EventCallback) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def stop(self) -> None:
+        raise NotImplementedError
+
+
+class FakeDeviceEventSource(DeviceEventSource):
+    """Event source driven by the caller via emit(); the callback runs synchronously."""
+
+    def __init__(self):
+        self._callback: Optional[EventCallback] = None
+
+    def start(self, callback: EventCallback) -> None:
+        self._callback = callback
+
+    def stop(self) -> None:
+        self._callback = None
+
+    def emit(self, event: DeviceEvent) -> None:
+        if self._callback is not None:
+            self._callback(event)
+
+
+class WmiDeviceEventSource(DeviceEventSource):
+    """
+    Listens to WMI device events in a daemon thread.
+
+    WMI objects are apartment-bound, so the thread initializes COM and opens its
+    own connection. An event that fails to convert or to be handled is skipped
+    and kept in `error` until the next pass over the watchers goes through
+    cleanly; if the subscriptions cannot be set up the thread ends and
+    `running` turns False.
+    """
+
+    def __init__(self):
+        self._callback: Optional[EventCallback] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[Exception] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, callback: EventCallback) -> None:
+        if self.running:
+            return
+        self._callback = callback
+        self._stop_event.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="usb-device-events", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=POLL_TIMEOUT_MS * 4 / 1000)
+        self._thread = None
+        self._callback = None
+
+    def _run(self) -> None:
+        import pythoncom
+        import wmi
+
+        pythoncom.CoInitialize()
+        try:
+            c = wmi.WMI()
+            watchers = [
+                (c.watch_for(raw_wql=PNP_EVENT_WQL), _pnp_event),
+                # Win32_VolumeChangeEvent is extrinsic: a raw_wql watcher would be
+                # treated as an instance event and fail on TargetInstance
+                (c.watch_for(wmi_class=VOLUME_EVENT_CLASS), _volume_event),
+            ]
+        except Exception as e:
+            self.error = e
+            pythoncom.CoUninitialize()
+            return
+
+        try:
+            while not self._stop_event.is_set():
+                failed = False
+                for watcher, convert in watchers:
+                    try:
+                        raw = watcher(timeout_ms=POLL_TIMEOUT_MS)
+                    except wmi.x_wmi_timed_out:
+                        continue
+                    except Exception as e:
+                        # Don't spin on a broken subscription
+                        self.error, failed = e, True
+                        self._stop_event.wait(POLL_TIMEOUT_MS / 1000)
+                        continue
+
+                    callback = self._callback
+                    try:
+                        event = convert(raw)
+                        if event is not None and callback is not None:
+                            callback(event)
+                    except Exception as e:
+                        self.error, failed = e, True
+                if not failed:
+                    # Every watcher polled or delivered fine: the error is over
+                    self.error = None
+        finally:
+            pythoncom.CoUninitialize()
+
+
+def _pnp_event(raw) -> Optional[DeviceEvent]:
+    """Convert a Win32_PnPEntity instance event (wmi._wmi_event) into a DeviceEvent."""
+    pnp_id = getattr(raw, "PNPDeviceID", None)
+    if not pnp_id:
+        return None
+
+    kind = {
+        "creation": DeviceEventKind.ARRIVAL,
+        "deletion": DeviceEventKind.REMOVAL,
+    }.get(getattr(raw, "event_type", None), DeviceEventKind.CHANGE)
+    return DeviceEvent(kind, pnp_id=pnp_id)
+
+
+def _volume_event(raw) -> Optional[DeviceEvent]:
+    """Convert a Win32_VolumeChangeEvent into a DeviceEvent."""
+    drive = getattr(raw, "DriveName", None)
+    if not drive:
+        return None
+
+    kind = {
+        VOLUME_ARRIVAL: DeviceEventKind.ARRIVAL,
+        VOLUME_REMOVAL: DeviceEventKind.REMOVAL,
+    }.get(getattr(raw, "EventType", None), DeviceEventKind.CHANGE)
+    return DeviceEvent(kind, drive_letter=drive)
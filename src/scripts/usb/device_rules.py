@@ -0,0 +1,210 @@
+"""
+Evaluate PnP device IDs against device installation restriction rules.
+
+Allow/deny lists from DeviceInstall\\Restrictions are compiled once into
+  - a dict for exact IDs (the common case, O(1) per lookup), and
+  - one combined regex for wildcard rules ("*" any sequence, "?" one character,
+    e.g. prefix rules like "USBSTOR\\DISK&VEN_SANDISK*"),
+both ordered by precedence, so every PnP ID is decided with a single lookup
+and a single regex match.
+
+Precedence follows Windows (without "AllowDenyLayered" deny always wins):
+    DenyInstanceIDs > [AllowInstanceIDs if layered] > DenyDeviceIDs
+    > DenyAll / DenyRemovableDevices / DenyDeviceClasses > AllowInstanceIDs
+    > AllowDeviceIDs / AllowDeviceClasses > DenyUnspecified (default)
+
+No registry access here: build rules from read_live_restrictions() data
+(see scripts.usb.restrictions_profile) or from plain lists.
+"""
+import re
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Device setup class of disk drives (every USBSTOR disk belongs to it)
+DISK_CLASS_GUID = "{4D36E967-E325-11CE-BFC1-08002BE10318}"
+
+
+class Verdict(Enum):
+    ALLOWED = "allowed"
+    BLOCKED = "blocked"
+
+
+class RuleMatch:
+    """Decision for one PnP ID: verdict, the rule that decided it and its policy list."""
+
+    def __init__(self, verdict: Verdict, rule: Optional[str], source: str, pnp_id: Optional[str] = None):
+        self.verdict: Verdict = verdict
+        self.rule: Optional[str] = rule        # pattern text, None for the default decision
+        self.source: str = source              # e.g. "AllowDeviceIDs", "DenyUnspecified"
+        self.pnp_id: Optional[str] = pnp_id
+
+    def describe(self) -> str:
+        if self.rule is None or self.rule == "*":
+            return self.source
+        return f"{self.source}: {self.rule}"
+
+    def __repr__(self) -> str:
+        return f"RuleMatch(verdict={self.verdict.value}, rule={self.rule}, source={self.source})"
+
+
+# One precedence tier: (policy list name, verdict, patterns)
+Tier = Tuple[str, Verdict, Iterable[str]]
+
+
+def _is_wildcard(pattern: str) -> bool:
+    return "*" in pattern or "?" in pattern
+
+
+def _wildcard_to_regex(pattern: str) -> str:
+    return "".join(
+        ".*" if ch == "*" else "." if ch == "?" else re.escape(ch)
+        for ch in pattern
+    )
+
+
+def candidate_ids(pnp_id: str) -> List[str]:
+    """
+    IDs a raw PnP ID is matched by: the ID itself and, for an instance ID, its
+    device ID part (without the serial/instance segment). Hardware and
+    compatible IDs ("USBSTOR\\DiskSanDisk_Cruzer____1.00", "GenDisk") have no
+    instance segment and match as they are.
+    """
+    up = pnp_id.upper()
+    result = [up]
+    if up.count("\\") >= 2:
+        result.append(up.rsplit("\\", 1)[0])
+    return result
+
+
+class CompiledRules:
+    """Ordered allow/deny tiers compiled for fast evaluation."""
+
+    def __init__(self, tiers: Iterable[Tier], default: RuleMatch):
+        self.default = default
+        self._rules: List[Tuple[int, str, Verdict, str]] = []   # (tier, pattern, verdict, source)
+        self._exact: Dict[str, int] = {}                         # ID -> rule index
+
+        alternatives: List[str] = []
+        for tier_index, (source, verdict, patterns) in enumerate(tiers):
+            for raw in patterns:
+                pattern = str(raw).strip().upper()
+                if not pattern:
+                    continue
+                rule_index = len(self._rules)
+                self._rules.append((tier_index, pattern, verdict, source))
+                if _is_wildcard(pattern):
+                    alternatives.append(f"(?P<r{rule_index}>{_wildcard_to_regex(pattern)})")
+                else:
+                    # Keep the first (highest precedence) rule for duplicate IDs
+                    self._exact.setdefault(pattern, rule_index)
+
+        # Alternatives are in precedence order; the first one that matches wins
+        self._regex = re.compile("|".join(alternatives), re.DOTALL) if alternatives else None
+
+    @property
+    def rule_count(self) -> int:
+        return len(self._rules)
+
+    def _best_rule(self, pnp_id: str) -> Optional[int]:
+        best: Optional[int] = None
+        for candidate in candidate_ids(pnp_id):
+            found = [self._exact.get(candidate)]
+            if self._regex is not None:
+                m = self._regex.fullmatch(candidate)
+                if m is not None:
+                    found.append(int(m.lastgroup[1:]))
+            for rule_index in found:
+                if rule_index is None:
+                    continue
+                if best is None or self._rules[rule_index][0] < self._rules[best][0]:
+                    best = rule_index
+        return best
+
+    def _to_match(self, rule_index: Optional[int], pnp_id: Optional[str]) -> RuleMatch:
+        if rule_index is None:
+            return RuleMatch(self.default.verdict, None, self.default.source, pnp_id)
+
+        _, pattern, verdict, source = self._rules[rule_index]
+        return RuleMatch(verdict, pattern, source, pnp_id)
+
+    def match(self, pnp_id: str) -> RuleMatch:
+        return self._to_match(self._best_rule(pnp_id), pnp_id)
+
+    def evaluate_device(self, pnp_ids: Iterable[str]) -> RuleMatch:
+        """
+        Evaluate all IDs of one physical device in one pass: its raw instance
+        IDs plus its hardware and compatible IDs (UsbStorageDevice.rule_ids).
+        The highest precedence rule hit by any of them decides; otherwise the
+        default applies.
+        """
+        best: Optional[int] = None
+        best_id: Optional[str] = None
+        for pnp_id in pnp_ids:
+            rule_index = self._best_rule(pnp_id)
+            if rule_index is None:
+                continue
+            if best is None or self._rules[rule_index][0] < self._rules[best][0]:
+                best, best_id = rule_index, pnp_id
+        return self._to_match(best, best_id)
+
+
+def _flag(values: Dict[str, Tuple[int, Any]], name: str) -> bool:
+    entry = values.get(name)
+    if entry is None:
+        return False
+    try:
+        return int(entry[1]) == 1
+    except (TypeError, ValueError):
+        return False
+
+
+def _ids(lists: Dict[str, Any], name: str) -> List[str]:
+    entries = lists.get(name) or []
+    if isinstance(entries, dict):
+        return list(entries.values())
+    return list(entries)
+
+
+def _class_rule(lists: Dict[str, Any], name: str) -> List[str]:
+    """A class list containing the disk class turns into a match-all rule."""
+    guids = {g.strip().upper() for g in _ids(lists, name)}
+    return ["*"] if DISK_CLASS_GUID in guids else []
+
+
+def compile_restrictions(values: Dict[str, Tuple[int, Any]], lists: Dict[str, Any]) -> CompiledRules:
+    """
+    Build rules from the policy key contents.
+
+    - values: value name -> (type, data), as returned by read_live_restrictions()
+    - lists: list subkey -> {value name: ID} or [ID, ...]
+
+    A list only takes part when its enabling flag (value of the same name) is 1.
+    """
+    layered = _flag(values, "AllowDenyLayered")
+    tiers: List[Tier] = []
+
+    if _flag(values, "DenyInstanceIDs"):
+        tiers.append(("DenyInstanceIDs", Verdict.BLOCKED, _ids(lists, "DenyInstanceIDs")))
+    if layered and _flag(values, "AllowInstanceIDs"):
+        tiers.append(("AllowInstanceIDs", Verdict.ALLOWED, _ids(lists, "AllowInstanceIDs")))
+    if _flag(values, "DenyDeviceIDs"):
+        tiers.append(("DenyDeviceIDs", Verdict.BLOCKED, _ids(lists, "DenyDeviceIDs")))
+    if _flag(values, "DenyAll"):
+        tiers.append(("DenyAll", Verdict.BLOCKED, ["*"]))
+    if _flag(values, "DenyRemovableDevices"):
+        tiers.append(("DenyRemovableDevices", Verdict.BLOCKED, ["*"]))
+    if _flag(values, "DenyDeviceClasses"):
+        tiers.append(("DenyDeviceClasses", Verdict.BLOCKED, _class_rule(lists, "DenyDeviceClasses")))
+    if not layered and _flag(values, "AllowInstanceIDs"):
+        tiers.append(("AllowInstanceIDs", Verdict.ALLOWED, _ids(lists, "AllowInstanceIDs")))
+    if _flag(values, "AllowDeviceIDs"):
+        tiers.append(("AllowDeviceIDs", Verdict.ALLOWED, _ids(lists, "AllowDeviceIDs")))
+    if _flag(values, "AllowDeviceClasses"):
+        tiers.append(("AllowDeviceClasses", Verdict.ALLOWED, _class_rule(lists, "AllowDeviceClasses")))
+
+    if _flag(values, "DenyUnspecified"):
+        default = RuleMatch(Verdict.BLOCKED, None, "DenyUnspecified")
+    else:
+        default = RuleMatch(Verdict.ALLOWED, None, "no restriction")
+
+    return CompiledRules(tiers, default)
@@ -0,0 +1,193 @@
+"""
+Concurrent, deadline-bounded filesystem health probing for USB volumes.
+
+A dying flash drive can block os.listdir() for tens of seconds. Every volume is
+probed in its own daemon thread and the caller waits at most `deadline` seconds
+for the whole batch. Volumes that did not answer in time are reported as
+TIMED_OUT; their worker keeps running in the background (a thread blocked in a
+kernel call cannot be cancelled), but a daemon thread never keeps the process alive.
+
+Usage:
+    from scripts.usb.fs_probe import probe_volumes, ProbeState
+
+    results = probe_volumes(["E:", "F:"], deadline=3.0, deep=True)
+    if results["E:"].state is ProbeState.TIMED_OUT:
+        ...
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Default time (seconds) a volume may take to answer before it is reported as timed out
+DEFAULT_DEADLINE = 5.0
+
+# Deep check parameters
+BOOT_SECTOR_SIZE = 512
+SAMPLE_FILES = 3                  # how many files from the volume root to read
+SAMPLE_BYTES = 1024 * 1024        # max bytes read from every sample file
+READ_CHUNK = 64 * 1024
+
+
+class ProbeState(Enum):
+    HEALTHY = "healthy"      # root directory listed (and deep checks passed)
+    BROKEN = "broken"        # OS error while accessing the volume
+    TIMED_OUT = "timed out"  # no answer within the deadline
+
+
+class ProbeResult:
+    """
+    Outcome of probing a single volume.
+    Throughput numbers are only filled when deep checks were requested.
+    """
+
+    def __init__(self, drive_letter: str, state: ProbeState = ProbeState.TIMED_OUT,
+                 error_message: Optional[str] = None):
+        self.drive_letter: str = drive_letter
+        self.state: ProbeState = state
+        self.error_message: Optional[str] = error_message
+        self.elapsed: Optional[float] = None          # seconds spent by the worker
+
+        # Deep check details
+        # None  – not checked / not permitted (raw access requires elevation)
+        # True  – boot sector read successfully
+        # False – I/O error while reading the boot sector
+        self.boot_sector_ok: Optional[bool] = None
+        self.files_read: int = 0
+        self.bytes_read: int = 0
+        self.read_seconds: float = 0.0
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Sample read throughput in bytes per second, or None if nothing was read."""
+        if not self.bytes_read or self.read_seconds <= 0:
+            return None
+        return self.bytes_read / self.read_seconds
+
+    def __repr__(self) -> str:
+        return (
+            f"ProbeResult(letter={self.drive_letter}, state={self.state.value}, "
+            f"elapsed={self.elapsed}, throughput={self.throughput})"
+        )
+
+
+def _read_boot_sector(result: ProbeResult) -> None:
+    """Read the first sector of the volume through the raw device path (\\\\.\\E:)."""
+    device_path = "\\\\.\\" + result.drive_letter
+    try:
+        with open(device_path, "rb", buffering=0) as f:
+            data = f.read(BOOT_SECTOR_SIZE)
+    except PermissionError:
+        # Raw volume access needs administrator rights – treat as "cannot check"
+        result.boot_sector_ok = None
+        return
+
+    result.boot_sector_ok = len(data) == BOOT_SECTOR_SIZE
+    if not result.boot_sector_ok:
+        raise OSError(f"Short boot sector read: {len(data)} of {BOOT_SECTOR_SIZE} bytes")
+
+
+def _read_sample_files(result: ProbeResult, root_path: str) -> None:
+    """Read the beginning of a few regular files from the volume root and time it."""
+    samples: List[str] = []
+    with os.scandir(root_path) as it:
+        for entry in it:
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    samples.append(entry.path)
+            except OSError:
+                continue
+            if len(samples) >= SAMPLE_FILES:
+                break
+
+    started = time.perf_counter()
+    for path in samples:
+        remaining = SAMPLE_BYTES
+        with open(path, "rb", buffering=0) as f:
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    break
+                result.bytes_read += len(chunk)
+                remaining -= len(chunk)
+        result.files_read += 1
+    result.read_seconds = time.perf_counter() - started
+
+
+def _run_probe(result: ProbeResult, deep: bool, done: threading.Event) -> None:
+    """Worker body. Fills `result` and signals `done`; never raises."""
+    started = time.perf_counter()
+    root_path = result.drive_letter + "\\"
+
+    try:
+        os.listdir(root_path)
+        if deep:
+            _read_boot_sector(result)
+            _read_sample_files(result, root_path)
+        result.state = ProbeState.HEALTHY
+        result.error_message = None
+    except OSError as e:
+        result.state = ProbeState.BROKEN
+        result.error_message = f"{e.__class__.__name__}: {e}"
+    finally:
+        result.elapsed = time.perf_counter() - started
+        done.set()
+
+
+def probe_volumes(
+        drive_letters: Iterable[str],
+        deadline: float = DEFAULT_DEADLINE,
+        deep: bool = False,
+) -> Dict[str, ProbeResult]:
+    """
+    Probe all given volumes concurrently.
+
+    - drive_letters: volumes like "E:" (empty values are ignored)
+    - deadline: seconds every volume has to answer; all probes start together,
+      so the call returns after at most `deadline` seconds
+    - deep: additionally read the boot sector and a few sample files and
+      report read throughput
+
+    Returns a dict drive_letter -> ProbeResult.
+    """
+    pending: List[Tuple[ProbeResult, threading.Event]] = []
+
+    for letter in dict.fromkeys(d for d in drive_letters if d):
+        result = ProbeResult(letter)
+        done = threading.Event()
+        worker = threading.Thread(
+            target=_run_probe,
+            args=(result, deep, done),
+            name=f"fs-probe-{letter}",
+            daemon=True,
+        )
+        worker.start()
+        pending.append((result, done))
+
+    expires = time.monotonic() + deadline
+    results: Dict[str, ProbeResult] = {}
+
+    for result, done in pending:
+        if done.wait(max(0.0, expires - time.monotonic())):
+            results[result.drive_letter] = result
+        else:
+            # The worker still owns `result`; report a separate object so late
+            # writes from the hung thread can't change what the caller sees.
+            results[result.drive_letter] = ProbeResult(
+                result.drive_letter,
+                ProbeState.TIMED_OUT,
+                f"No response within {deadline:g}s",
+            )
+
+    return results
+
+
+def format_throughput(result: ProbeResult) -> str:
+    """Human-readable throughput, e.g. '12.3 MB/s', or '' if not measured."""
+    value = result.throughput
+    if value is None:
+        return ""
+    return f"{value / (1024 * 1024):.1f} MB/s"
@@ -0,0 +1,130 @@
+"""
+USB storage connection history.
+
+Combines two sources, indexed by normalized PNP ID (see normalize_pnp_id):
+- HKLM\\SYSTEM\\CurrentControlSet\\Enum\\USBSTOR – every USB disk the system has
+  enumerated, with friendly name and the last write time of its instance key;
+- setupapi.dev.log (and rotated copies) – timestamps of every installation.
+"""
+import winreg
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from scripts.usb.pnp import normalize_pnp_id
+from scripts.usb.setupapi_log import default_log_paths, iter_logs
+
+USBSTOR_KEY = r"SYSTEM\CurrentControlSet\Enum\USBSTOR"
+
+# Difference between FILETIME (1601-01-01) and Unix epoch, in 100ns units
+_FILETIME_EPOCH_OFFSET = 116444736000000000
+
+
+class UsbHistoryEntry:
+    """Everything known about one physical USB storage device."""
+
+    def __init__(self, normalized_pnp_id: str):
+        self.normalized_pnp_id: str = normalized_pnp_id
+        self.friendly_name: Optional[str] = None
+        self.instance_ids: List[str] = []                 # raw IDs (registry and log)
+        self.registry_last_write: Optional[datetime] = None
+        self.install_times: List[datetime] = []           # from setupapi logs
+
+    @property
+    def device_id(self) -> str:
+        """USBSTOR\\Disk&Ven_..&Prod_..&Rev_.. part (without the serial)."""
+        return self.normalized_pnp_id.rsplit("\\", 1)[0]
+
+    @property
+    def serial(self) -> str:
+        return self.normalized_pnp_id.rsplit("\\", 1)[-1]
+
+    @property
+    def first_seen(self) -> Optional[datetime]:
+        times = self.install_times + ([self.registry_last_write] if self.registry_last_write else [])
+        return min(times) if times else None
+
+    @property
+    def last_seen(self) -> Optional[datetime]:
+        times = self.install_times + ([self.registry_last_write] if self.registry_last_write else [])
+        return max(times) if times else None
+
+    def add_instance_id(self, raw_pnp_id: str) -> None:
+        if raw_pnp_id not in self.instance_ids:
+            self.instance_ids.append(raw_pnp_id)
+
+    def __repr__(self) -> str:
+        return (
+            f"UsbHistoryEntry(name={self.friendly_name}, normalized_pnp={self.normalized_pnp_id}, "
+            f"first_seen={self.first_seen}, last_seen={self.last_seen})"
+        )
+
+
+def _filetime_to_datetime(filetime: int) -> Optional[datetime]:
+    if not filetime:
+        return None
+    return datetime.fromtimestamp((filetime - _FILETIME_EPOCH_OFFSET) / 10_000_000)
+
+
+def _get_entry(index: Dict[str, UsbHistoryEntry], raw_pnp_id: str) -> UsbHistoryEntry:
+    norm_pnp = normalize_pnp_id(raw_pnp_id)
+    entry = index.get(norm_pnp)
+    if entry is None:
+        entry = UsbHistoryEntry(norm_pnp)
+        index[norm_pnp] = entry
+    entry.add_instance_id(raw_pnp_id)
+    return entry
+
+
+def read_usbstor_registry(index: Dict[str, UsbHistoryEntry]) -> None:
+    """Add every USBSTOR\\<device>\\<instance> key to `index`."""
+    try:
+        root = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, USBSTOR_KEY, 0, winreg.KEY_READ)
+    except FileNotFoundError:
+        return
+
+    with root:
+        device_count, _, _ = winreg.QueryInfoKey(root)
+        for i in range(device_count):
+            device_name = winreg.EnumKey(root, i)
+            try:
+                device_key = winreg.OpenKey(root, device_name, 0, winreg.KEY_READ)
+            except OSError:
+                continue
+
+            with device_key:
+                instance_count, _, _ = winreg.QueryInfoKey(device_key)
+                for j in range(instance_count):
+                    instance_name = winreg.EnumKey(device_key, j)
+                    entry = _get_entry(index, f"USBSTOR\\{device_name}\\{instance_name}")
+                    try:
+                        with winreg.OpenKey(device_key, instance_name, 0, winreg.KEY_READ) as instance_key:
+                            _, _, last_write = winreg.QueryInfoKey(instance_key)
+                            entry.registry_last_write = _filetime_to_datetime(last_write)
+                            try:
+                                entry.friendly_name, _ = winreg.QueryValueEx(instance_key, "FriendlyName")
+                            except FileNotFoundError:
+                                pass
+                    except OSError:
+                        continue
+
+
+def read_setupapi_logs(index: Dict[str, UsbHistoryEntry], log_paths: Iterable[str]) -> None:
+    """Add installation timestamps from setupapi logs to `index`."""
+    for event in iter_logs(log_paths):
+        entry = _get_entry(index, event.pnp_id)
+        if event.timestamp is not None:
+            entry.install_times.append(event.timestamp)
+
+
+def collect_usb_history(log_paths: Optional[Iterable[str]] = None) -> Dict[str, UsbHistoryEntry]:
+    """
+    Returns a dict normalized_pnp_id -> UsbHistoryEntry for every USB storage
+    device ever connected (as far as registry and logs remember).
+    """
+    index: Dict[str, UsbHistoryEntry] = {}
+    read_usbstor_registry(index)
+    read_setupapi_logs(index, default_log_paths() if log_paths is None else log_paths)
+
+    for entry in index.values():
+        entry.install_times.sort()
+    return index
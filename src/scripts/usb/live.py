@@ -0,0 +1,195 @@
+"""
+Live, incrementally updated map of plugged USB storage devices.
+
+The map is filled by one full enumeration and then kept current from a
+DeviceEventSource: every event is turned into the normalized PNP IDs it affects
+and only those devices are re-read.
+
+Loaders are injectable so the map can be driven by FakeDeviceEventSource
+without WMI:
+
+    live = LiveUsbDevices(
+        FakeDeviceEventSource(),
+        list_devices=lambda: [...],
+        load_devices=lambda ids: {...},
+        resolve_volume=lambda letter: None,
+    )
+"""
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set
+
+from scripts.usb.device_events import DeviceEvent, DeviceEventKind, DeviceEventSource
+from scripts.usb.pnp import normalize_pnp_id
+
+if TYPE_CHECKING:
+    from scripts.usb.plugged import UsbStorageDevice
+
+ListDevices = Callable[[], Iterable["UsbStorageDevice"]]
+LoadDevices = Callable[[Iterable[str]], Dict[str, "UsbStorageDevice"]]
+ResolveVolume = Callable[[str], Optional[str]]
+ChangeCallback = Callable[[Set[str]], None]
+
+
+class LiveUsbDevices:
+    """
+    Grouped UsbStorageDevice map (normalized PNP ID -> device) kept in sync
+    with device events.
+
+    - list_devices: full enumeration used once on start()
+    - load_devices: re-reads only the given normalized PNP IDs; IDs missing from
+      the result are treated as unplugged
+    - resolve_volume: maps a newly mounted drive letter to a normalized PNP ID
+    - on_change: called (from the event thread) with the IDs that changed
+    """
+
+    def __init__(
+            self,
+            source: DeviceEventSource,
+            list_devices: Optional[ListDevices] = None,
+            load_devices: Optional[LoadDevices] = None,
+            resolve_volume: Optional[ResolveVolume] = None,
+            on_change: Optional[ChangeCallback] = None,
+            check_fs_health: bool = False,
+    ):
+        if list_devices is None or load_devices is None or resolve_volume is None:
+            # Real WMI-backed loaders are imported lazily so that the map can
+            # be used with fakes where WMI is not available.
+            from scripts.usb.plugged import (
+                find_usb_pnp_id_for_volume,
+                list_usb_storage_devices,
+                load_usb_storage_devices,
+            )
+            list_devices = list_devices or (lambda: list_usb_storage_devices(check_fs_health=check_fs_health))
+            load_devices = load_devices or (
+                lambda ids: load_usb_storage_devices(ids, check_fs_health=check_fs_health)
+            )
+            resolve_volume = resolve_volume or find_usb_pnp_id_for_volume
+
+        self._source = source
+        self._list_devices: ListDevices = list_devices
+        self._load_devices: LoadDevices = load_devices
+        self._resolve_volume: ResolveVolume = resolve_volume
+        self._on_change = on_change
+
+        self._lock = threading.Lock()
+        self._devices: Dict[str, UsbStorageDevice] = {}
+
+    def start(self) -> None:
+        """Enumerate all devices once, then subscribe to changes."""
+        devices = {d.normalized_pnp_id: d for d in self._list_devices()}
+        with self._lock:
+            self._devices = devices
+        self._source.start(self.handle_event)
+
+    def stop(self) -> None:
+        self._source.stop()
+
+    def devices(self) -> List[UsbStorageDevice]:
+        """Snapshot of the current devices, in plug-in order."""
+        with self._lock:
+            return list(self._devices.values())
+
+    def handle_event(self, event: DeviceEvent) -> None:
+        """Re-read only the devices affected by `event` and update the map."""
+        affected = self._affected_ids(event)
+        if not affected:
+            return
+
+        fresh = self._load_devices(affected)
+
+        changed: Set[str] = set()
+        with self._lock:
+            for norm_pnp in affected:
+                device = fresh.get(norm_pnp)
+                if device is not None:
+                    self._devices[norm_pnp] = device
+                    changed.add(norm_pnp)
+                elif self._devices.pop(norm_pnp, None) is not None:
+                    changed.add(norm_pnp)
+
+        if changed and self._on_change is not None:
+            self._on_change(changed)
+
+    def _affected_ids(self, event: DeviceEvent) -> Set[str]:
+        if event.pnp_id:
+            if not event.pnp_id.upper().startswith("USBSTOR\\"):
+                return set()
+            return {normalize_pnp_id(event.pnp_id)}
+
+        if not event.drive_letter:
+            return set()
+
+        letter = event.drive_letter.rstrip("\\").upper()
+
+        # A removed volume can no longer be resolved through WMI, so look
+        # it up among the devices we already know.
+        with self._lock:
+            for norm_pnp, device in self._devices.items():
+                if any((v.drive_letter or "").upper() == letter for v in device.volumes):
+                    return {norm_pnp}
+
+        if event.kind is DeviceEventKind.REMOVAL:
+            return set()
+
+        norm_pnp = self._resolve_volume(letter)
+        return {norm_pnp} if norm_pnp else set()
+
+
+if __name__ == "__main__":
+    # Self-check of the incremental update, driven by FakeDeviceEventSource:
+    #   python -m scripts.usb.live
+    from types import SimpleNamespace
+
+    from scripts.usb.device_events import FakeDeviceEventSource
+
+    STICK = "USBSTOR\\DISK&VEN_FOO&PROD_BAR\\0001"
+    DISK = "USBSTOR\\DISK&VEN_BAZ&PROD_QUX\\0002"
+
+    def _device(norm_pnp: str, letter: str):
+        return SimpleNamespace(normalized_pnp_id=norm_pnp, volumes=[SimpleNamespace(drive_letter=letter)])
+
+    plugged = {STICK: _device(STICK, "E:")}
+    loads: List[Set[str]] = []
+    changes: List[Set[str]] = []
+
+    def _load(ids):
+        loads.append(set(ids))
+        return {i: plugged[i] for i in ids if i in plugged}
+
+    source = FakeDeviceEventSource()
+    live = LiveUsbDevices(
+        source,
+        list_devices=lambda: list(plugged.values()),
+        load_devices=_load,
+        resolve_volume=lambda letter: DISK if letter == "F:" and DISK in plugged else None,
+        on_change=changes.append,
+    )
+    live.start()
+    assert [d.normalized_pnp_id for d in live.devices()] == [STICK]
+
+    # PnP arrival of a second device: only that device is re-read
+    plugged[DISK] = _device(DISK, "F:")
+    source.emit(DeviceEvent(DeviceEventKind.ARRIVAL, pnp_id=DISK + "&0"))
+    assert loads[-1] == {DISK} and changes[-1] == {DISK}
+    assert [d.normalized_pnp_id for d in live.devices()] == [STICK, DISK]
+
+    # Non-storage PnP IDs are ignored
+    source.emit(DeviceEvent(DeviceEventKind.ARRIVAL, pnp_id="USB\\VID_1234&PID_5678\\X"))
+    assert len(loads) == 1
+
+    # Volume removal of a known letter: resolved from the map, device dropped
+    del plugged[STICK]
+    source.emit(DeviceEvent(DeviceEventKind.REMOVAL, drive_letter="e:\\"))
+    assert loads[-1] == {STICK} and changes[-1] == {STICK}
+    assert [d.normalized_pnp_id for d in live.devices()] == [DISK]
+
+    # Removal of an unknown letter does nothing
+    source.emit(DeviceEvent(DeviceEventKind.REMOVAL, drive_letter="Z:"))
+    assert len(loads) == 2
+
+    live.stop()
+    source.emit(DeviceEvent(DeviceEventKind.ARRIVAL, pnp_id=STICK))
+    assert len(loads) == 2, "events after stop() must not reach the map"
+    print("[+] LiveUsbDevices: incremental updates OK")
@@ -1,23 +1,9 @@
 from __future__ import annotations
-import os
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Set
 import wmi
 
-
-def normalize_pnp_id(pnp_id: str) -> str:
-    """
-    Normalize PNPDeviceID so that multiple entries for the same physical device
-    (e.g. with &0, &1, &LUN0 suffixes) are grouped into a single key.
-
-    Example:
-        USBSTOR\\DISK&VEN_FOO&PROD_BAR\\12345678&0  -> USBSTOR\\DISK&VEN_FOO&PROD_BAR\\12345678
-        USBSTOR\\DISK&VEN_FOO&PROD_BAR\\12345678&1  -> USBSTOR\\DISK&VEN_FOO&PROD_BAR\\12345678
-    """
-    up = pnp_id.upper()
-    for suffix in ("&0", "&1", "&2", "&3", "&LUN0", "&LUN1", "&LUN2", "&LUN3"):
-        if up.endswith(suffix):
-            return up[: -len(suffix)]
-    return up
+from scripts.usb.fs_probe import DEFAULT_DEADLINE, ProbeResult, ProbeState, probe_volumes
+from scripts.usb.pnp import normalize_pnp_id
 
 
 class UsbVolume:
@@ -43,29 +29,32 @@ class UsbVolume:
         # Filesystem health status:
         # None  – not checked / cannot be checked
         # False – healthy
-        # True  – OS error when accessing the root directory
+        # True  – OS error or no answer within the probe deadline
         self.is_broken: Optional[bool] = None
         self.error_message: Optional[str] = None
 
-    def check_filesystem_health(self) -> None:
+        # Full probe outcome (state, timings, throughput), None if not checked
+        self.probe: Optional[ProbeResult] = None
+
+    def check_filesystem_health(self, deadline: float = DEFAULT_DEADLINE, deep: bool = False) -> None:
         """
         Attempts to list the root directory to check filesystem validity.
-        If OSError is raised → filesystem is damaged or inaccessible.
+        If OSError is raised or the volume does not answer within `deadline`
+        seconds → filesystem is damaged or inaccessible.
         """
         if not self.drive_letter:
             self.is_broken = None
             self.error_message = "No drive letter, cannot check filesystem"
             return
 
-        root_path = self.drive_letter + "\\"
+        results = probe_volumes([self.drive_letter], deadline=deadline, deep=deep)
+        self.apply_probe_result(results[self.drive_letter])
 
-        try:
-            os.listdir(root_path)
-            self.is_broken = False
-            self.error_message = None
-        except OSError as e:
-            self.is_broken = True
-            self.error_message = f"{e.__class__.__name__}: {e}"
+    def apply_probe_result(self, result: ProbeResult) -> None:
+        """ Store the outcome of a filesystem probe on this volume. """
+        self.probe = result
+        self.is_broken = result.state is not ProbeState.HEALTHY
+        self.error_message = result.error_message
 
     def __repr__(self) -> str:
         return (
@@ -90,6 +79,9 @@ class UsbStorageDevice:
         # PnP layer information (aggregated from Win32_PnPEntity entries)
         self.name: Optional[str] = None
         self.pnp_ids: List[str] = []          # all raw PnP IDs (including &0, &1, ...)
+        # Hardware and compatible IDs of the USBSTOR entries and of their parent
+        # USB device – what AllowDeviceIDs / DenyDeviceIDs rules are written against
+        self.hardware_ids: List[str] = []
         self.status: Optional[str] = None
         self.error_code: Optional[int] = None
 
@@ -123,6 +115,18 @@ class UsbStorageDevice:
             self.status = status
             self.error_code = error_code
 
+    def add_hardware_ids(self, ids: Iterable[str]) -> None:
+        known = {i.upper() for i in self.hardware_ids}
+        for hw_id in ids:
+            if hw_id and hw_id.upper() not in known:
+                known.add(hw_id.upper())
+                self.hardware_ids.append(hw_id)
+
+    @property
+    def rule_ids(self) -> List[str]:
+        """Every ID device installation restrictions are evaluated against."""
+        return self.pnp_ids + self.hardware_ids
+
     def _is_better_pnp_id(self, new_pnp: str) -> bool:
         """
         Decide if the new PnP ID is a "better" representative for the device.
@@ -160,7 +164,11 @@ class UsbStorageDevice:
         )
 
 
-def list_usb_storage_devices(check_fs_health: bool = False) -> List[UsbStorageDevice]:
+def list_usb_storage_devices(
+        check_fs_health: bool = False,
+        deep_fs_check: bool = False,
+        fs_deadline: float = DEFAULT_DEADLINE,
+) -> List[UsbStorageDevice]:
     """
     Returns a list of UsbStorageDevice — one per physical USB storage device.
 
@@ -169,18 +177,104 @@ def list_usb_storage_devices(check_fs_health: bool = False) -> List[UsbStorageDe
     - is_installed:
         True  → the OS successfully created DiskDrive/LogicalDisk
         False → installation failed or was blocked by Device Installation GPO
+    - check_fs_health: probe all volumes concurrently, each bounded by
+      `fs_deadline` seconds (see scripts.usb.fs_probe); `deep_fs_check` adds
+      boot-sector and sample file reads with throughput numbers.
     """
     c = wmi.WMI()
+    devices = _build_devices(
+        c, c.Win32_PnPEntity(), None, check_fs_health, deep_fs_check, fs_deadline
+    )
+    return list(devices.values())
+
+
+def load_usb_storage_devices(
+        normalized_pnp_ids: Iterable[str],
+        check_fs_health: bool = False,
+        deep_fs_check: bool = False,
+        fs_deadline: float = DEFAULT_DEADLINE,
+        c=None,
+) -> Dict[str, UsbStorageDevice]:
+    """
+    Re-read only the given devices (normalized PNP IDs) instead of enumerating
+    every PnP entity on the machine.
+
+    Returns a dict normalized_pnp_id -> UsbStorageDevice. IDs that are missing
+    from the result are no longer present on the system.
+    """
+    wanted = {normalize_pnp_id(p) for p in normalized_pnp_ids if p}
+    if not wanted:
+        return {}
+
+    c = c or wmi.WMI()
+    like = " OR ".join(
+        f"PNPDeviceID LIKE '{_escape_wql_like(norm_pnp)}%'" for norm_pnp in sorted(wanted)
+    )
+    entities = c.query(f"SELECT * FROM Win32_PnPEntity WHERE {like}")
+
+    return _build_devices(c, entities, wanted, check_fs_health, deep_fs_check, fs_deadline)
+
+
+def find_usb_pnp_id_for_volume(drive_letter: str, c=None) -> Optional[str]:
+    """
+    Resolve a mounted volume (e.g. "E:") to the normalized PNP ID of its USB disk,
+    following LogicalDisk → Partition → DiskDrive. Returns None if not a USB disk.
+    """
+    c = c or wmi.WMI()
+    for logical in c.Win32_LogicalDisk(DeviceID=drive_letter):
+        for partition in logical.associators("Win32_LogicalDiskToPartition"):
+            for disk in partition.associators("Win32_DiskDriveToDiskPartition"):
+                if disk.InterfaceType == "USB" and disk.PNPDeviceID:
+                    return normalize_pnp_id(disk.PNPDeviceID)
+    return None
+
+
+def _entity_ids(entity) -> List[str]:
+    """HardwareID followed by CompatibleID of a Win32_PnPEntity."""
+    return [i for i in list(entity.HardwareID or ()) + list(entity.CompatibleID or ()) if i]
+
+
+def _parent_ids(c, entity, cache: Dict[str, List[str]]) -> List[str]:
+    """Hardware and compatible IDs of the parent device (the USB\\VID_... node of a USBSTOR disk)."""
+    try:
+        props = entity.GetDeviceProperties(["DEVPKEY_Device_Parent"])[0]
+        parent = props[0].Data if props else None
+    except Exception:
+        # GetDeviceProperties needs Windows 8+; without it only the disk's own IDs are used
+        return []
+    if not parent:
+        return []
+    if parent not in cache:
+        cache[parent] = [i for p in c.Win32_PnPEntity(DeviceID=parent) for i in _entity_ids(p)]
+    return cache[parent]
+
+
+def _escape_wql_like(value: str) -> str:
+    """Escape a literal for use inside a WQL LIKE '...' pattern."""
+    return value.replace("\\", "\\\\").replace("'", "\\'").replace("[", "[[]")
+
+
+def _build_devices(
+        c,
+        pnp_entities: Iterable,
+        wanted: Optional[Set[str]],
+        check_fs_health: bool,
+        deep_fs_check: bool,
+        fs_deadline: float,
+) -> Dict[str, UsbStorageDevice]:
+    """
+    Group PnP entities into UsbStorageDevice objects and attach disk information.
+    If `wanted` is given, only those normalized PNP IDs are considered.
+    """
 
     # --- 1. Collect USB disks from Win32_DiskDrive + LogicalDisk, grouped by normalized PNP ---
     disks_by_norm_pnp: Dict[str, Dict[str, object]] = {}
 
-    for disk in c.Win32_DiskDrive():
-        if disk.InterfaceType != "USB":
-            continue
-
+    for disk in c.Win32_DiskDrive(InterfaceType="USB"):
         raw_pnp = disk.PNPDeviceID or ""
         norm_pnp = normalize_pnp_id(raw_pnp)
+        if wanted is not None and norm_pnp not in wanted:
+            continue
 
         model: Optional[str] = disk.Model
         device_id: Optional[str] = disk.DeviceID
@@ -198,8 +292,6 @@ def list_usb_storage_devices(check_fs_health: bool = False) -> List[UsbStorageDe
                     free_bytes=int(logical.FreeSpace) if logical.FreeSpace else None,
                     label=logical.VolumeName,
                 )
-                if check_fs_health:
-                    vol.check_filesystem_health()
                 volumes.append(vol)
 
         disks_by_norm_pnp[norm_pnp] = {
@@ -209,10 +301,29 @@ def list_usb_storage_devices(check_fs_health: bool = False) -> List[UsbStorageDe
             "volumes": volumes,
         }
 
+    if check_fs_health:
+        all_volumes = [
+            vol
+            for disk_info in disks_by_norm_pnp.values()
+            for vol in disk_info["volumes"]  # type: ignore[union-attr]
+        ]
+        results = probe_volumes(
+            [vol.drive_letter for vol in all_volumes],
+            deadline=fs_deadline,
+            deep=deep_fs_check,
+        )
+        for vol in all_volumes:
+            if vol.drive_letter in results:
+                vol.apply_probe_result(results[vol.drive_letter])
+            else:
+                vol.is_broken = None
+                vol.error_message = "No drive letter, cannot check filesystem"
+
     # --- 2. Collect all USBSTOR devices from Win32_PnPEntity and group them ---
     devices_by_norm_pnp: Dict[str, UsbStorageDevice] = {}
+    parents: Dict[str, List[str]] = {}
 
-    for dev in c.Win32_PnPEntity():
+    for dev in pnp_entities:
         raw_pnp = dev.PNPDeviceID
         if not raw_pnp:
             continue
@@ -222,8 +333,9 @@ def list_usb_storage_devices(check_fs_health: bool = False) -> List[UsbStorageDe
         if not up.startswith("USBSTOR\\"):
             continue
 
-
         norm_pnp = normalize_pnp_id(raw_pnp)
+        if wanted is not None and norm_pnp not in wanted:
+            continue
 
         name: Optional[str] = dev.Name
         status: Optional[str] = dev.Status
@@ -240,6 +352,7 @@ def list_usb_storage_devices(check_fs_health: bool = False) -> List[UsbStorageDe
             status=status,
             error_code=error_code,
         )
+        device.add_hardware_ids(_entity_ids(dev) + _parent_ids(c, dev, parents))
 
     # --- 3. Attach disk information (if any) to each grouped device ---
     for norm_pnp, disk_info in disks_by_norm_pnp.items():
@@ -256,4 +369,4 @@ def list_usb_storage_devices(check_fs_health: bool = False) -> List[UsbStorageDe
             volumes=disk_info["volumes"],     # type: ignore[arg-type]
         )
 
-    return list(devices_by_norm_pnp.values())
+    return devices_by_norm_pnp
@@ -0,0 +1,22 @@
+"""
+PnP device ID helpers shared by the USB modules.
+
+Kept free of WMI/pywin32 imports so that parsers and matchers built on top of
+it can be used (and exercised) on any platform.
+"""
+
+
+def normalize_pnp_id(pnp_id: str) -> str:
+    """
+    Normalize PNPDeviceID so that multiple entries for the same physical device
+    (e.g. with &0, &1, &LUN0 suffixes) are grouped into a single key.
+
+    Example:
+        USBSTOR\\DISK&VEN_FOO&PROD_BAR\\12345678&0  -> USBSTOR\\DISK&VEN_FOO&PROD_BAR\\12345678
+        USBSTOR\\DISK&VEN_FOO&PROD_BAR\\12345678&1  -> USBSTOR\\DISK&VEN_FOO&PROD_BAR\\12345678
+    """
+    up = pnp_id.upper()
+    for suffix in ("&0", "&1", "&2", "&3", "&LUN0", "&LUN1", "&LUN2", "&LUN3"):
+        if up.endswith(suffix):
+            return up[: -len(suffix)]
+    return up
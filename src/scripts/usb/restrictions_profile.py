@@ -0,0 +1,259 @@
+"""
+Capture and diff-apply of the DeviceInstall\\Restrictions policy key.
+
+A profile payload holds every value of the key plus its list subkeys
+(AllowDeviceIDs, DenyDeviceIDs, AllowDeviceClasses, ...), where each list is
+stored as the ordered strings of its "1", "2", ... values:
+
+    {
+      "values": {"DenyUnspecified": {"type": "REG_DWORD", "data": 1}, ...},
+      "lists":  {"AllowDeviceIDs": ["USBSTOR\\\\DISK&VEN_FOO...", ...], ...}
+    }
+
+Applying compares the payload with the live key and writes only what differs,
+inside one opened key, followed by a single RefreshPolicyEx call.
+"""
+import winreg
+from typing import Any, Dict, List, Tuple
+
+from scripts.usb.usb_whitelist_toggle import REG_PATH, open_policy_key, refresh_machine_policy
+
+# Payload layout version written into saved JSON files
+PAYLOAD_VERSION = 2
+
+REG_TYPE_NAMES = {
+    winreg.REG_SZ: "REG_SZ",
+    winreg.REG_EXPAND_SZ: "REG_EXPAND_SZ",
+    winreg.REG_MULTI_SZ: "REG_MULTI_SZ",
+    winreg.REG_DWORD: "REG_DWORD",
+    winreg.REG_QWORD: "REG_QWORD",
+    winreg.REG_BINARY: "REG_BINARY",
+}
+REG_TYPES = {name: vtype for vtype, name in REG_TYPE_NAMES.items()}
+
+# Live state: values name -> (type, data); lists subkey -> {value name: string}
+LiveValues = Dict[str, Tuple[int, Any]]
+LiveLists = Dict[str, Dict[str, str]]
+
+
+class RestrictionsDiff:
+    """Minimal set of registry writes that turns the live key into the target."""
+
+    def __init__(self):
+        self.set_values: LiveValues = {}
+        self.delete_values: List[str] = []
+        self.list_set: Dict[str, Dict[str, str]] = {}     # subkey -> {value name: id}
+        self.list_delete: Dict[str, List[str]] = {}       # subkey -> value names
+        self.delete_lists: List[str] = []                 # subkeys removed completely
+
+    @property
+    def change_count(self) -> int:
+        return (
+            len(self.set_values)
+            + len(self.delete_values)
+            + sum(len(v) for v in self.list_set.values())
+            + sum(len(v) for v in self.list_delete.values())
+            + len(self.delete_lists)
+        )
+
+    def is_empty(self) -> bool:
+        return self.change_count == 0
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for name, (vtype, data) in self.set_values.items():
+            lines.append(f"set    {name} = {data!r} ({REG_TYPE_NAMES.get(vtype, vtype)})")
+        for name in self.delete_values:
+            lines.append(f"delete {name}")
+        for sub in sorted(set(self.list_set) | set(self.list_delete)):
+            added = len(self.list_set.get(sub, {}))
+            removed = len(self.list_delete.get(sub, []))
+            lines.append(f"list   {sub}: {added} written, {removed} removed")
+        for sub in self.delete_lists:
+            lines.append(f"delete list {sub}")
+        return lines
+
+
+# --- Encoding between registry data and JSON ---
+
+
+def _encode_value(vtype: int, data: Any) -> Dict[str, Any]:
+    # Types without a name (REG_NONE, REG_DWORD_BIG_ENDIAN, ...) are kept by
+    # number; winreg returns their data as bytes, stored as hex like REG_BINARY
+    if vtype == winreg.REG_BINARY or vtype not in REG_TYPE_NAMES:
+        data = (data or b"").hex()
+    return {"type": REG_TYPE_NAMES.get(vtype, vtype), "data": data}
+
+
+def _decode_value(entry: Dict[str, Any]) -> Tuple[int, Any]:
+    name = entry["type"]
+    vtype = REG_TYPES[name] if isinstance(name, str) else int(name)
+    data = entry["data"]
+    if vtype == winreg.REG_BINARY or vtype not in REG_TYPE_NAMES:
+        data = bytes.fromhex(data)
+    elif vtype in (winreg.REG_DWORD, winreg.REG_QWORD):
+        data = int(data)
+    return vtype, data
+
+
+def _list_order(name: str) -> Tuple[int, Any]:
+    """Sort numbered list values ("1", "2", "10") numerically, others after them."""
+    return (0, int(name)) if name.isdigit() else (1, name.lower())
+
+
+# --- Live key access ---
+
+
+def _read_values(key) -> LiveValues:
+    values: LiveValues = {}
+    _, value_count, _ = winreg.QueryInfoKey(key)
+    for i in range(value_count):
+        name, data, vtype = winreg.EnumValue(key, i)
+        values[name] = (vtype, data)
+    return values
+
+
+def _read_live(key) -> Tuple[LiveValues, LiveLists]:
+    values = _read_values(key)
+
+    lists: LiveLists = {}
+    subkey_count, _, _ = winreg.QueryInfoKey(key)
+    for name in [winreg.EnumKey(key, i) for i in range(subkey_count)]:
+        with winreg.OpenKey(key, name, 0, winreg.KEY_READ) as sub:
+            lists[name] = {
+                value_name: str(data)
+                for value_name, (vtype, data) in _read_values(sub).items()
+                if vtype in (winreg.REG_SZ, winreg.REG_EXPAND_SZ)
+            }
+    return values, lists
+
+
+def read_live_restrictions() -> Tuple[LiveValues, LiveLists]:
+    """Read the current policy key. A missing key is returned as empty."""
+    try:
+        key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, REG_PATH, 0, winreg.KEY_READ)
+    except FileNotFoundError:
+        return {}, {}
+
+    with key:
+        return _read_live(key)
+
+
+def capture_restrictions() -> Dict[str, Any]:
+    """Capture the whole DeviceInstall\\Restrictions key as a JSON-ready payload."""
+    values, lists = read_live_restrictions()
+    return {
+        "values": {name: _encode_value(vtype, data) for name, (vtype, data) in values.items()},
+        "lists": {
+            sub: [entries[name] for name in sorted(entries, key=_list_order)]
+            for sub, entries in lists.items()
+        },
+    }
+
+
+def decode_payload(payload: Dict[str, Any]) -> Tuple[LiveValues, Dict[str, List[str]]]:
+    values = {name: _decode_value(entry) for name, entry in payload.get("values", {}).items()}
+    lists = {sub: [str(i) for i in ids] for sub, ids in payload.get("lists", {}).items()}
+    return values, lists
+
+
+# --- Diff ---
+
+
+def _diff_list(live: Dict[str, str], wanted: List[str]) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Compare one list subkey. Entries already present keep their value names;
+    names of stale or duplicate entries are reused for new IDs before fresh
+    numbers are allocated, so every changed ID costs exactly one write.
+    """
+    wanted_set = set(wanted)
+    present = set()
+    stale: List[str] = []
+
+    for name in sorted(live, key=_list_order):
+        device_id = live[name]
+        if device_id in wanted_set and device_id not in present:
+            present.add(device_id)
+        else:
+            stale.append(name)
+
+    missing = [d for d in dict.fromkeys(wanted) if d not in present]
+
+    to_set: Dict[str, str] = {}
+    reusable = iter(stale)
+    used = set(live)
+    next_number = 1
+    for device_id in missing:
+        name = next(reusable, None)
+        if name is None:
+            while str(next_number) in used:
+                next_number += 1
+            name = str(next_number)
+            used.add(name)
+        to_set[name] = device_id
+
+    to_delete = stale[len(missing):]
+    return to_set, to_delete
+
+
+def diff_restrictions(
+        live_values: LiveValues,
+        live_lists: LiveLists,
+        target_values: LiveValues,
+        target_lists: Dict[str, List[str]],
+) -> RestrictionsDiff:
+    diff = RestrictionsDiff()
+
+    for name, (vtype, data) in target_values.items():
+        if live_values.get(name) != (vtype, data):
+            diff.set_values[name] = (vtype, data)
+    diff.delete_values = [name for name in live_values if name not in target_values]
+
+    for sub, wanted in target_lists.items():
+        to_set, to_delete = _diff_list(live_lists.get(sub, {}), wanted)
+        if to_set:
+            diff.list_set[sub] = to_set
+        if to_delete:
+            diff.list_delete[sub] = to_delete
+    diff.delete_lists = [sub for sub in live_lists if sub not in target_lists]
+
+    return diff
+
+
+def plan_restrictions(payload: Dict[str, Any]) -> RestrictionsDiff:
+    """Compute what applying `payload` would change, without writing anything."""
+    target_values, target_lists = decode_payload(payload)
+    live_values, live_lists = read_live_restrictions()
+    return diff_restrictions(live_values, live_lists, target_values, target_lists)
+
+
+def apply_restrictions(payload: Dict[str, Any]) -> RestrictionsDiff:
+    """
+    Bring the live policy key to the state stored in `payload`.
+    Only differing values are written; policy is refreshed once if anything changed.
+    """
+    target_values, target_lists = decode_payload(payload)
+
+    with open_policy_key(write=True) as key:
+        live_values, live_lists = _read_live(key)
+        diff = diff_restrictions(live_values, live_lists, target_values, target_lists)
+
+        for name, (vtype, data) in diff.set_values.items():
+            winreg.SetValueEx(key, name, 0, vtype, data)
+        for name in diff.delete_values:
+            winreg.DeleteValue(key, name)
+
+        for sub in set(diff.list_set) | set(diff.list_delete):
+            with winreg.CreateKeyEx(key, sub, 0, winreg.KEY_READ | winreg.KEY_WRITE) as sub_key:
+                for name, device_id in diff.list_set.get(sub, {}).items():
+                    winreg.SetValueEx(sub_key, name, 0, winreg.REG_SZ, device_id)
+                for name in diff.list_delete.get(sub, []):
+                    winreg.DeleteValue(sub_key, name)
+
+        for sub in diff.delete_lists:
+            winreg.DeleteKey(key, sub)
+
+    if not diff.is_empty():
+        refresh_machine_policy()
+
+    return diff
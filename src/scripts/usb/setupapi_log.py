@@ -0,0 +1,125 @@
+"""
+Streaming parser for the SetupAPI device installation log (setupapi.dev.log).
+
+The log is often tens of MB, so it is memory-mapped and scanned with a bytes
+regex: only the "Device Install" section headers are decoded, nothing else is
+copied into Python objects. Pure Python, no Windows APIs – works with any copy
+of the log. Windows writes it in the ANSI code page; a copy saved as UTF-16
+(it starts with a byte order mark) is decoded first and scanned as text.
+A section cut off at the end of the file (still being written) is skipped.
+
+Section header format:
+    >>>  [Device Install (Hardware initiated) - USBSTOR\\Disk&Ven_X&Prod_Y&Rev_1.0\\0123&0]
+    >>>  Section start 2024/03/01 09:15:42.318
+"""
+import glob
+import mmap
+import os
+import re
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+
+def default_log_paths() -> List[str]:
+    """setupapi.dev.log plus its rotated copies (setupapi.dev.YYYYMMDD_HHMMSS.log), oldest first."""
+    inf_dir = os.path.join(os.environ.get("SystemRoot", r"C:\Windows"), "INF")
+    rotated = sorted(glob.glob(os.path.join(inf_dir, "setupapi.dev.*.log")))
+    return rotated + [os.path.join(inf_dir, "setupapi.dev.log")]
+
+
+class LogInstallEvent:
+    """One device installation section found in the log."""
+
+    def __init__(self, pnp_id: str, timestamp: Optional[datetime], trigger: str, source: str):
+        self.pnp_id: str = pnp_id                    # raw instance ID as written in the log
+        self.timestamp: Optional[datetime] = timestamp
+        self.trigger: str = trigger                  # e.g. "Hardware initiated"
+        self.source: str = source                    # log file path
+
+    def __repr__(self) -> str:
+        return f"LogInstallEvent(pnp_id={self.pnp_id}, timestamp={self.timestamp}, trigger={self.trigger})"
+
+
+UTF16_BOM = b"\xff\xfe"
+
+SECTION_PATTERN = (
+    r">>>  \[Device Install \(([^)\r\n]*)\) - ({prefix}[^\]\r\n]*)\]\r?\n"
+    r">>>  Section start (\d{{4}}/\d{{2}}/\d{{2}} \d{{2}}:\d{{2}}:\d{{2}})"
+)
+
+
+def _section_regex(prefix: str) -> "re.Pattern[bytes]":
+    return re.compile(SECTION_PATTERN.format(prefix=re.escape(prefix)).encode("ascii"), re.IGNORECASE)
+
+
+def _section_text_regex(prefix: str) -> "re.Pattern[str]":
+    return re.compile(SECTION_PATTERN.format(prefix=re.escape(prefix)), re.IGNORECASE)
+
+
+def _parse_timestamp(raw) -> Optional[datetime]:
+    # "YYYY/MM/DD HH:MM:SS" – fixed positions, much cheaper than strptime
+    try:
+        return datetime(
+            int(raw[0:4]), int(raw[5:7]), int(raw[8:10]),
+            int(raw[11:13]), int(raw[14:16]), int(raw[17:19]),
+        )
+    except ValueError:
+        return None
+
+
+def iter_device_installs(path: str, prefix: str = "USBSTOR\\") -> Iterator[LogInstallEvent]:
+    """
+    Yield install sections for devices whose instance ID starts with `prefix`
+    (case-insensitive), in file order. Missing or empty files yield nothing.
+    """
+    regex = _section_regex(prefix)
+
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:2] == UTF16_BOM:
+                text = data[2:].decode("utf-16-le", "replace")
+                for m in _section_text_regex(prefix).finditer(text):
+                    yield LogInstallEvent(m.group(2), _parse_timestamp(m.group(3)), m.group(1), path)
+                return
+
+            for m in regex.finditer(data):
+                yield LogInstallEvent(
+                    pnp_id=m.group(2).decode("utf-8", "replace"),
+                    timestamp=_parse_timestamp(m.group(3)),
+                    trigger=m.group(1).decode("utf-8", "replace"),
+                    source=path,
+                )
+
+
+def iter_logs(paths: Iterable[str], prefix: str = "USBSTOR\\") -> Iterator[LogInstallEvent]:
+    for path in paths:
+        yield from iter_device_installs(path, prefix)
+
+
+if __name__ == "__main__":
+    # Self-check against the fixture excerpts (ANSI and UTF-16 copies of one log):
+    #   python -m scripts.usb.setupapi_log
+    fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+    expected = [
+        ("USBSTOR\\Disk&Ven_SanDisk&Prod_Cruzer&Rev_1.00\\4C530001&0",
+         datetime(2024, 3, 1, 9, 15, 42), "Hardware initiated"),
+        ("USBSTOR\\Disk&Ven_Generic&Prod_Flash_Disk&Rev_8.07\\8&1A2B3C4D&0",
+         datetime(2024, 11, 30, 23, 59, 59), "DiInstallDevice"),
+    ]
+    for name in ("setupapi.dev.log", "setupapi.dev.utf16.log"):
+        found = [(e.pnp_id, e.timestamp, e.trigger) for e in iter_device_installs(os.path.join(fixtures, name))]
+        # SWD\WPDBUSENUM sections don't match the prefix; the cut-off Kingston section is skipped
+        assert found == expected, (name, found)
+
+    assert [e.pnp_id for e in iter_logs([os.path.join(fixtures, "setupapi.dev.log")], prefix="swd\\")] == [
+        "SWD\\WPDBUSENUM\\_??_USBSTOR#Disk&Ven_SanDisk&Prod_Cruzer&Rev_1.00#4C530001&0"
+        "#{53f56307-b6bf-11d0-94f2-00a0c91efb8b}"]
+    assert list(iter_device_installs(os.path.join(fixtures, "missing.log"))) == []
+    print("[+] setupapi_log: fixtures parsed OK")
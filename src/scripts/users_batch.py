@@ -0,0 +1,266 @@
+"""
+Batch creation of local users from .list files (see UserList/readme.txt).
+
+Compared to creating users line by line (NetUserGetInfo probe, NetUserAdd,
+NetUserSetInfo, an ADSI call and one group call per user) this:
+- enumerates existing local users once (NetUserEnum) instead of probing each name;
+- creates every account with its final flags in one NetUserAdd level 3 call,
+  including "must change password at next logon" (no ADSI round-trip);
+- adds all new members of a group with a single NetLocalGroupAddMembers call;
+- creates independent accounts in parallel with a bounded thread pool.
+
+The end-to-end flow (plan the delta against the live SAM, then apply it)
+lives in scripts.users_plan.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import win32net
+import win32netcon
+
+from scripts.principals import SID_ADMINISTRATORS, SID_REMOTE_DESKTOP_USERS, SID_USERS, group_name
+
+# Parallel NetUserAdd calls; SAM serializes writes internally, more threads don't help
+DEFAULT_WORKERS = 8
+
+# Entries requested per NetUserEnum / NetLocalGroupGetMembers page
+PREF_MAX_LEN = 64 * 1024
+
+ERROR_MEMBER_IN_ALIAS = 1378
+
+# USER_INFO_3 constants not exported by win32netcon
+DOMAIN_GROUP_RID_USERS = 0x201
+TIMEQ_FOREVER = 0xFFFFFFFF
+USER_MAXSTORAGE_UNLIMITED = 0xFFFFFFFF
+
+
+class UserSpec:
+    """One user line of a .list file."""
+
+    def __init__(self, line_no: int, line: str, username: str, password: str, is_admin: bool,
+                 rdp: bool, chg_pwd: bool, never_expire_pwd: bool):
+        self.line_no = line_no
+        self.line = line
+        self.username = username
+        self.password = password
+        self.is_admin = is_admin
+        self.rdp = rdp
+        self.chg_pwd = chg_pwd
+        self.never_expire_pwd = never_expire_pwd
+
+    @property
+    def key(self) -> str:
+        return self.username.lower()
+
+    def flags(self) -> int:
+        flags = win32netcon.UF_SCRIPT | win32netcon.UF_NORMAL_ACCOUNT
+        if self.never_expire_pwd:
+            flags |= win32netcon.UF_DONT_EXPIRE_PASSWD
+        return flags
+
+    def groups(self) -> List[str]:
+        """Well-known SIDs of the groups the user belongs to."""
+        groups = [SID_ADMINISTRATORS if self.is_admin else SID_USERS]
+        if self.rdp:
+            groups.append(SID_REMOTE_DESKTOP_USERS)
+        return groups
+
+
+class BatchResult:
+    """Outcome of a batch run, printed by print_summary()."""
+
+    def __init__(self):
+        self.created: List[UserSpec] = []
+        self.updated: List[UserSpec] = []
+        self.existing: List[UserSpec] = []
+        self.failed: List[Tuple[UserSpec, str]] = []
+        self.invalid: List[Tuple[int, str]] = []
+        self.group_added: Dict[str, int] = {}
+        self.group_errors: List[str] = []
+        self.resumed: int = 0              # lines skipped as completed by an earlier run
+        self.elapsed: float = 0.0
+
+
+# --- parsing ---------------------------------------------------------------
+
+def _yes(value: str) -> bool:
+    return value.strip().lower() == "yes"
+
+
+def parse_user_line(line_no: int, line: str) -> Optional[UserSpec]:
+    parts = [p.strip() for p in line.split(";")]
+    if len(parts) != 6 or not parts[0]:
+        return None
+
+    username, password, is_admin, rdp, chg_pwd, never_expire_pwd = parts
+    return UserSpec(line_no, line, username, password, _yes(is_admin), _yes(rdp),
+                    _yes(chg_pwd), _yes(never_expire_pwd))
+
+
+def parse_list_file(path: Path) -> Tuple[List[UserSpec], List[Tuple[int, str]]]:
+    """Returns (user specs, invalid lines as (line number, text))."""
+    specs: List[UserSpec] = []
+    invalid: List[Tuple[int, str]] = []
+
+    with path.open(encoding="utf-8") as f:
+        for line_no, raw in enumerate(f, start=1):
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            spec = parse_user_line(line_no, line)
+            if spec is None:
+                invalid.append((line_no, line))
+            else:
+                specs.append(spec)
+
+    return specs, invalid
+
+
+# --- SAM enumeration -------------------------------------------------------
+
+def enumerate_local_users(level: int = 1) -> Dict[str, dict]:
+    """All local user accounts, one NetUserEnum call per page: lower name -> info dict."""
+    users: Dict[str, dict] = {}
+    resume = 0
+    while True:
+        entries, _, resume = win32net.NetUserEnum(
+            None, level, win32netcon.FILTER_NORMAL_ACCOUNT, resume, PREF_MAX_LEN
+        )
+        for entry in entries:
+            users[entry["name"].lower()] = entry
+        if not resume:
+            return users
+
+
+def get_group_members(group: str) -> Set[str]:
+    """Lower-case account names of all members of a local group."""
+    members: Set[str] = set()
+    resume = 0
+    while True:
+        entries, _, resume = win32net.NetLocalGroupGetMembers(None, group, 1, resume, PREF_MAX_LEN)
+        for entry in entries:
+            members.add(entry["name"].lower())
+        if not resume:
+            return members
+
+
+# --- batch operations ------------------------------------------------------
+
+def _user_info_3(spec: UserSpec) -> dict:
+    return {
+        "name": spec.username,
+        "password": spec.password,
+        "priv": win32netcon.USER_PRIV_USER,
+        "home_dir": None,
+        "comment": None,
+        "flags": spec.flags(),
+        "script_path": None,
+        "auth_flags": 0,
+        "full_name": None,
+        "usr_comment": None,
+        "parms": None,
+        "workstations": None,
+        "acct_expires": TIMEQ_FOREVER,
+        "max_storage": USER_MAXSTORAGE_UNLIMITED,
+        "logon_hours": None,
+        "logon_server": None,
+        "country_code": 0,
+        "code_page": 0,
+        "primary_group_id": DOMAIN_GROUP_RID_USERS,
+        "profile": None,
+        "home_dir_drive": None,
+        # Replaces the ADSI "PasswordExpired" round-trip
+        "password_expired": 1 if spec.chg_pwd else 0,
+    }
+
+
+def create_user_account(spec: UserSpec) -> None:
+    """Create one account with its final flags in a single call."""
+    win32net.NetUserAdd(None, 3, _user_info_3(spec))
+
+
+def run_parallel(action: Callable[[UserSpec], None], specs: List[UserSpec],
+                 max_workers: int = DEFAULT_WORKERS) -> List[Tuple[UserSpec, Optional[str]]]:
+    """
+    Run `action` for independent accounts on a bounded thread pool.
+    Returns (spec, error message or None) in input order.
+    """
+
+    def _run(spec: UserSpec) -> Tuple[UserSpec, Optional[str]]:
+        try:
+            action(spec)
+            return spec, None
+        except Exception as e:
+            return spec, str(e)
+
+    if not specs:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(specs)))) as pool:
+        return list(pool.map(_run, specs))
+
+
+def set_user_flags(username: str, flags: int) -> None:
+    """Change only the account flags (USER_INFO_1008), without a read-modify-write."""
+    win32net.NetUserSetInfo(None, username, 1008, {"flags": flags})
+
+
+def add_group_members(group: str, usernames: Iterable[str],
+                      current: Optional[Set[str]] = None) -> Tuple[int, Dict[str, str]]:
+    """
+    Add all given users to `group` that are not members yet, in one
+    NetLocalGroupAddMembers call. If that call fails, members are added one by
+    one so that a single bad entry doesn't block the rest.
+
+    - current: known lower-case member names; read from the system if None
+
+    Returns (number added, {username: error message} for members that failed).
+    """
+    if current is None:
+        current = get_group_members(group)
+    new_members = list(dict.fromkeys(u for u in usernames if u.lower() not in current))
+    if not new_members:
+        return 0, {}
+
+    try:
+        win32net.NetLocalGroupAddMembers(None, group, 3, [{"domainandname": u} for u in new_members])
+        return len(new_members), {}
+    except win32net.error:
+        pass
+
+    added = 0
+    errors: Dict[str, str] = {}
+    for username in new_members:
+        try:
+            win32net.NetLocalGroupAddMembers(None, group, 3, [{"domainandname": username}])
+            added += 1
+        except win32net.error as e:
+            if e.winerror != ERROR_MEMBER_IN_ALIAS:
+                errors[username] = f"{username} -> {group}: {e}"
+    return added, errors
+
+
+def print_summary(result: BatchResult, source_name: str) -> None:
+    for line_no, line in result.invalid:
+        print(f"[!] Invalid line format in {source_name}:{line_no}: {line}")
+    for spec in result.created:
+        groups = ", ".join(group_name(sid) for sid in spec.groups())
+        print(f"[+] User {spec.username} created from {source_name} ({groups})")
+    for spec in result.updated:
+        print(f"[~] User {spec.username} updated from {source_name}")
+    for spec, error in result.failed:
+        print(f"[!] Error provisioning {spec.username} from {source_name}: {error}")
+    for error in result.group_errors:
+        print(f"[!] Group membership error: {error}")
+
+    if result.existing:
+        print(f"[=] {len(result.existing)} user(s) already up to date, skipped")
+    if result.resumed:
+        print(f"[=] {result.resumed} line(s) completed by a previous run, skipped")
+    for group, count in result.group_added.items():
+        print(f"[+] {count} member(s) added to {group}")
+    processed = len(result.created) + len(result.updated) + len(result.existing) + len(result.failed)
+    rate = processed / result.elapsed if result.elapsed > 0 else 0.0
+    print(f"[*] Created {len(result.created)}, updated {len(result.updated)}, failed {len(result.failed)}, "
+          f"skipped {len(result.existing)} in {result.elapsed:.1f}s ({rate:.1f} users/s)")
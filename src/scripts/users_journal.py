@@ -0,0 +1,139 @@
+"""
+Append-only checkpoint journal for provisioning runs of UserList/*.list files.
+
+Every finished step of a user line is appended as one short text record:
+
+    <line hash> <step> <ok|fail>
+
+where the line hash is a 64-bit BLAKE2b digest of the stripped list line (the
+password never ends up in the journal in clear text) and step is one of
+create, flags, groups or done. Records are flushed one by one, so an
+interrupted run loses at most the step that was in flight.
+
+On the next run the journal is loaded into a dict once; lines whose "done"
+record is present are skipped with a single set lookup. All other lines are
+planned again against the live SAM, leaving out the flags and groups steps
+completed_steps() reports for an existing account (see scripts.users_plan), so
+half-finished users are picked up at the step that did not complete. A "fail"
+record cancels an earlier "ok" of the same step. Edited lines hash differently
+and are processed again.
+
+The "must change password" step that used to be a separate ADSI call is part
+of NetUserAdd level 3 here (see scripts.users_batch), so it is covered by the
+create step.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+STEP_CREATE = "create"
+STEP_FLAGS = "flags"
+STEP_GROUPS = "groups"
+STEP_DONE = "done"
+
+STATUS_OK = "ok"
+STATUS_FAILED = "fail"
+
+JOURNAL_SUFFIX = ".journal"
+
+
+def line_hash(line: str) -> str:
+    return hashlib.blake2b(line.strip().encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ProvisioningJournal:
+    """Checkpoints of one list file, stored next to it as <name>.list.journal."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._steps: Dict[str, Set[str]] = {}     # line hash -> steps completed ok
+        self._done: Set[str] = set()
+        self.record_count = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_list_file(cls, list_path: Path) -> "ProvisioningJournal":
+        journal = cls(list_path.with_name(list_path.name + JOURNAL_SUFFIX))
+        journal.load()
+        return journal
+
+    def load(self) -> None:
+        """Read existing records; a truncated last record (crash mid-write) is ignored."""
+        self._steps.clear()
+        self._done.clear()
+        self.record_count = 0
+        try:
+            f = self.path.open(encoding="ascii", errors="replace")
+        except FileNotFoundError:
+            return
+
+        with f:
+            for record in f:
+                parts = record.split()
+                if len(parts) != 3 or not record.endswith("\n"):
+                    continue
+                digest, step, status = parts
+                self.record_count += 1
+                if status != STATUS_OK:
+                    self._steps.get(digest, set()).discard(step)
+                    continue
+                self._steps.setdefault(digest, set()).add(step)
+                if step == STEP_DONE:
+                    self._done.add(digest)
+
+    @property
+    def done_count(self) -> int:
+        return len(self._done)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def is_done(self, line: str) -> bool:
+        return line_hash(line) in self._done
+
+    def completed_steps(self, line: str) -> Set[str]:
+        return set(self._steps.get(line_hash(line), ()))
+
+    def record(self, line: str, step: str, ok: bool = True) -> None:
+        """Append one record and flush it to disk. Safe to call from worker threads."""
+        digest = line_hash(line)
+        text = f"{digest} {step} {STATUS_OK if ok else STATUS_FAILED}\n"
+        with self._lock:
+            if self._file is None:
+                self._file = self.path.open("a", encoding="ascii")
+            self._file.write(text)
+            self._file.flush()
+            self.record_count += 1
+            if ok:
+                self._steps.setdefault(digest, set()).add(step)
+                if step == STEP_DONE:
+                    self._done.add(digest)
+            else:
+                self._steps.get(digest, set()).discard(step)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self) -> None:
+        """Forget all checkpoints (after a complete run or to start over)."""
+        self.close()
+        self._steps.clear()
+        self._done.clear()
+        self.record_count = 0
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "ProvisioningJournal":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> Optional[bool]:
+        self.close()
+        return None
@@ -0,0 +1,316 @@
+"""
+Reconciliation planner for UserList/*.list files.
+
+build_plan() compares a list file with the live local SAM state, read with one
+NetUserEnum pass plus one member listing per involved group, and returns what
+has to happen for every line:
+
+    create         – account does not exist yet
+    update         – account exists, but flags or group memberships differ
+    skip           – account already matches the line
+
+apply_plan() then performs only that delta (see scripts.users_batch for the
+batched primitives), so re-running a list on a machine where most users already
+exist costs little more than the enumeration.
+
+chg_pwd is applied only when an account is created: forcing it again on an
+existing account would make the user change a password they already changed.
+Group membership is additive – users are never removed from groups.
+
+With a ProvisioningJournal (scripts.users_journal) every finished step is
+checkpointed, and lines completed by an interrupted earlier run are left out
+of the next plan entirely. For a half-finished line whose account exists, the
+flags and groups steps recorded as done are not planned again, so the group
+members are only enumerated for groups some line still has to be added to.
+"""
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import win32net
+import win32netcon
+
+from scripts.users_batch import (
+    DEFAULT_WORKERS, BatchResult, UserSpec, add_group_members, create_user_account,
+    enumerate_local_users, get_group_members, parse_list_file, print_summary,
+    run_parallel, set_user_flags,
+)
+from scripts.principals import group_name
+from scripts.users_journal import STEP_CREATE, STEP_DONE, STEP_FLAGS, STEP_GROUPS, ProvisioningJournal
+
+ACTION_CREATE = "create"
+ACTION_UPDATE = "update"
+ACTION_SKIP = "skip"
+
+# Flags reconciled on existing accounts
+MANAGED_FLAGS = win32netcon.UF_DONT_EXPIRE_PASSWD
+
+
+class UserPlan:
+    """Planned action for one user line."""
+
+    def __init__(self, spec: UserSpec, action: str):
+        self.spec = spec
+        self.action = action
+        self.current_flags: Optional[int] = None
+        self.target_flags: Optional[int] = None     # set only when flags must change
+        self.groups_to_add: List[str] = []          # resolved local group names
+
+    def describe(self) -> str:
+        parts = []
+        if self.action == ACTION_CREATE:
+            parts.append("create")
+        if self.target_flags is not None:
+            never_expire = bool(self.target_flags & win32netcon.UF_DONT_EXPIRE_PASSWD)
+            parts.append(f"password never expires -> {'yes' if never_expire else 'no'}")
+        if self.groups_to_add:
+            parts.append("add to " + ", ".join(self.groups_to_add))
+        return f"{self.spec.username}: " + "; ".join(parts or ["up to date"])
+
+
+class ProvisioningPlan:
+    def __init__(self, source_name: str):
+        self.source_name = source_name
+        self.items: List[UserPlan] = []
+        self.invalid: List[Tuple[int, str]] = []
+        self.duplicates: List[UserSpec] = []
+        self.resumed: List[UserSpec] = []              # completed by an earlier, interrupted run
+        self.resumed_steps = 0                         # steps of half-finished lines taken from the journal
+        self.group_members: Dict[str, Set[str]] = {}   # group -> current lower-case members
+        self.elapsed: float = 0.0
+
+    def by_action(self, action: str) -> List[UserPlan]:
+        return [item for item in self.items if item.action == action]
+
+    def is_empty(self) -> bool:
+        return not any(item.action != ACTION_SKIP for item in self.items)
+
+
+def build_plan(specs: List[UserSpec], source_name: str = "",
+               journal: Optional[ProvisioningJournal] = None) -> ProvisioningPlan:
+    """Compare user lines with the local SAM; nothing is changed."""
+    started = time.perf_counter()
+    plan = ProvisioningPlan(source_name)
+
+    if journal is not None:
+        pending = []
+        for spec in specs:
+            (plan.resumed if journal.is_done(spec.line) else pending).append(spec)
+        specs = pending
+
+    existing = enumerate_local_users(level=3)
+
+    # Steps an interrupted run finished; trusted only while the account exists
+    completed: Dict[str, Set[str]] = {}
+    if journal is not None:
+        for spec in specs:
+            steps = journal.completed_steps(spec.line) & {STEP_FLAGS, STEP_GROUPS}
+            if steps and spec.key in existing:
+                completed[spec.key] = steps
+
+    # Resolve and enumerate each involved group once
+    group_names: Dict[str, str] = {}
+    for spec in specs:
+        if STEP_GROUPS in completed.get(spec.key, ()):
+            continue
+        for sid in spec.groups():
+            if sid not in group_names:
+                group = group_name(sid)
+                group_names[sid] = group
+                plan.group_members[group] = get_group_members(group)
+
+    seen: Set[str] = set()
+    for spec in specs:
+        if spec.key in seen:
+            plan.duplicates.append(spec)
+            continue
+        seen.add(spec.key)
+
+        info = existing.get(spec.key)
+        if info is None:
+            item = UserPlan(spec, ACTION_CREATE)
+            item.groups_to_add = [group_names[sid] for sid in spec.groups()]
+            plan.items.append(item)
+            continue
+
+        steps = completed.get(spec.key, set())
+        plan.resumed_steps += len(steps)
+
+        item = UserPlan(spec, ACTION_SKIP)
+        item.current_flags = info["flags"]
+        wanted = (info["flags"] & ~MANAGED_FLAGS) | (spec.flags() & MANAGED_FLAGS)
+        if wanted != info["flags"] and STEP_FLAGS not in steps:
+            item.target_flags = wanted
+
+        if STEP_GROUPS not in steps:
+            for sid in spec.groups():
+                group = group_names[sid]
+                if spec.key not in plan.group_members[group]:
+                    item.groups_to_add.append(group)
+
+        if item.target_flags is not None or item.groups_to_add:
+            item.action = ACTION_UPDATE
+        plan.items.append(item)
+
+    plan.elapsed = time.perf_counter() - started
+    return plan
+
+
+def print_plan(plan: ProvisioningPlan) -> None:
+    creates = plan.by_action(ACTION_CREATE)
+    updates = plan.by_action(ACTION_UPDATE)
+    skips = plan.by_action(ACTION_SKIP)
+
+    for line_no, line in plan.invalid:
+        print(f"[!] Invalid line format in {plan.source_name}:{line_no}: {line}")
+    for spec in plan.duplicates:
+        print(f"[!] Duplicate user {spec.username} in {plan.source_name}:{spec.line_no}, ignored")
+    for item in creates + updates:
+        print(f"[{'+' if item.action == ACTION_CREATE else '~'}] {item.describe()}")
+
+    if plan.resumed:
+        print(f"[=] {len(plan.resumed)} line(s) completed by a previous run, skipped")
+    if plan.resumed_steps:
+        print(f"[=] {plan.resumed_steps} step(s) of unfinished lines completed by a previous run, skipped")
+    print(f"[*] Plan for {plan.source_name}: create {len(creates)}, update {len(updates)}, "
+          f"unchanged {len(skips)} (computed in {plan.elapsed:.1f}s)")
+
+
+def apply_plan(plan: ProvisioningPlan, max_workers: int = DEFAULT_WORKERS,
+               journal: Optional[ProvisioningJournal] = None) -> BatchResult:
+    """
+    Perform only the planned changes. With a journal, the outcome of every
+    step is checkpointed per line, and a line is marked done as soon as its
+    last step succeeded.
+    """
+    started = time.perf_counter()
+    result = BatchResult()
+    result.invalid = plan.invalid
+    result.resumed = len(plan.resumed)
+    result.existing = [item.spec for item in plan.by_action(ACTION_SKIP)]
+
+    def _checkpoint(spec: UserSpec, step: str, ok: bool = True) -> None:
+        if journal is not None:
+            journal.record(spec.line, step, ok)
+
+    creates = plan.by_action(ACTION_CREATE)
+    updates = plan.by_action(ACTION_UPDATE)
+    failed: Set[str] = set()
+
+    # A line is marked done as soon as its last step succeeded, so an
+    # interrupted run leaves every finished line skippable on resume
+    for spec in result.existing:
+        _checkpoint(spec, STEP_DONE)
+
+    pending_groups = {item.spec.key: item for item in creates + updates if item.groups_to_add}
+
+    def _finish(spec: UserSpec) -> None:
+        if spec.key not in pending_groups:
+            _checkpoint(spec, STEP_DONE)
+
+    # Successful steps are checkpointed from the workers as soon as they finish
+    def _create(spec: UserSpec) -> None:
+        create_user_account(spec)
+        _checkpoint(spec, STEP_CREATE)
+        _finish(spec)
+
+    for spec, error in run_parallel(_create, [i.spec for i in creates], max_workers):
+        if error is not None:
+            _checkpoint(spec, STEP_CREATE, ok=False)
+            result.failed.append((spec, error))
+            failed.add(spec.key)
+
+    flag_items = {item.spec.key: item for item in updates if item.target_flags is not None}
+
+    def _set_flags(spec: UserSpec) -> None:
+        set_user_flags(spec.username, flag_items[spec.key].target_flags)  # type: ignore[arg-type]
+        _checkpoint(spec, STEP_FLAGS)
+        _finish(spec)
+
+    for spec, error in run_parallel(_set_flags, [i.spec for i in flag_items.values()], max_workers):
+        if error is not None:
+            _checkpoint(spec, STEP_FLAGS, ok=False)
+            result.failed.append((spec, error))
+            failed.add(spec.key)
+
+    # One NetLocalGroupAddMembers call per group for all users of this run.
+    # Members are re-read: Windows puts new accounts into Users on creation.
+    by_group: Dict[str, List[str]] = {}
+    remaining: Dict[str, Set[str]] = {}
+    for key, item in pending_groups.items():
+        if key in failed:
+            continue
+        remaining[key] = set(item.groups_to_add)
+        for group in item.groups_to_add:
+            by_group.setdefault(group, []).append(item.spec.username)
+
+    group_failed: Set[str] = set()
+    for group, usernames in by_group.items():
+        try:
+            added, errors = add_group_members(group, usernames)
+        except win32net.error as e:
+            result.group_errors.append(f"{group}: {e}")
+            errors = {u: str(e) for u in usernames}
+        else:
+            result.group_added[group] = added
+            result.group_errors.extend(errors.values())
+
+        # Checkpoint the lines whose last group this was
+        failed_now = {u.lower() for u in errors}
+        for username in usernames:
+            key = username.lower()
+            spec = pending_groups[key].spec
+            if key in failed_now:
+                if key not in group_failed:
+                    group_failed.add(key)
+                    _checkpoint(spec, STEP_GROUPS, ok=False)
+                continue
+            remaining[key].discard(group)
+            if not remaining[key] and key not in group_failed:
+                _checkpoint(spec, STEP_GROUPS)
+                _checkpoint(spec, STEP_DONE)
+
+    result.created = [i.spec for i in creates if i.spec.key not in failed]
+    result.updated = [i.spec for i in updates if i.spec.key not in failed]
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def plan_list_file(path: Path, journal: Optional[ProvisioningJournal] = None) -> ProvisioningPlan:
+    specs, invalid = parse_list_file(path)
+    plan = build_plan(specs, path.name, journal)
+    plan.invalid = invalid
+    return plan
+
+
+def provision_list_file(path: Path, dry_run: bool = False, max_workers: int = DEFAULT_WORKERS,
+                        resume: bool = True) -> Optional[BatchResult]:
+    """
+    Plan a list file against the local SAM and, unless dry_run, apply the delta.
+
+    Progress is checkpointed in <list>.journal; with resume=False previous
+    checkpoints are discarded first. The journal is removed once every line
+    went through without errors.
+    """
+    print(f"[*] Processing {path.name} ...")
+    journal = ProvisioningJournal.for_list_file(path)
+    if not resume:
+        journal.remove()
+
+    plan = plan_list_file(path, journal)
+    print_plan(plan)
+
+    if dry_run:
+        return None
+    if plan.is_empty():
+        print("[=] Nothing to do.")
+        journal.remove()
+        return None
+
+    with journal:
+        result = apply_plan(plan, max_workers, journal)
+    if not result.failed and not result.group_errors:
+        journal.remove()
+
+    print_summary(result, path.name)
+    return result
@@ -1,12 +1,14 @@
 from core.navigation import FolderNode
 from .save import SavePolicies
 from .load import LoadPolicies
+from .compose import ComposePolicies
 
 
 class GroupPolicies(FolderNode):
     CHILDREN = [
         SavePolicies(),
         LoadPolicies(),
+        ComposePolicies(),
     ]
 
     def get_name(self):
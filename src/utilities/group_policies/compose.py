@@ -0,0 +1,68 @@
+from typing import List
+
+from prompt_toolkit import choice
+from tabulate import tabulate
+
+from core.navigation import NavigationNode
+from scripts.lgpo_manager import LgpoError, list_profiles
+from .save import _sanitize_name
+
+
+class ComposePolicies(NavigationNode):
+    """Merge a base profile and overlays into one profile that is applied in a single pass."""
+
+    def get_name(self) -> str:
+        return 'Compose'
+
+    def _pick_layers(self, profiles: List[str]) -> List[str]:
+        layers: List[str] = []
+        while True:
+            remaining = [p for p in profiles if p not in layers]
+            if layers:
+                print("Layers (base first): " + " -> ".join(layers))
+            options = [(None, "[Done]" if len(layers) >= 2 else "[Cancel]")] + [(p, p) for p in remaining]
+            picked = choice(
+                message="Base profile:" if not layers else "Add overlay:",
+                options=options,
+                default=None,
+            )
+            if picked is None:
+                return layers if len(layers) >= 2 else []
+            layers.append(picked)
+            if not remaining[1:]:
+                return layers
+
+    def process(self):
+        from scripts.policy_compose import compose_profiles
+
+        profiles = list_profiles()
+        if len(profiles) < 2:
+            print("At least two saved profiles are needed.")
+            return self.wait_back()
+
+        layers = self._pick_layers(profiles)
+        if not layers:
+            self.move_back()
+            return
+
+        name = _sanitize_name(input("Name for the composed profile: "))
+        if not name:
+            print("Error: empty profile name.")
+            return self.wait_back()
+
+        try:
+            result = compose_profiles(layers, name)
+        except LgpoError as e:
+            print(f"Error: {e}")
+            return self.wait_back()
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+            return self.wait_back()
+
+        if result.conflicts:
+            print(tabulate([c.row() for c in result.conflicts],
+                           headers=["Scope", "Setting", "Change", "Earlier layer", "Winner"]))
+        print(f"Profile '{name}' saved: {result.summary()}")
+        print("Apply it from Load to set everything in one pass.")
+
+        self.wait_back()
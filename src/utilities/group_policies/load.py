@@ -3,15 +3,28 @@ from typing import List
 
 from core.navigation import FolderNode, NavigationNode
 from core.utils import get_folder_path
+from prompt_toolkit import choice
 from prompt_toolkit.shortcuts import ProgressBar
-from scripts.lgpo_manager import list_profiles, apply_profile, LgpoError
+from scripts.lgpo_manager import (
+    apply_profile, apply_policy_parts, profile_policy_files, resolve_profile_dir, LgpoError,
+)
 import subprocess
+import time
+
+from tabulate import tabulate
 
 
 def _get_storage_dir() -> str:
     return str(get_folder_path('Policies'))
 
 
+def _areas(top_keys: List[str], limit: int = 3) -> str:
+    # "Software\Policies\Microsoft\Windows" -> "Microsoft\Windows"
+    short = [k.split("\\", 2)[-1] if k.lower().startswith("software\\policies\\") else k for k in top_keys]
+    more = f" +{len(short) - limit}" if len(short) > limit else ""
+    return ", ".join(short[:limit]) + more
+
+
 class PolicyFileNode(NavigationNode):
     def __init__(self, profile_name: str):
         super().__init__()
@@ -22,16 +35,26 @@ class PolicyFileNode(NavigationNode):
         return self._profile_name
 
     def process(self):
-        print(f"Applying profile: {self._profile_name}")
+        action = choice(
+            message='',
+            options=[
+                ("direct", "Apply changed settings"),
+                ("preview", "Show what would change"),
+                ("lgpo", "Full apply with LGPO /g"),
+                (None, "Back"),
+            ],
+            default=None,
+        )
+
+        if action is None:
+            self.move_back()
+            return
+
         try:
-            # Single-step progress bar while LGPO applies the profile
-            with ProgressBar(title="Applying LGPO profile") as pb:
-                for _ in pb(range(1), label="Running LGPO /g ..."):
-                    apply_profile(self._profile_name)
-            print("Profile applied successfully.")
-            print("Running 'gpupdate /force' ...")
-            subprocess.run(["gpupdate", "/force"], check=False)
-            print("Group Policy updated.")
+            if action == "lgpo":
+                self._apply_with_lgpo()
+            else:
+                self._apply_direct(dry_run=action == "preview")
         except LgpoError as e:
             print(f"LGPO error: {e}")
         except Exception as e:
@@ -39,6 +62,32 @@ class PolicyFileNode(NavigationNode):
 
         self.wait_back()
 
+    def _apply_direct(self, dry_run: bool):
+        from scripts.policy_apply import apply_policy_files
+
+        pol_files, has_other_parts = profile_policy_files(self._profile_name)
+        result = apply_policy_files(pol_files, dry_run=dry_run)
+        result.print()
+        if dry_run:
+            return
+
+        if result.refreshed:
+            print(f"Policy refresh requested for: {', '.join(result.refreshed)}")
+        if has_other_parts:
+            print("Applying security template / audit policy with LGPO ...")
+            apply_policy_parts(resolve_profile_dir(self._profile_name))
+
+    def _apply_with_lgpo(self):
+        print(f"Applying profile: {self._profile_name}")
+        # Single-step progress bar while LGPO applies the profile
+        with ProgressBar(title="Applying LGPO profile") as pb:
+            for _ in pb(range(1), label="Running LGPO /g ..."):
+                apply_profile(self._profile_name)
+        print("Profile applied successfully.")
+        print("Running 'gpupdate /force' ...")
+        subprocess.run(["gpupdate", "/force"], check=False)
+        print("Group Policy updated.")
+
 
 class LoadPolicies(FolderNode):
     def __init__(self):
@@ -47,9 +96,22 @@ class LoadPolicies(FolderNode):
         self.CHILDREN = []
 
     def process(self):
-        # Rebuild list every time user opens Load
-        files = list_profiles()
-        self.CHILDREN = [PolicyFileNode(profile_name=f) for f in files]
+        # Rebuild list every time user opens Load; the catalog only re-parses changed profiles
+        from scripts.policy_catalog import refresh_catalog
+
+        entries, parsed = refresh_catalog()
+        if entries:
+            rows = [
+                [e.name, time.strftime("%Y-%m-%d %H:%M", time.localtime(e.created)),
+                 e.machine_settings, e.user_settings,
+                 ", ".join(p for p, on in (("security", e.has_security), ("audit", e.has_audit)) if on),
+                 e.content_hash[:8], e.error or _areas(e.top_keys)]
+                for e in entries
+            ]
+            print(tabulate(rows, headers=["Profile", "Created", "Machine", "User", "Also", "Hash", "Areas"]))
+            print(f"{len(entries)} profile(s), {parsed} re-indexed.")
+
+        self.CHILDREN = [PolicyFileNode(profile_name=e.name) for e in entries]
 
         super().process()
 
@@ -35,7 +35,7 @@ class SavePolicies(NavigationNode):
             print("Error: empty profile name.")
             return self.wait_back()
 
-        # We store profiles as directories under Policies/<name>
+        # Profiles live in the Policies store (older ones as directories under Policies/<name>)
         target_dir = os.path.join(storage, name)
         if profile_exists(name) or os.path.isdir(target_dir):
             print(f"Error: profile directory '{name}' already exists in '{storage}'. Choose another name.")
@@ -45,8 +45,8 @@ class SavePolicies(NavigationNode):
         try:
             with ProgressBar(title="Exporting LGPO profile") as pb:
                 for _ in pb(range(1), label="Running LGPO /b ..."):
-                    export_profile(name, overwrite=False)
-            print(f"Profile exported to: {target_dir}")
+                    stats = export_profile(name, overwrite=False)
+            print(f"Profile '{name}' saved: {stats.summary()}")
         except LgpoError as e:
             print(f"LGPO error: {e}")
         except Exception as e:
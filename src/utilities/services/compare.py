@@ -0,0 +1,88 @@
+from typing import Optional
+
+from prompt_toolkit import choice, prompt
+from tabulate import tabulate
+
+from core.navigation import NavigationNode
+from scripts.services_compare import DRIFTED, EXTRA, KINDS, MISSING, compare_profiles, live_rows
+from scripts.services_history import ProfileSource
+from scripts.services_restore import START_MODE_MAP
+
+
+class ServiceCompareView(NavigationNode):
+    """Drift between a saved profile and this machine, or between two saved profiles."""
+
+    def __init__(self, left: ProfileSource, right: Optional[ProfileSource] = None):
+        super().__init__()
+        self._left = left
+        self._right = right
+        self._comparison = None
+        self._kinds = KINDS
+        self._text = ""
+        self._start_mode: Optional[str] = None
+
+    def get_name(self) -> str:
+        return "Compare"
+
+    def _compare(self):
+        if self._right is None:
+            from scripts.services_snapshot import snapshot_services
+            right, right_title = live_rows(snapshot_services()), "this machine"
+        else:
+            right, right_title = self._right.rows(), self._right.title
+        return compare_profiles(self._left.rows(), right, self._left.title, right_title)
+
+    def process(self):
+        if self._comparison is None:
+            self._comparison = self._compare()
+        c = self._comparison
+
+        print(f"{c.left_title} vs {c.right_title}: {c.same} same, {c.count(DRIFTED)} drifted, "
+              f"{c.count(MISSING)} only in {c.left_title}, {c.count(EXTRA)} only in {c.right_title}")
+
+        diffs = c.filter(self._kinds, self._text, self._start_mode)
+        if diffs:
+            rows = [[d.kind, d.name, d.display_name, d.left or "-", d.right or "-"] for d in diffs]
+            print(tabulate(rows, headers=["", "Service", "Display name", c.left_title, c.right_title]))
+        else:
+            print("No differences match the filter.")
+
+        filters = []
+        if self._kinds != KINDS:
+            filters.append("/".join(self._kinds))
+        if self._text:
+            filters.append(f"'{self._text}'")
+        if self._start_mode:
+            filters.append(self._start_mode)
+        if filters:
+            print("Filter: " + ", ".join(filters))
+
+        action = choice(
+            message='',
+            options=[
+                (None, "[...]"),
+                ("kind", "Show only drifted / missing / extra"),
+                ("text", "Filter by name"),
+                ("mode", "Filter by start mode"),
+                ("clear", "Clear filters"),
+                ("refresh", "Compare again"),
+            ],
+            default=None,
+        )
+
+        if action == "kind":
+            kind = choice(message="Show:", options=[(KINDS, "All")] + [((k,), k.capitalize()) for k in KINDS])
+            self._kinds = kind
+        elif action == "text":
+            self._text = prompt("Name contains: ").strip()
+        elif action == "mode":
+            self._start_mode = choice(
+                message="Start mode on either side:",
+                options=[(None, "Any")] + [(mode, mode) for mode in START_MODE_MAP],
+            )
+        elif action == "clear":
+            self._kinds, self._text, self._start_mode = KINDS, "", None
+        elif action == "refresh":
+            self._comparison = None
+        else:
+            self.move_back()
@@ -1,10 +1,13 @@
 import os
-from pathlib import Path
 from typing import List
 
+from prompt_toolkit import choice
+
 from core.navigation import NavigationNode, FolderNode
 from core.utils import get_folder_path
-from scripts.services_restore import load_services_from_csv, apply_service_config
+from scripts.services_history import ProfileSource, ServiceHistory, history_path, list_histories
+from scripts.services_restore import restore_profile, start_restored
+from utilities.services.compare import ServiceCompareView
 
 
 def _get_storage_dir() -> str:
@@ -18,26 +21,114 @@ def _list_profiles() -> List[str]:
     return sorted([f for f in os.listdir(storage) if f.lower().endswith('.csv')])
 
 
+def _all_sources() -> List[ProfileSource]:
+    storage = _get_storage_dir()
+    sources = [ProfileSource.csv(os.path.join(storage, fname)) for fname in _list_profiles()]
+    for name in list_histories():
+        history = ServiceHistory(history_path(name))
+        sources += [ProfileSource.history(history, v.number) for v in reversed(history.versions())]
+    return sources
+
+
+class RestoreProfile(NavigationNode):
+    def __init__(self, source: ProfileSource):
+        super().__init__()
+        self._source = source
+
+    def get_name(self) -> str:
+        return 'Restore'
+
+    def process(self):
+        summary = restore_profile(self._source.rows())
+        summary.print()
+
+        if any(c.wanted == "Auto" for c in summary.changed):
+            action = choice(
+                message="Start the services that were switched to Auto?",
+                options=[("no", "No"), ("yes", "Yes")],
+                default="no",
+            )
+            if action == "yes":
+                start_restored(summary).print()
+
+        return self.wait_back()
+
+
 class SavedProfileView(NavigationNode):
-    def __init__(self, profile_path: str):
+    def __init__(self, source: ProfileSource):
         super().__init__()
-        self._path = profile_path
+        self._source = source
 
     def get_name(self) -> str:
-        return os.path.splitext(os.path.basename(self._path))[0]
+        return self._source.title
 
     def process(self):
-        if not os.path.exists(self._path):
+        if not self._source.exists():
             print("Profile file not found.")
             return self.wait_back()
 
-        services = load_services_from_csv(Path(self._path))
-        for service in services:
-            service_name = service["ServiceName"]
-            start_mode = service["StartMode"]
-            apply_service_config(service_name, start_mode)
+        action = choice(
+            message='',
+            options=[
+                ("restore", "Restore"),
+                ("live", "Compare with this machine"),
+                ("profile", "Compare with another profile"),
+                (None, "Back"),
+            ],
+            default=None,
+        )
+
+        if action == "restore":
+            self._move_next(RestoreProfile(self._source))
+            return
+
+        if action == "live":
+            self._move_next(ServiceCompareView(self._source))
+            return
+
+        if action == "profile":
+            others = [s for s in _all_sources() if s != self._source]
+            if not others:
+                print("No other saved profiles.")
+                return self.wait_back()
+            other = choice(
+                message="Compare with:",
+                options=[(None, "[...]")] + [(s, s.title) for s in others],
+                default=None,
+            )
+            if other is not None:
+                self._move_next(ServiceCompareView(self._source, other))
+            return
+
+        self.move_back()
+
+
+class HistoryView(NavigationNode):
+    """Versions saved in one services history, newest first."""
+
+    def __init__(self, name: str):
+        super().__init__()
+        self._name = name
 
-        return self.wait_back()
+    def get_name(self) -> str:
+        return f"{self._name} (history)"
+
+    def process(self):
+        history = ServiceHistory(history_path(self._name))
+        if not history.latest:
+            print("History is empty.")
+            return self.wait_back()
+
+        version = choice(
+            message='',
+            options=[(None, "[...]")] + [(v.number, v.label) for v in reversed(history.versions())],
+            default=None,
+        )
+        if version is None:
+            self.move_back()
+            return
+
+        self._move_next(SavedProfileView(ProfileSource.history(history, version)))
 
 
 class LoadServices(FolderNode):
@@ -51,7 +142,7 @@ class LoadServices(FolderNode):
         storage = _get_storage_dir()
         files = _list_profiles()
         self.CHILDREN = [
-            SavedProfileView(os.path.join(storage, fname)) for fname in files
-        ]
+            SavedProfileView(ProfileSource.csv(os.path.join(storage, fname))) for fname in files
+        ] + [HistoryView(name) for name in list_histories()]
 
         super().process()
@@ -3,9 +3,12 @@ import os
 import re
 from pathlib import Path
 
+from prompt_toolkit import choice
+
 from core.navigation import NavigationNode
 from core.utils import get_folder_path
-from scripts.services_export import get_services_startup
+from scripts.services_history import ServiceHistory, history_path, list_histories
+from scripts.services_snapshot import snapshot_services
 
 
 def _get_storage_dir() -> str:
@@ -26,11 +29,26 @@ class SaveServices(NavigationNode):
 
     def process(self):
         try:
-            services = get_services_startup()
+            services = snapshot_services().startup_rows()
         except Exception as e:
             print(f"Error reading services: {e}")
             return self.wait_back()
 
+        target = choice(
+            message="Save as:",
+            options=[
+                ("csv", "New profile (CSV)"),
+                ("history", "New version in a history"),
+                (None, "Cancel"),
+            ],
+            default="csv",
+        )
+        if target is None:
+            self.move_back()
+            return None
+        if target == "history":
+            return self._save_version(services)
+
         storage = _get_storage_dir()
         print("Enter a name to save the services profile.")
         print("Note: invalid characters will be replaced with '_' ; empty name is not allowed.")
@@ -56,3 +74,21 @@ class SaveServices(NavigationNode):
 
         self.wait_back()
         return None
+
+    def _save_version(self, services):
+        histories = list_histories()
+        if histories:
+            print("Existing histories: " + ", ".join(histories))
+        print("Enter a history name; a new one is created if it doesn't exist.")
+        name = _sanitize_name(input("History name: "))
+        if not name:
+            print("Error: empty history name.")
+            return self.wait_back()
+
+        history = ServiceHistory(history_path(name))
+        version = history.append(services)
+        if version is None:
+            print(f"No changes since {name} v{history.latest}; nothing saved.")
+        else:
+            print(f"Saved {name} v{version}.")
+        return self.wait_back()
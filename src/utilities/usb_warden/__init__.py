@@ -1,12 +1,16 @@
 from core.navigation import FolderNode
+from utilities.usb_warden.history import UsbHistory
 from utilities.usb_warden.manage_restrictions import ManageRestrictions
 from utilities.usb_warden.plugged import ShowPluggedUSB
+from utilities.usb_warden.usb_restrictions_profile import UsbRestrictions
 
 
 class USBWarden(FolderNode):
     CHILDREN = [
         ShowPluggedUSB(),
-        ManageRestrictions()
+        ManageRestrictions(),
+        UsbRestrictions(),
+        UsbHistory(),
     ]
 
     def get_name(self):
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from core.navigation import NavigationNode
+from scripts.usb.history import collect_usb_history
+
+
+def _format_time(value) -> str:
+    return value.strftime("%Y-%m-%d %H:%M") if value else "-"
+
+
+class UsbHistory(NavigationNode):
+    def get_name(self) -> str:
+        return "Connection history"
+
+    def process(self):
+        from tabulate import tabulate
+
+        print()
+        print("Reading USBSTOR registry and setupapi logs ...")
+
+        try:
+            history = collect_usb_history()
+        except Exception as e:
+            print(f"Error while collecting USB history: {e}")
+            return self.wait_back()
+
+        entries = sorted(
+            history.values(),
+            key=lambda e: e.last_seen or datetime.min,
+            reverse=True,
+        )
+
+        if not entries:
+            print("No USB storage devices found.")
+            return self.wait_back()
+
+        rows = [
+            [
+                e.friendly_name or e.device_id,
+                e.serial,
+                _format_time(e.first_seen),
+                _format_time(e.last_seen),
+                len(e.install_times),
+            ]
+            for e in entries
+        ]
+        print(f"Devices: {len(entries)}")
+        print(tabulate(rows, headers=["Device", "Serial", "First seen", "Last seen", "Installs"]))
+
+        self.wait_back()
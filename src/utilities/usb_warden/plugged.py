@@ -1,41 +1,154 @@
-from prompt_toolkit import choice, HTML
+from typing import Optional, Set
+
+from prompt_toolkit import HTML
+from prompt_toolkit.formatted_text.html import html_escape as escape
+from prompt_toolkit.shortcuts.choice_input import ChoiceInput
 
 from core.navigation import NavigationNode
-from scripts.usb.plugged import list_usb_storage_devices, UsbStorageDevice
+from scripts.usb.device_events import WmiDeviceEventSource
+from scripts.usb.device_rules import CompiledRules, Verdict, compile_restrictions
+from scripts.usb.fs_probe import ProbeState, format_throughput
+from scripts.usb.live import LiveUsbDevices
+from scripts.usb.plugged import UsbStorageDevice, UsbVolume
+from scripts.usb.restrictions_profile import read_live_restrictions
+
+# Returned by the prompt when a device event asks for a redraw
+_REFRESH = object()
+
+
+def get_volume_health(volume: UsbVolume) -> str:
+    if volume.probe is None:
+        return ''
+    if volume.probe.state is ProbeState.HEALTHY:
+        return format_throughput(volume.probe)
+
+    return f'<ansired>{volume.probe.state.value}</ansired>'
 
 
 def get_drive_letters(device: UsbStorageDevice) -> str:
     if not device.volumes:
         return 'unmounted'
 
-    return ' '.join([f'{v.drive_letter}[{v.label}] ' for v in device.volumes])
+    entries = []
+    for v in device.volumes:
+        health = get_volume_health(v)
+        entries.append(f'{v.drive_letter}[{v.label}] {health}'.rstrip())
+
+    return ' '.join(entries)
+
+def get_policy_verdict(device: UsbStorageDevice, rules: CompiledRules) -> str:
+    match = rules.evaluate_device(device.rule_ids)
+    color = 'ansigreen' if match.verdict is Verdict.ALLOWED else 'ansired'
+    return f'<{color}>{match.verdict.value}</{color}> ({escape(match.describe())})'
 
-def get_device_entry(device:UsbStorageDevice):
+
+def get_device_entry(device:UsbStorageDevice, rules: Optional[CompiledRules] = None):
     entry = f'({get_drive_letters(device)}) {device.drive_model or device.name}'
 
     if not device.is_installed:
         entry = f'<ansibrightyellow>{entry}</ansibrightyellow> '
 
+    if rules is not None:
+        entry = f'{entry} - {get_policy_verdict(device, rules)}'
+
     return entry
 
+class _LiveChoiceInput(ChoiceInput):
+    """ChoiceInput that keeps its Application so another thread can close it."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.application = None
+
+    def _create_application(self):
+        self.application = super()._create_application()
+        return self.application
+
+
 class ShowPluggedUSB(NavigationNode):
     def __init__(self):
         super().__init__()
-        self._drown_drives_count = None
+        self._live: Optional[LiveUsbDevices] = None
+        self._input: Optional[_LiveChoiceInput] = None
+        self._last_selected: Optional[str] = None
+        self._rules: Optional[CompiledRules] = None
+        self._source: Optional[WmiDeviceEventSource] = None
 
     def get_name(self) -> str:
         return "Show plugged"
 
+    def start(self, move_next, move_back):
+        super().start(move_next, move_back)
+
+        # Verdicts show how the current whitelist policy treats each device
+        self._rules = compile_restrictions(*read_live_restrictions())
+
+        self._source = WmiDeviceEventSource()
+        self._live = LiveUsbDevices(
+            self._source,
+            on_change=self._on_devices_changed,
+            check_fs_health=True,
+        )
+        self._live.start()
+
+    def stop(self):
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+        self._source = None
+        super().stop()
+
+    def _on_devices_changed(self, _changed: Set[str]):
+        # Called from the event thread: close the running prompt so that
+        # process() redraws the list from the updated map.
+        current = self._input
+        app = current.application if current is not None else None
+        if app is None or not app.is_running or app.loop is None:
+            return
+
+        def _refresh():
+            if app.future is not None and not app.future.done():
+                app.exit(result=_REFRESH)
+
+        app.loop.call_soon_threadsafe(_refresh)
+
+    def _event_status(self) -> str:
+        """Warning line when device events failed; restarts a listener that ended."""
+        source = self._source
+        if source is None or source.error is None:
+            return ''
+
+        message = f'<ansired>Device events: {escape(str(source.error))}</ansired>'
+        if not source.running:
+            # Re-enumerate too: changes made while the listener was down were missed
+            self._live.stop()
+            self._live.start()
+            message += ' (restarted)'
+        return message
+
     def process(self):
-        device_list = list_usb_storage_devices(check_fs_health=True)
+        assert self._live is not None
+
+        status = self._event_status()
         choices = [
-                      (device, HTML(get_device_entry(device))) for device in device_list
+                      (device.normalized_pnp_id, HTML(get_device_entry(device, self._rules)))
+                      for device in self._live.devices()
                   ] + [(None, '[...]')]
-        mode = choice(
-            message='',
+        self._input = _LiveChoiceInput(
+            message=HTML(status) if status else '',
             options=choices,
+            default=self._last_selected,
         )
+        try:
+            mode = self._input.prompt()
+        finally:
+            self._input = None
+
+        if mode is _REFRESH:
+            return
+
+        self._last_selected = mode
 
         if mode is None:
             self.move_back()
-            return
\ No newline at end of file
+            return
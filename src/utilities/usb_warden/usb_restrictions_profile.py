@@ -6,7 +6,10 @@ from typing import Optional
 
 from core.navigation import FolderNode, NavigationNode
 from core.utils import get_folder_path
-from prompt_toolkit import choice
+from prompt_toolkit import choice, prompt
+from scripts.usb.restrictions_profile import (
+    PAYLOAD_VERSION, apply_restrictions, capture_restrictions, plan_restrictions
+)
 
 
 class SaveUsbRestrictions(NavigationNode):
@@ -32,17 +35,18 @@ class SaveUsbRestrictions(NavigationNode):
             return self.wait_back()
 
         try:
+            payload = capture_restrictions()
             data = {
                 "kind": "usb_restrictions",
-                "version": 1,
+                "version": PAYLOAD_VERSION,
                 "name": name,
-                "payload": {
-                    # TODO: fill with actual policy/registry parameters
-                }
+                "payload": payload,
             }
             with open(target_path, "w", encoding="utf-8") as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
             print(f"Saved: {target_path}")
+            print(f"Values: {len(payload['values'])}, lists: "
+                  + (", ".join(f"{k} ({len(v)})" for k, v in payload["lists"].items()) or "none"))
         except Exception as e:
             print(f"Failed to save file: {e}")
 
@@ -81,10 +85,33 @@ class LoadUsbRestrictions(NavigationNode):
         try:
             with open(path, "r", encoding="utf-8") as f:
                 data = json.load(f)
-
-            # TODO: apply actual settings from data["payload"]
             print(f"Loaded file: {path}")
-            print("Applying settings is not implemented yet.")
+
+            if data.get("kind") != "usb_restrictions" or data.get("version", 1) < PAYLOAD_VERSION:
+                # Version 1 files were written with an empty payload; applying
+                # one would wipe the live policy key.
+                print("Error: file does not contain captured USB restrictions settings.")
+                return self.wait_back()
+
+            payload = data.get("payload", {})
+            plan = plan_restrictions(payload)
+            if plan.is_empty():
+                print("Live settings already match this file. Nothing to apply.")
+                return self.wait_back()
+
+            print(f"Changes to apply ({plan.change_count}):")
+            for line in plan.summary_lines():
+                print("  " + line)
+
+            answer = prompt("Apply these changes? (y/n): ").strip().lower()
+            if answer != "y":
+                print("Cancelled.")
+                return self.wait_back()
+
+            diff = apply_restrictions(payload)
+            print(f"Applied {diff.change_count} change(s).")
+        except PermissionError:
+            print("Permission denied. Run this program as Administrator.")
         except Exception as e:
             print(f"Error while loading file: {e}")
 
@@ -1,5 +1,7 @@
 from core.navigation import FolderNode
 from utilities.users.create_user_list import CreateUserList
+from utilities.users.delete_users import DeleteUsers
+from utilities.users.orphaned_profiles import OrphanedProfiles
 from utilities.users.show_users import ShowUsers
 from utilities.users.profile import Profile
 
@@ -10,6 +12,8 @@ class Users(FolderNode):
         Profile(),
         ShowUsers(),
         CreateUserList(),
+        DeleteUsers(),
+        OrphanedProfiles(),
     ]
 
     def get_name(self):
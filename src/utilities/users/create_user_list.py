@@ -5,7 +5,9 @@ from prompt_toolkit import choice, prompt
 
 from core.navigation import NavigationNode
 from core.utils import get_folder_path
-from scripts.create_users_pywin32_only import process_list_file
+from scripts.users_batch import print_summary
+from scripts.users_journal import ProvisioningJournal
+from scripts.users_plan import apply_plan, plan_list_file, print_plan
 
 
 class CreateUserList(NavigationNode):
@@ -30,12 +32,35 @@ class CreateUserList(NavigationNode):
             self.move_back()
             return
 
+        journal = ProvisioningJournal.for_list_file(user_list)
+        if journal.record_count:
+            resume = choice(
+                message=f"A previous run of {user_list.name} did not finish "
+                        f"({journal.done_count} line(s) completed).",
+                options=[(True, "Resume"), (False, "Start over")],
+            )
+            if not resume:
+                journal.remove()
+
+        # Dry run first: show what differs from the local accounts
+        plan = plan_list_file(user_list, journal)
+        print_plan(plan)
+
+        if plan.is_empty():
+            print("All users from this file are already in place.")
+            journal.remove()
+            return self.wait_back()
+
         answer = prompt(
-            f"You are going to create a list of users from {user_list.name} file. Are you sure? (y/n):").strip().lower()
+            f"You are going to apply these changes from {user_list.name} file. Are you sure? (y/n):").strip().lower()
 
         if answer != "y":
             return
 
-        process_list_file(user_list)
+        with journal:
+            result = apply_plan(plan, journal=journal)
+        if not result.failed and not result.group_errors:
+            journal.remove()
+        print_summary(result, user_list.name)
 
         self.wait_back()
@@ -0,0 +1,62 @@
+from prompt_toolkit import prompt
+from prompt_toolkit.shortcuts import checkboxlist_dialog
+from tabulate import tabulate
+
+from core.navigation import NavigationNode
+from scripts.local_users import get_user_backend
+from utilities.users.user_info import is_builtin_or_protected, is_current_user
+
+
+class DeleteUsers(NavigationNode):
+    """Delete several local users and their profiles in one run."""
+
+    def get_name(self) -> str:
+        return "Delete users"
+
+    def process(self):
+        accounts = [
+            u for u in get_user_backend().list_users()
+            if not is_builtin_or_protected(u) and not is_current_user(u)
+        ]
+
+        if not accounts:
+            print("No local users that can be deleted.")
+            return self.wait_back()
+
+        selected = checkboxlist_dialog(
+            title="Delete users",
+            text="Select the accounts to delete together with their profiles:",
+            values=[(u.name, u.name + (" (disabled)" if u.disabled else "")) for u in accounts],
+        ).run()
+
+        if not selected:
+            self.move_back()
+            return
+
+        print("Selected: " + ", ".join(selected))
+        confirm = prompt(
+            f"YOU ARE ABOUT TO PERMANENTLY DELETE {len(selected)} local user(s) and their profiles. "
+            f"Type 'delete' to confirm or 'n' to cancel: "
+        ).strip()
+
+        if confirm.lower() != "delete":
+            print("Cancelled.")
+            return self.wait_back()
+
+        from scripts.delete_user_profiles import remove_users_and_profiles
+
+        try:
+            results = remove_users_and_profiles(selected)
+        except SystemExit:
+            # The underlying script calls sys.exit(1) when not run as Administrator
+            print("Administrator privileges are required to delete users and their profiles.")
+            return self.wait_back()
+
+        rows = [
+            [r.username, r.error or ("yes" if r.account_deleted else "no"),
+             "yes" if r.registry_deleted else "no", "yes" if r.profile_removed else "no", r.profile_path or ""]
+            for r in results
+        ]
+        print(tabulate(rows, headers=["User", "Account deleted", "ProfileList", "Folder removed", "Profile path"]))
+
+        self.wait_back()
@@ -0,0 +1,61 @@
+from prompt_toolkit import prompt
+from prompt_toolkit.shortcuts import checkboxlist_dialog
+from tabulate import tabulate
+
+from core.navigation import NavigationNode
+from scripts.fs_size import format_size
+
+
+def _size(orphan) -> str:
+    if orphan.size is None:
+        return "-"
+    return f"{format_size(orphan.size)} ({orphan.files} files)"
+
+
+class OrphanedProfiles(NavigationNode):
+    """Profiles left behind by deleted local accounts."""
+
+    def get_name(self) -> str:
+        return "Orphaned profiles"
+
+    def process(self):
+        from scripts.orphaned_profiles import find_orphaned_profiles, remove_orphaned_profiles
+
+        print("Scanning profiles ...")
+        scan = find_orphaned_profiles()
+        print(f"{scan.profile_count} ProfileList entries, {scan.account_count} local accounts, "
+              f"profiles directory {scan.profiles_dir} (scanned in {scan.elapsed:.1f}s)")
+
+        if not scan.orphans:
+            print("No orphaned profiles found.")
+            return self.wait_back()
+
+        rows = [[o.sid or "-", o.path or "-", o.reason, _size(o)] for o in scan.orphans]
+        print(tabulate(rows, headers=["ProfileList entry", "Folder", "Reason", "Size"]))
+
+        values = [(o, f"{o.sid or o.path} – {o.reason}, {_size(o)}") for o in scan.orphans]
+        selected = checkboxlist_dialog(
+            title="Orphaned profiles",
+            text="Select the profiles to delete:",
+            values=values,
+            # Deleting is opt-in: an unreferenced folder may still be wanted
+            default_values=[],
+        ).run()
+
+        if not selected:
+            self.move_back()
+            return
+
+        total = sum(o.size or 0 for o in selected)
+        confirm = prompt(
+            f"Delete {len(selected)} orphaned profile(s), {format_size(total)} in total? (y/n): "
+        ).strip().lower()
+        if confirm != "y":
+            print("Cancelled.")
+            return self.wait_back()
+
+        result = remove_orphaned_profiles(selected)
+        removed = sum(1 for ok in result.values() if ok)
+        print(f"Removed {removed} of {len(selected)} orphaned profile(s).")
+
+        self.wait_back()
@@ -8,6 +8,7 @@ from core.navigation import NavigationNode
 from core.utils import cls
 from scripts.set_default_profile import set_profiles_directory
 from scripts.show_profile_destination import print_profiles_directory
+from utilities.users.profile_usage import ProfileDiskUsage
 
 
 def get_name(d):
@@ -45,6 +46,64 @@ class SetProfile(NavigationNode):
         self.move_back()
 
 
+class MoveProfiles(NavigationNode):
+    """Move existing profiles to another drive (set_profiles_directory only affects new ones)."""
+
+    def get_name(self) -> str:
+        return "Move existing profiles"
+
+    def process(self):
+        from prompt_toolkit import prompt
+        from prompt_toolkit.shortcuts import checkboxlist_dialog
+        from scripts.profile_migration import list_movable_profiles, migrate_profile, target_path
+
+        options: list[tuple[Optional[str], str]] = [(None, '[...]')]
+        options += [
+            (d[0], get_name(d)) for d in get_drives()
+        ]
+
+        drive = choice(
+            message='Target drive:',
+            options=options,
+        )
+
+        if drive is None:
+            self.move_back()
+            return
+
+        drive = str(drive)[:2]
+        profiles = [p for p in list_movable_profiles()
+                    if not p.path.lower().startswith(drive.lower())]
+        if not profiles:
+            print(f"No profiles to move to {drive}.")
+            return self.wait_back()
+
+        selected = checkboxlist_dialog(
+            title="Move existing profiles",
+            text=f"Select the profiles to move to {drive}\\Users:",
+            values=[(p, f"{p.owner or p.sid}  ({p.path} -> {target_path(p, drive)})") for p in profiles],
+        ).run()
+
+        if not selected:
+            self.move_back()
+            return
+
+        deep = prompt("Compare file contents after copying (slower)? (y/n): ").strip().lower() == "y"
+
+        for profile in selected:
+            print(f"[*] {profile.owner or profile.sid}: {profile.path} -> {target_path(profile, drive)}")
+            result = migrate_profile(profile, drive, deep_verify=deep)
+            if result.stats is not None:
+                print(f"    {result.stats.summary()}")
+            if result.ok:
+                print(f"[+] ProfileImagePath updated; the old folder {profile.path} can be removed "
+                      f"after the next logon.")
+            else:
+                print(f"[!] Not moved: {result.error}")
+
+        self.wait_back()
+
+
 class Profile(FolderNode):
     def get_name(self) -> str:
         return "Profile Folder"
@@ -56,6 +115,8 @@ class Profile(FolderNode):
         from prompt_toolkit import choice
         action_options: list[tuple[object, str]] = [
             ("change", "Change drive"),
+            ("usage", "Disk usage per user"),
+            ("move", "Move existing profiles"),
             (None, "Back"),
         ]
         action = choice(message='', options=action_options, default=None)
@@ -65,5 +126,13 @@ class Profile(FolderNode):
             self._move_next(SetProfile())
             return
 
+        if action == "usage":
+            self._move_next(ProfileDiskUsage())
+            return
+
+        if action == "move":
+            self._move_next(MoveProfiles())
+            return
+
         # Default: go back
         self.move_back()
@@ -0,0 +1,47 @@
+from prompt_toolkit import choice
+from tabulate import tabulate
+
+from core.navigation import NavigationNode
+from core.utils import get_folder_path
+from scripts.fs_size import format_size
+from scripts.profile_usage import CACHE_FILE_NAME, analyze_profiles
+
+
+class ProfileDiskUsage(NavigationNode):
+    """Per-user disk usage of the profiles directory, with the largest subfolders."""
+
+    def __init__(self):
+        super().__init__()
+        self._refresh = False
+
+    def get_name(self) -> str:
+        return "Disk usage"
+
+    def process(self):
+        print("Scanning profiles ...")
+        profiles_dir, usages = analyze_profiles(get_folder_path("Cache") / CACHE_FILE_NAME, refresh=self._refresh)
+        self._refresh = False
+
+        rows = []
+        for u in usages:
+            rows.append([u.owner or "-", u.path, format_size(u.bytes), u.files])
+            for rel, size in u.top:
+                rows.append(["", f"  {rel}", format_size(size), ""])
+        print(tabulate(rows, headers=["User", "Folder", "Size", "Files"]))
+
+        scanned = sum(u.scanned for u in usages)
+        reused = sum(u.reused for u in usages)
+        elapsed = max((u.elapsed for u in usages), default=0.0)
+        print(f"\nTotal {format_size(sum(u.bytes for u in usages))} in {profiles_dir}; "
+              f"{scanned} folders scanned, {reused} from cache, {elapsed:.1f}s")
+
+        action = choice(
+            message='',
+            options=[(None, "[...]"), ("refresh", "Full rescan")],
+            default=None,
+        )
+        if action == "refresh":
+            self._refresh = True
+            return
+
+        self.move_back()
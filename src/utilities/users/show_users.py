@@ -1,16 +1,17 @@
 from typing import Optional
 
-import wmi
 from prompt_toolkit import choice, HTML
+from prompt_toolkit.formatted_text.html import html_escape as escape
 
 from core.navigation import NavigationNode
+from scripts.local_users import get_user_backend
 from utilities.users.user_info import UserInfo
 
 
 def get_name(acc):
-    if acc.Disabled:
-        return HTML(f"<ansibrightblack>{acc.Name}</ansibrightblack>")
-    return acc.Name
+    if acc.disabled:
+        return HTML(f"<ansibrightblack>{escape(acc.name)}</ansibrightblack>")
+    return acc.name
 
 class ShowUsers(NavigationNode):
 
@@ -24,16 +25,20 @@ class ShowUsers(NavigationNode):
     def process(self):
         options: list[tuple[Optional[NavigationNode], str]] = [(None, '[...]')]
 
-        c = wmi.WMI()
+        users = get_user_backend().list_users()
         options += [
-            (u, get_name(u)) for u in c.Win32_UserAccount(LocalAccount=True)
+            (u, get_name(u)) for u in users
         ]
 
+        # Records are rebuilt on every listing; keep the selection by name
+        last_name = self._last_selected.name if self._last_selected is not None else None
+        default = next((u for u in users if u.name == last_name), None)
+
         # wait_to_select_back(self._move_back)
         self._last_selected = choice(
             message='',
             options=options,
-            default=self._last_selected,
+            default=default,
         )
 
         if self._last_selected is None:
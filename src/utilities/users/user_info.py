@@ -1,58 +1,71 @@
 from core.navigation import NavigationNode
 
 
+def is_builtin_or_protected(acc) -> bool:
+    # Block deletion of built-in or protected accounts
+    name = acc.name.lower()
+    protected_names = {"administrator", "guest", "defaultaccount", "wdagutilityaccount"}
+    if name in protected_names:
+        return True
+    sid = acc.sid.strip()
+    # Built-in Administrator (…-500) and Guest (…-501)
+    if sid.endswith("-500") or sid.endswith("-501"):
+        return True
+    # Extra guard: non-local accounts shouldn't be deleted here
+    if not acc.local_account:
+        return True
+    return False
+
+
+def is_current_user(acc) -> bool:
+    # Prevent deleting the currently logged-in user
+    try:
+        import getpass
+        current = getpass.getuser()
+    except Exception:
+        return False
+    return acc.name == current
+
+
 class UserInfo(NavigationNode):
     def __init__(self, user_account):
         super().__init__()
         self._user_account = user_account
 
     def get_name(self) -> str:
-        return self._user_account.Name
+        return self._user_account.name
 
     # Validation helpers moved from process() into class methods
     def _is_builtin_or_protected(self, acc) -> bool:
-        # Block deletion of built-in or protected accounts
-        name = str(getattr(acc, "Name", "")).lower()
-        protected_names = {"administrator", "guest", "defaultaccount", "wdagutilityaccount"}
-        if name in protected_names:
-            return True
-        sid = str(getattr(acc, "SID", "")).strip()
-        # Built-in Administrator (…-500) and Guest (…-501)
-        if sid.endswith("-500") or sid.endswith("-501"):
-            return True
-        # Extra guard: non-local accounts shouldn't be deleted here
-        if not getattr(acc, "LocalAccount", True):
-            return True
-        return False
+        return is_builtin_or_protected(acc)
 
     def _is_current_user(self, acc) -> bool:
-        # Prevent deleting the currently logged-in user
-        try:
-            import getpass
-            current = getpass.getuser()
-        except Exception:
-            return False
-        return str(getattr(acc, "Name", "")) == current
+        return is_current_user(acc)
 
     def process(self):
         print()
 
         from tabulate import tabulate
 
+        # Re-read the account: the record from the list may be stale
+        from scripts.local_users import get_user_backend
+        acc = get_user_backend().get_user(self._user_account.name) or self._user_account
+        self._user_account = acc
+
         data = [
-            ["Name", self._user_account.Name],
-            ["FullName", self._user_account.FullName],
-            ["AccountType", self._user_account.AccountType],
-            ["LocalAccount", self._user_account.LocalAccount],
-            ["Domain", self._user_account.Domain],
-            ["Disabled", self._user_account.Disabled],
-            ["Lockout", self._user_account.Lockout],
-            ["PasswordChangeable", self._user_account.PasswordChangeable],
-            ["PasswordExpires", self._user_account.PasswordExpires],
-            ["PasswordRequired", self._user_account.PasswordRequired],
-            ["SID", self._user_account.SID],
-            ["SIDType", self._user_account.SIDType],
-            ["Status", self._user_account.Status],
+            ["Name", acc.name],
+            ["FullName", acc.full_name],
+            ["AccountType", acc.account_type],
+            ["LocalAccount", acc.local_account],
+            ["Domain", acc.domain],
+            ["Disabled", acc.disabled],
+            ["Lockout", acc.lockout],
+            ["PasswordChangeable", acc.password_changeable],
+            ["PasswordExpires", acc.password_expires],
+            ["PasswordRequired", acc.password_required],
+            ["SID", acc.sid],
+            ["SIDType", acc.sid_type],
+            ["Status", acc.status],
         ]
 
         print(tabulate(data, tablefmt="plain"))
@@ -73,7 +86,7 @@ class UserInfo(NavigationNode):
         action = choice(message='', options=action_options, default=None)
 
         if action == "delete":
-            username = getattr(self._user_account, "Name", "")
+            username = self._user_account.name
             confirm = prompt(
                 f"YOU ARE ABOUT TO PERMANENTLY DELETE the local user '{username}' and their profile. "
                 f"Type the username again to confirm or 'n' to cancel: "